@@ -9,12 +9,16 @@ from .handlers import (
     check_answer,
     handle_general_question,
     cancel,
-    handle_message
+    handle_message,
+    show_llm_usage,
+    show_top_questions
 )
+from .lifecycle import on_startup, on_shutdown
 from .keyboards import (
     get_main_menu_keyboard,
     get_back_keyboard,
-    get_exercise_keyboard
+    get_exercise_keyboard,
+    get_confirm_exit_keyboard
 )
 from .states import (
     MAIN_MENU,
@@ -35,9 +39,14 @@ __all__ = [
     'handle_general_question',
     'cancel',
     'handle_message',
+    'show_llm_usage',
+    'show_top_questions',
+    'on_startup',
+    'on_shutdown',
     'get_main_menu_keyboard',
     'get_back_keyboard',
     'get_exercise_keyboard',
+    'get_confirm_exit_keyboard',
     'MAIN_MENU',
     'LOGIC_INPUT',
     'SET_INPUT',
@@ -1,19 +1,32 @@
 import logging
 import random
-from datetime import datetime, timedelta
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from datetime import datetime, timedelta, timezone
+from telegram import Update, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
 
+from app.config import config
 from app.bot.states import *
 import asyncio
 
 # Additional states
 CONFIRMING_EXIT = 'CONFIRMING_EXIT'
-from app.bot.keyboards import get_main_menu_keyboard, get_back_keyboard, get_exercise_keyboard
+from app.bot.keyboards import (
+    get_main_menu_keyboard, get_back_keyboard, get_exercise_keyboard, get_confirm_exit_keyboard
+)
+from app.bot.texts import *
 from app.services.parser import LogicSetParser
 from app.services.exercise_generator import ExerciseGenerator
-from app.services.llm_service import llm_service
+from app.services.query_router import query_router
+from app.services.conversation import conversation_memory
+from app.services.quota import quota_manager
+from app.database import db_manager, write_queue
+from app.services.leaderboard import leaderboard
+from app.services.progress import progress_service
+from app.bot.media import send_cached_photo, send_result_image
+from app.bot.replies import PendingReply
+from app.services.kmap import draw_kmap
 from app.utils import latex_to_image, hash_query, format_progress_message
+from app.utils.formatting import format_text, prettify_logic, send_long_message
 
 logger = logging.getLogger(__name__)
 
@@ -21,27 +34,42 @@ logger = logging.getLogger(__name__)
 parser = LogicSetParser()
 exercise_generator = ExerciseGenerator()
 
+def queue_notifier(reply: PendingReply):
+    """Tell the user their position when the LLM scheduler queues the request"""
+    async def notify(position: int):
+        await reply.update(QUEUED_TEMPLATE.format(position=position))
+    return notify
+
+async def answer_query(update: Update, text: str, domain: str = None,
+                       placeholder: str = PROCESSING, error_text: str = EXPRESSION_ERROR,
+                       reply_markup=None):
+    """Answer a query by editing a single placeholder message into the result"""
+    reply = PendingReply(update.message)
+    await reply.start(placeholder, reply_markup=reply_markup)
+
+    # Answer parsable expressions locally, free-form text goes to the LLM
+    try:
+        result = await query_router.answer(
+            text, domain, user_id=update.effective_user.id, on_queued=queue_notifier(reply)
+        )
+    except Exception as e:
+        logger.error(f"Error getting LLM response: {e}")
+        await reply.finish(format_text(error_text))
+        return
+    await reply.finish(format_result(result))
+    await send_result_image(update.message, result)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start the conversation and show the main menu"""
     user = update.effective_user
-    
+    await db_manager.add_user(user.id, user.username, user.first_name, user.last_name)
+
     # Initialize user session data
     context.user_data['last_activity'] = datetime.now()
     context.user_data['menu_attempts'] = 0
     context.user_data['current_session'] = True
-    
-
-    starter_text = (
-        "👋 به ربات کمک‌آموز منطق و نظریه مجموعه‌ها خوش آمدید!\n\n"
-        "من می‌توانم در موارد زیر به شما کمک کنم:\n"
-        "• ساده‌سازی عبارات منطقی\n"
-        "• حل مسائل نظریه مجموعه‌ها\n"
-        "• ایجاد تمرین‌های آموزشی\n"
-        "• توضیح مفاهیم به صورت گام به گام\n\n"
-        "از منوی زیر استفاده کنید یا سوال خود را مستقیماً تایپ کنید!"
-    )
 
-    await update.message.reply_text(starter_text, reply_markup=get_main_menu_keyboard())
+    await update.message.reply_text(START_TEXT, reply_markup=get_main_menu_keyboard())
     return MAIN_MENU
 
 async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -53,13 +81,14 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     now = datetime.now()
     last_activity = context.user_data.get('last_activity')
     
-    # Check for session timeout (30 minutes)
-    if last_activity and (now - last_activity) > timedelta(minutes=30):
+    # Check for session timeout (30 minutes by default)
+    if last_activity and (now - last_activity) > timedelta(seconds=config.session_timeout):
         await update.message.reply_text(
-            "جلسه شما به دلیل عدم فعالیت منقضی شده است. لطفاً دوباره شروع کنید.",
+            SESSION_EXPIRED,
             reply_markup=get_main_menu_keyboard()
         )
         context.user_data.clear()
+        conversation_memory.clear(user_id)
         context.user_data['last_activity'] = now
         return MAIN_MENU
     
@@ -71,7 +100,7 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if menu_attempts > 10:  # Reset after 10 rapid menu changes
         context.user_data['menu_attempts'] = 0
         await update.message.reply_text(
-            "لطفاً کمی صبر کنید و سپس دوباره تلاش کنید.",
+            SLOW_DOWN,
             reply_markup=get_main_menu_keyboard()
         )
         return MAIN_MENU
@@ -79,32 +108,11 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['menu_attempts'] = menu_attempts + 1
     
     # Update user interaction
-
-    # Define menu options and their handlers
-    menu_options = {
-        '🧠 منطق': {
-            'message': "لطفاً عبارت منطقی یا سوال خود را وارد کنید.\n\nمثال‌ها:\n• ساده کن (p ∧ q) ∨ (p ∧ ¬q)\n• جدول درستی برای p → q\n• آیا (p ∨ q) ∧ ¬p معادل q است؟\n\n💡 راهنمایی: می‌توانید از علائم ∧ (and)، ∨ (or)، ¬ (not)، → (implies) استفاده کنید.",
-            'next_state': LOGIC_INPUT,
-            'help_tip': "برای خروج از این بخش، روی دکمه 'بازگشت به منو' کلیک کنید."
-        },
-        '📚 مجموعه‌ها': {
-            'message': "لطفاً عبارت نظریه مجموعه‌ها یا سوال خود را وارد کنید.\n\nمثال‌ها:\n• محاسبه کن A ∪ B که A = {1,2,3}, B = {3,4,5}\n• آیا A زیرمجموعه B است؟\n• مجموعه توانی {1,2} چیست؟",
-            'next_state': SET_INPUT,
-            'help_tip': "برای نمایش مجموعه‌ها از کاراکترهای {} استفاده کنید."
-        },
-        '📝 تمرین جدید': {
-            'handler': generate_exercise_menu,
-            'next_state': EXERCISE_SELECTION
-        },
-        '📊 پیشرفت': {
-            'handler': lambda u, c: show_progress(u, u.effective_user.id),
-            'next_state': MAIN_MENU
-        }
-    }
+    write_queue.touch(user_id)
 
     # Handle menu selection
-    if text in menu_options:
-        option = menu_options[text]
+    if text in MENU_OPTIONS:
+        option = MENU_OPTIONS[text]
         
         try:
             if 'handler' in option:
@@ -120,7 +128,7 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 # Send help tip if available
                 if 'help_tip' in option:
                     await update.message.reply_text(
-                        f"💡 {option['help_tip']}",
+                        option['help_tip'],
                         reply_markup=get_back_keyboard()
                     )
             
@@ -131,14 +139,14 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             logger.error(f"Error handling menu option {text}: {e}")
             await update.message.reply_text(
-                "متأسفانه در پردازش درخواست شما مشکلی پیش آمد. لطفاً دوباره تلاش کنید.",
+                MENU_ERROR,
                 reply_markup=get_main_menu_keyboard()
             )
             return MAIN_MENU
     
     elif text in ['🔙 بازگشت', '🔙 بازگشت به منو']:
         await update.message.reply_text(
-            "به منوی اصلی بازگشتید.", 
+            BACK_TO_MENU,
             reply_markup=get_main_menu_keyboard()
         )
         return MAIN_MENU
@@ -150,7 +158,7 @@ async def main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def generate_exercise_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Generate exercise selection menu"""
     await update.message.reply_text(
-        "نوع تمرینی که می‌خواهید تمرین کنید را انتخاب کنید:",
+        CHOOSE_EXERCISE,
         reply_markup=get_exercise_keyboard()
     )
     return EXERCISE_SELECTION
@@ -162,7 +170,7 @@ async def handle_exercise_selection(update: Update, context: ContextTypes.DEFAUL
 
     if text == '🔙 بازگشت به منو':
         await update.message.reply_text(
-            "به منوی اصلی بازگشتید.", 
+            BACK_TO_MENU,
             reply_markup=get_main_menu_keyboard()
         )
         return MAIN_MENU
@@ -177,31 +185,33 @@ async def handle_exercise_selection(update: Update, context: ContextTypes.DEFAUL
     # Validate exercise type
     if text not in EXERCISE_TYPES:
         await update.message.reply_text(
-            "لطفاً یکی از گزینه‌های موجود را انتخاب کنید.",
+            CHOOSE_VALID_OPTION,
             reply_markup=get_exercise_keyboard()
         )
         return EXERCISE_SELECTION
 
     exercise_type = EXERCISE_TYPES[text]
 
-    # Send loading message
-    loading_message = await update.message.reply_text("در حال آماده‌سازی تمرین... ⏳")
+    # The exercise replaces the placeholder and brings the back keyboard with it
+    reply = PendingReply(update.message)
+    await reply.start(PREPARING_EXERCISE, reply_markup=get_back_keyboard())
 
     # Get user level for difficulty adjustment
-    difficulty = 1
+    try:
+        difficulty = await progress_service.difficulty(user_id)
+    except Exception as e:
+        logger.error(f"Error reading progress for user {user_id}: {e}")
+        difficulty = 1
 
     # Generate exercise (offload to thread)
     exercise = await asyncio.to_thread(exercise_generator.generate_exercise, exercise_type, difficulty)
-    # Delete loading message
-    await loading_message.delete()
 
     # Store exercise in context for answer checking
     context.user_data['current_exercise'] = exercise
 
-    await update.message.reply_text(
-        f"تمرین (سختی: {difficulty}):\n\n{exercise['question']}",
-        reply_markup=get_back_keyboard()
-    )
+    await reply.finish(format_text(
+        EXERCISE_TEMPLATE.format(difficulty=difficulty, question=prettify_logic(exercise['question']))
+    ))
 
     return WAITING_FOR_ANSWER
 
@@ -211,24 +221,14 @@ async def handle_logic_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
 
     if user_text == '🔙 بازگشت به منوی اصلی':
-        await update.message.reply_text("به منوی اصلی بازگشتید.", reply_markup=get_main_menu_keyboard())
+        await update.message.reply_text(BACK_TO_MENU, reply_markup=get_main_menu_keyboard())
         return MAIN_MENU
 
-    # Log the question asynchronously (don't await)
-
-    # Send loading message
-    loading_message = await update.message.reply_text("در حال پردازش درخواست شما... ⏳")
+    # Log the question; written in the background with the next batch
+    write_queue.log_question(user_id, user_text, "logic")
 
-    # Always send user prompt to Hugging Face LLM
-    try:
-        response = await llm_service.get_response(user_text)
-        await loading_message.delete()
-        await update.message.reply_text(response)
-    except Exception as e:
-        logger.error(f"Error getting LLM response: {e}")
-        await loading_message.delete()
-        await update.message.reply_text("متأسفم، در پردازش عبارت مشکل پیش آمد. لطفاً دوباره تلاش کنید.")
-    await update.message.reply_text("چه کاری می‌خواهید انجام دهید؟", reply_markup=get_main_menu_keyboard())
+    # The main menu keyboard rides on the placeholder, so no separate menu message is needed
+    await answer_query(update, user_text, "logic", reply_markup=get_main_menu_keyboard())
     return MAIN_MENU
 
 async def handle_set_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -237,24 +237,14 @@ async def handle_set_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
 
     if user_text == '🔙 بازگشت به منوی اصلی':
-        await update.message.reply_text("به منوی اصلی بازگشتید.", reply_markup=get_main_menu_keyboard())
+        await update.message.reply_text(BACK_TO_MENU, reply_markup=get_main_menu_keyboard())
         return MAIN_MENU
 
-    # Log the question asynchronously
-
-    # Send loading message
-    loading_message = await update.message.reply_text("در حال پردازش درخواست شما... ⏳")
+    # Log the question; written in the background with the next batch
+    write_queue.log_question(user_id, user_text, "set_theory")
 
-    # Always send user prompt to Hugging Face LLM
-    try:
-        response = await llm_service.get_response(user_text)
-        await loading_message.delete()
-        await update.message.reply_text(response)
-    except Exception as e:
-        logger.error(f"Error getting LLM response: {e}")
-        await loading_message.delete()
-        await update.message.reply_text("متأسفم، در پردازش عبارت مشکل پیش آمد. لطفاً دوباره تلاش کنید.")
-    await update.message.reply_text("چه کاری می‌خواهید انجام دهید؟", reply_markup=get_main_menu_keyboard())
+    # The main menu keyboard rides on the placeholder, so no separate menu message is needed
+    await answer_query(update, user_text, "set_theory", reply_markup=get_main_menu_keyboard())
     return MAIN_MENU
 
 async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -263,87 +253,152 @@ async def check_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
 
     if user_answer == '🔙 بازگشت به منوی اصلی':
-        await update.message.reply_text("به منوی اصلی بازگشتید.", reply_markup=get_main_menu_keyboard())
+        await update.message.reply_text(BACK_TO_MENU, reply_markup=get_main_menu_keyboard())
         return MAIN_MENU
 
     exercise = context.user_data.get('current_exercise')
 
     if not exercise:
-        await update.message.reply_text("هیچ تمرینی یافت نشد. لطفاً اول یک تمرین ایجاد کنید.", reply_markup=get_main_menu_keyboard())
+        await update.message.reply_text(NO_EXERCISE, reply_markup=get_main_menu_keyboard())
         return MAIN_MENU
 
     # Simple answer checking
-    is_correct = user_answer.strip().lower() == exercise['answer'].strip().lower()
+    # Compare in symbol form, since answers are shown with ∧ ∨ ¬ rather than sympy's & | ~
+    is_correct = (prettify_logic(user_answer).strip().lower()
+                  == prettify_logic(exercise['answer']).strip().lower())
 
-    if is_correct:
-        await update.message.reply_text(
-            f"✅ صحیح! پاسخ شما درست بود."
-        )
-    else:
-        await update.message.reply_text(
-            f"❌ غلط. پاسخ صحیح این است: {exercise['answer']}\n"
-            f"نگران نباشید، به تمرین ادامه دهید!"
-        )
+    # Update user score
+    progress = None
+    try:
+        points, progress = await progress_service.record_answer(user_id, exercise, is_correct)
+    except Exception as e:
+        logger.error(f"Error recording answer for user {user_id}: {e}")
 
-    await update.message.reply_text("چه کاری می‌خواهید انجام دهید؟", reply_markup=get_main_menu_keyboard())
+    if is_correct and progress is not None:
+        verdict = CORRECT_ANSWER_TEMPLATE.format(points=points, **progress)
+    elif is_correct:
+        verdict = CORRECT_ANSWER
+    else:
+        verdict = WRONG_ANSWER_TEMPLATE.format(answer=prettify_logic(exercise['answer']))
+    text = format_text(verdict)
+    if exercise.get('kmap'):
+        text += "\n\n" + KMAP_TEMPLATE.format(grid=format_text(exercise['kmap']))
+
+    # Verdict, K-map and the main menu keyboard go out as one message
+    await send_long_message(update.message, text, reply_markup=get_main_menu_keyboard())
+    if exercise.get('kmap_source'):
+        try:
+            await send_cached_photo(update.message, draw_kmap, exercise['kmap_source'])
+        except Exception as e:
+            logger.error(f"Error sending K-map image: {e}")
     return MAIN_MENU
 
 async def handle_general_question(update: Update, context: ContextTypes.DEFAULT_TYPE, text=None):
-    """Handle general questions using Hugging Face LLM"""
+    """Handle general questions, using the LLM only for free-form text"""
     if text is None:
         text = update.message.text
 
-    user_id = update.effective_user.id
-
-    # Send loading message
-    loading_message = await update.message.reply_text("در حال پردازش سوال شما... ⏳")
-
-    # Always send user prompt to Hugging Face LLM
-    try:
-        response = await llm_service.get_response(text)
-        await loading_message.delete()
-        await update.message.reply_text(response)
-    except Exception as e:
-        logger.error(f"Error getting LLM response: {e}")
-        await loading_message.delete()
-        await update.message.reply_text("متأسفم، در پردازش سوال مشکل پیش آمد. لطفاً دوباره تلاش کنید.")
+    await answer_query(update, text, placeholder=PROCESSING_QUESTION, error_text=QUESTION_ERROR)
     return MAIN_MENU
 
 async def show_progress(update: Update, user_id: int):
     """Show user progress"""
-    await update.message.reply_text(
-        "پیشرفت شما ذخیره نمی‌شود، اما می‌توانید به تمرین ادامه دهید!",
-        reply_markup=get_main_menu_keyboard()
-    )
+    try:
+        progress = await progress_service.get(user_id)
+    except Exception as e:
+        logger.error(f"Error reading progress for user {user_id}: {e}")
+        await update.message.reply_text(PROGRESS_NOT_SAVED, reply_markup=get_main_menu_keyboard())
+        return
+
+    text = format_progress_message(progress)
+    rank = leaderboard.rank(user_id)
+    if rank is not None:
+        text += "\n" + RANK_TEMPLATE.format(rank=rank)
+    await update.message.reply_text(text, reply_markup=get_main_menu_keyboard())
+
+# Menu buttons -> prompt text or handler, and the state to move to
+MENU_OPTIONS = {
+    '🧠 منطق': {
+        'message': LOGIC_PROMPT,
+        'next_state': LOGIC_INPUT,
+        'help_tip': LOGIC_TIP
+    },
+    '📚 مجموعه‌ها': {
+        'message': SET_PROMPT,
+        'next_state': SET_INPUT,
+        'help_tip': SET_TIP
+    },
+    '📝 تمرین جدید': {
+        'handler': generate_exercise_menu,
+        'next_state': EXERCISE_SELECTION
+    },
+    '📊 پیشرفت': {
+        'handler': lambda u, c: show_progress(u, u.effective_user.id),
+        'next_state': MAIN_MENU
+    }
+}
+
+def format_result(result) -> str:
+    """Telegram HTML for a routed answer; tables keep their columns in a monospaced block"""
+    return format_text(result.response, preformatted=result.path == "truth_table")
 
 async def confirm_exit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Ask for confirmation before exiting"""
-    keyboard = [
-        ['✅ بله، خروج', '❌ خیر، ادامه']
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
-    await update.message.reply_text(
-        "آیا مطمئن هستید که می‌خواهید از ربات خارج شوید؟",
-        reply_markup=reply_markup
-    )
+    await update.message.reply_text(CONFIRM_EXIT, reply_markup=get_confirm_exit_keyboard())
     return CONFIRMING_EXIT
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancel the conversation"""
     if update.message.text == '✅ بله، خروج':
         await update.message.reply_text(
-            "خدانگهدار! امیدوارم روزی دوباره بتوانیم صحبت کنیم.",
+            GOODBYE,
             reply_markup=ReplyKeyboardRemove()
         )
         return ConversationHandler.END
     else:
         await update.message.reply_text(
-            "به منوی اصلی بازگشتید.",
+            BACK_TO_MENU,
             reply_markup=get_main_menu_keyboard()
         )
         return MAIN_MENU
 
+async def show_llm_usage(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin command: top LLM consumers over the last day and current window usage"""
+    if update.effective_user.id not in config.admin_user_ids:
+        return None
+
+    top = await quota_manager.top_consumers(limit=10)
+    usage = quota_manager.window_usage()
+    lines = [
+        f"مصرف {usage['window_s'] // 60} دقیقه اخیر: {usage['requests']} درخواست، {usage['tokens']} توکن",
+        f"درخواست‌های ردشده به دلیل سهمیه: {usage['rejected']}",
+        "",
+        "پرمصرف‌ترین کاربران (۲۴ ساعت اخیر):",
+    ]
+    for rank, (user_id, requests, tokens) in enumerate(top, 1):
+        lines.append(f"{rank}. {user_id}: {requests} درخواست، {tokens} توکن")
+    if not top:
+        lines.append("هنوز مصرفی ثبت نشده است.")
+    await update.message.reply_text("\n".join(lines))
+    return None
+
+async def show_top_questions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin command: the most repeated questions over the last week"""
+    if update.effective_user.id not in config.admin_user_ids:
+        return None
+
+    await write_queue.flush()
+    since = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
+    top = await db_manager.top_questions(since, limit=10)
+    lines = ["پرتکرارترین سوال‌ها (۷ روز اخیر):"]
+    for rank, (question_text, asked) in enumerate(top, 1):
+        preview = question_text if len(question_text) <= 80 else question_text[:80] + "…"
+        lines.append(f"{rank}. ({asked} بار) {preview}")
+    if not top:
+        lines.append("هنوز سوالی ثبت نشده است.")
+    await update.message.reply_text("\n".join(lines))
+    return None
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle any message that doesn't match the conversation handler"""
     # This acts as a fallback for messages that don't match the current state
@@ -371,5 +426,8 @@ def setup_handlers(application):
         allow_reentry=True,
     )
     
+    # Registered before the conversation so its command fallback does not swallow it
+    application.add_handler(CommandHandler('usage', show_llm_usage))
+    application.add_handler(CommandHandler('top_questions', show_top_questions))
     application.add_handler(conv_handler)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
\ No newline at end of file
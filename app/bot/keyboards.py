@@ -1,27 +1,38 @@
 from telegram import ReplyKeyboardMarkup
 
+# Keyboards are immutable, so each one is built once and shared by every reply
+MAIN_MENU_KEYBOARD = ReplyKeyboardMarkup([
+    ['🧠 منطق', '📚 مجموعه‌ها'],
+    ['📝 تمرین جدید'],
+    ['📊 پیشرفت', 'ℹ️ درباره ربات', '❓ راهنما']
+], resize_keyboard=True)
+
+BACK_KEYBOARD = ReplyKeyboardMarkup([['🔙 بازگشت']], resize_keyboard=True)
+
+EXERCISE_KEYBOARD = ReplyKeyboardMarkup([
+    ['🧠 تمرین منطق', '📚 تمرین مجموعه‌ها'],
+    ['🎲 تمرین تصادفی'],
+    ['🔙 بازگشت']
+], resize_keyboard=True)
+
+CONFIRM_EXIT_KEYBOARD = ReplyKeyboardMarkup([['✅ بله، خروج', '❌ خیر، ادامه']], resize_keyboard=True)
+
 
 def get_main_menu_keyboard():
     """Create the main menu keyboard with categories"""
-    keyboard = [
-        ['🧠 منطق', '📚 مجموعه‌ها'],
-        ['📝 تمرین جدید'],
-        ['📊 پیشرفت', 'ℹ️ درباره ربات', '❓ راهنما']
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return MAIN_MENU_KEYBOARD
 
 
 def get_back_keyboard():
     """Create a keyboard with back button only"""
-    keyboard = [['🔙 بازگشت']]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return BACK_KEYBOARD
 
 
 def get_exercise_keyboard():
     """Create exercise selection keyboard"""
-    keyboard = [
-        ['🧠 تمرین منطق', '📚 تمرین مجموعه‌ها'],
-        ['🎲 تمرین تصادفی'],
-        ['🔙 بازگشت']
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return EXERCISE_KEYBOARD
+
+
+def get_confirm_exit_keyboard():
+    """Create the yes/no keyboard shown before leaving the bot"""
+    return CONFIRM_EXIT_KEYBOARD
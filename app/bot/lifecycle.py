@@ -0,0 +1,32 @@
+import logging
+
+from app.bot.media import telegram_files
+from app.cache import cache_layer
+from app.database import db_manager, maintenance_job, write_queue
+from app.services.leaderboard import leaderboard
+from app.services.quota import quota_manager
+from app.utils.render import renderer
+
+logger = logging.getLogger(__name__)
+
+
+async def on_startup(application) -> None:
+    """Start background services once the application is initialized"""
+    await db_manager.init_db()
+    await write_queue.start()
+    await leaderboard.load()
+    await quota_manager.start()
+    await telegram_files.load()
+    await maintenance_job.start()
+    logger.info("Background services started")
+
+
+async def on_shutdown(application) -> None:
+    """Stop background services and flush buffered state"""
+    await maintenance_job.stop()
+    await quota_manager.stop()
+    await write_queue.stop()
+    renderer.close()
+    await cache_layer.close()
+    await db_manager.close()
+    logger.info("Background services stopped")
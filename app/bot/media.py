@@ -0,0 +1,86 @@
+import logging
+import time
+
+from telegram.error import BadRequest
+
+from app.database import db_manager
+from app.utils.render import DEFAULT_STYLE, render_key, renderer
+
+logger = logging.getLogger(__name__)
+
+
+class FileIdStore:
+    """Render key -> Telegram ``file_id`` of an image that was already uploaded.
+
+    Lookups are served from memory; the mapping is loaded from the
+    ``telegram_files`` table at startup and new ids are written through.
+    """
+
+    def __init__(self):
+        self._file_ids = {}
+        self.hits = 0
+        self.uploads = 0
+
+    async def load(self) -> int:
+        try:
+            self._file_ids.update(await db_manager.load_file_ids())
+        except Exception as e:
+            logger.error(f"Error loading Telegram file ids: {e}")
+        return len(self._file_ids)
+
+    def get(self, key: str):
+        return self._file_ids.get(key)
+
+    async def put(self, key: str, file_id: str) -> None:
+        self._file_ids[key] = file_id
+        try:
+            await db_manager.save_file_id(key, file_id, time.time())
+        except Exception as e:
+            logger.error(f"Error saving Telegram file id: {e}")
+
+    async def forget(self, key: str) -> None:
+        """Drop a file id Telegram no longer accepts"""
+        self._file_ids.pop(key, None)
+        try:
+            await db_manager.delete_file_id(key)
+        except Exception as e:
+            logger.error(f"Error deleting Telegram file id: {e}")
+
+    def stats(self) -> dict:
+        return {"file_ids": len(self._file_ids), "hits": self.hits, "uploads": self.uploads}
+
+
+telegram_files = FileIdStore()
+
+
+async def send_cached_photo(message, draw, source: str, style=DEFAULT_STYLE, **kwargs):
+    """Reply with the image ``draw(source, style)``, uploading it only the first time"""
+    key = render_key(draw, source, style)
+    file_id = telegram_files.get(key)
+    if file_id is not None:
+        try:
+            sent = await message.reply_photo(photo=file_id, **kwargs)
+            telegram_files.hits += 1
+            return sent
+        except BadRequest as e:
+            logger.warning(f"Cached file id for {key} rejected ({e}), uploading again")
+            await telegram_files.forget(key)
+
+    data = await renderer.render(draw, source, style)
+    sent = await message.reply_photo(photo=data, **kwargs)
+    telegram_files.uploads += 1
+    if sent.photo:
+        # The largest size is the original upload
+        await telegram_files.put(key, sent.photo[-1].file_id)
+    return sent
+
+
+async def send_result_image(message, result) -> None:
+    """Send the picture that goes with a routed answer, if it has one"""
+    if result.image is None:
+        return
+    draw, source = result.image
+    try:
+        await send_cached_photo(message, draw, source)
+    except Exception as e:
+        logger.error(f"Error sending result image: {e}")
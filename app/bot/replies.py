@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+
+from app.config import config
+from app.utils.formatting import split_message
+
+logger = logging.getLogger(__name__)
+
+
+class PendingReply:
+    """A placeholder message that is edited into the answer instead of being replaced.
+
+    Telegram refuses to edit a message sent with a reply keyboard, so the
+    placeholder is always sent without one. A ``reply_markup`` passed to
+    ``start`` is attached to the last part of the answer, which is then sent
+    as a new message; when the whole answer fits in that one message, the
+    placeholder is deleted instead of edited.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self.placeholder = None
+        self.reply_markup = None
+
+    async def start(self, text: str, reply_markup=None) -> None:
+        self.reply_markup = reply_markup
+        self.placeholder = await self.message.reply_text(text)
+
+    async def update(self, text: str) -> None:
+        """Change the placeholder text while the answer is being prepared"""
+        try:
+            await self.placeholder.edit_text(text)
+        except BadRequest as e:
+            logger.debug(f"Could not update placeholder: {e}")
+
+    async def _delete_placeholder(self) -> None:
+        try:
+            await self.placeholder.delete()
+        except BadRequest as e:
+            logger.debug(f"Could not delete placeholder: {e}")
+
+    async def finish(self, text: str, parse_mode=ParseMode.HTML):
+        """Turn the placeholder into the answer; parts beyond the first chunk follow as new messages"""
+        chunks = split_message(text)
+        if not chunks:
+            await self._delete_placeholder()
+            return None
+        # The part carrying a reply keyboard has to be a new message
+        last = chunks.pop() if self.reply_markup is not None else None
+        sent = None
+        if chunks:
+            try:
+                sent = await self.placeholder.edit_text(chunks[0], parse_mode=parse_mode)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    # e.g. the placeholder was deleted; fall back to a fresh message
+                    logger.warning(f"Could not edit placeholder, sending a new message: {e}")
+                    await self._delete_placeholder()
+                    sent = await self.message.reply_text(chunks[0], parse_mode=parse_mode)
+        else:
+            await self._delete_placeholder()
+        for chunk in chunks[1:]:
+            # Stay below Telegram's per-chat rate when an answer takes several messages
+            await asyncio.sleep(config.telegram_send_interval)
+            sent = await self.message.reply_text(chunk, parse_mode=parse_mode)
+        if last is not None:
+            if chunks:
+                await asyncio.sleep(config.telegram_send_interval)
+            sent = await self.message.reply_text(last, parse_mode=parse_mode, reply_markup=self.reply_markup)
+        return sent
@@ -0,0 +1,61 @@
+# Static bot texts and message templates, built once at import time
+
+START_TEXT = (
+    "👋 به ربات کمک‌آموز منطق و نظریه مجموعه‌ها خوش آمدید!\n\n"
+    "من می‌توانم در موارد زیر به شما کمک کنم:\n"
+    "• ساده‌سازی عبارات منطقی\n"
+    "• حل مسائل نظریه مجموعه‌ها\n"
+    "• ایجاد تمرین‌های آموزشی\n"
+    "• توضیح مفاهیم به صورت گام به گام\n\n"
+    "از منوی زیر استفاده کنید یا سوال خود را مستقیماً تایپ کنید!"
+)
+
+LOGIC_PROMPT = (
+    "لطفاً عبارت منطقی یا سوال خود را وارد کنید.\n\n"
+    "مثال‌ها:\n"
+    "• ساده کن (p ∧ q) ∨ (p ∧ ¬q)\n"
+    "• جدول درستی برای p → q\n"
+    "• آیا (p ∨ q) ∧ ¬p معادل q است؟\n\n"
+    "💡 راهنمایی: می‌توانید از علائم ∧ (and)، ∨ (or)، ¬ (not)، → (implies) استفاده کنید."
+)
+LOGIC_TIP = "💡 برای خروج از این بخش، روی دکمه 'بازگشت به منو' کلیک کنید."
+
+SET_PROMPT = (
+    "لطفاً عبارت نظریه مجموعه‌ها یا سوال خود را وارد کنید.\n\n"
+    "مثال‌ها:\n"
+    "• محاسبه کن A ∪ B که A = {1,2,3}, B = {3,4,5}\n"
+    "• آیا A زیرمجموعه B است؟\n"
+    "• مجموعه توانی {1,2} چیست؟"
+)
+SET_TIP = "💡 برای نمایش مجموعه‌ها از کاراکترهای {} استفاده کنید."
+
+SESSION_EXPIRED = "جلسه شما به دلیل عدم فعالیت منقضی شده است. لطفاً دوباره شروع کنید."
+SLOW_DOWN = "لطفاً کمی صبر کنید و سپس دوباره تلاش کنید."
+MENU_ERROR = "متأسفانه در پردازش درخواست شما مشکلی پیش آمد. لطفاً دوباره تلاش کنید."
+BACK_TO_MENU = "به منوی اصلی بازگشتید."
+
+CHOOSE_EXERCISE = "نوع تمرینی که می‌خواهید تمرین کنید را انتخاب کنید:"
+CHOOSE_VALID_OPTION = "لطفاً یکی از گزینه‌های موجود را انتخاب کنید."
+PREPARING_EXERCISE = "در حال آماده‌سازی تمرین... ⏳"
+NO_EXERCISE = "هیچ تمرینی یافت نشد. لطفاً اول یک تمرین ایجاد کنید."
+CORRECT_ANSWER = "✅ صحیح! پاسخ شما درست بود."
+
+PROCESSING = "در حال پردازش درخواست شما... ⏳"
+PROCESSING_QUESTION = "در حال پردازش سوال شما... ⏳"
+EXPRESSION_ERROR = "متأسفم، در پردازش عبارت مشکل پیش آمد. لطفاً دوباره تلاش کنید."
+QUESTION_ERROR = "متأسفم، در پردازش سوال مشکل پیش آمد. لطفاً دوباره تلاش کنید."
+
+PROGRESS_NOT_SAVED = "پیشرفت شما ذخیره نمی‌شود، اما می‌توانید به تمرین ادامه دهید!"
+CONFIRM_EXIT = "آیا مطمئن هستید که می‌خواهید از ربات خارج شوید؟"
+GOODBYE = "خدانگهدار! امیدوارم روزی دوباره بتوانیم صحبت کنیم."
+
+# Templates, filled with str.format
+QUEUED_TEMPLATE = "درخواست شما در صف است (جایگاه {position})... ⏳"
+EXERCISE_TEMPLATE = "تمرین (سختی: {difficulty}):\n\n{question}"
+WRONG_ANSWER_TEMPLATE = "❌ غلط. پاسخ صحیح این است: {answer}\nنگران نباشید، به تمرین ادامه دهید!"
+CORRECT_ANSWER_TEMPLATE = (
+    "✅ صحیح! شما {points} امتیاز کسب کردید.\n"
+    "امتیاز کل شما اکنون {score} است (سطح {level})."
+)
+RANK_TEMPLATE = "🏅 رتبه شما در جدول امتیازات: {rank}"
+KMAP_TEMPLATE = "نقشه کارنو:\n<pre>{grid}</pre>"
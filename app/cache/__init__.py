@@ -0,0 +1,16 @@
+# Cache package initialization
+from .layer import CacheLayer, CacheNamespace, cache_layer, key_hash
+from .backends import MemoryBackend, SQLiteBackend, RespBackend, create_backend
+from .resp import RespServer
+
+__all__ = [
+    'CacheLayer',
+    'CacheNamespace',
+    'cache_layer',
+    'key_hash',
+    'MemoryBackend',
+    'SQLiteBackend',
+    'RespBackend',
+    'create_backend',
+    'RespServer',
+]
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import aiosqlite
+
+from app.cache.resp import encode_command, read_reply
+from app.utils.helpers import sqlite_path_from_url
+
+logger = logging.getLogger(__name__)
+
+# Backends store ``(value, expires_at, cost)`` entries: ``expires_at`` is a
+# time.time() timestamp and ``cost`` the seconds it took to compute the value,
+# which drives early refresh (see CacheNamespace.get).
+
+
+class MemoryBackend:
+    """Entries in process memory: a separate LRU per namespace, with per-entry expiry"""
+
+    shared = False
+
+    def __init__(self):
+        self._namespaces = {}  # namespace -> OrderedDict, least recently used first
+        self._maxsize = {}
+        self.evictions = {}
+        self.expirations = {}
+
+    def add_namespace(self, namespace: str, maxsize: int) -> None:
+        self._namespaces[namespace] = OrderedDict()
+        self._maxsize[namespace] = maxsize
+        self.evictions[namespace] = 0
+        self.expirations[namespace] = 0
+
+    async def get(self, namespace: str, key: str):
+        entries = self._namespaces[namespace]
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del entries[key]
+            self.expirations[namespace] += 1
+            return None
+        entries.move_to_end(key)
+        return entry
+
+    async def set(self, namespace: str, key: str, value, expires_at: float, cost: float) -> None:
+        entries = self._namespaces[namespace]
+        entries[key] = (value, expires_at, cost)
+        entries.move_to_end(key)
+        while len(entries) > self._maxsize[namespace]:
+            entries.popitem(last=False)
+            self.evictions[namespace] += 1
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._namespaces[namespace].pop(key, None)
+
+    async def clear(self, namespace: str) -> None:
+        self._namespaces[namespace].clear()
+
+    async def size(self, namespace: str) -> int:
+        return len(self._namespaces[namespace])
+
+    async def close(self) -> None:
+        pass
+
+
+SQLITE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache_entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        cost REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (namespace, expires_at)",
+)
+SQLITE_GET = "SELECT value, expires_at, cost FROM cache_entries WHERE namespace = ? AND key = ?"
+SQLITE_SET = """
+    INSERT INTO cache_entries (namespace, key, value, expires_at, cost) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(namespace, key) DO UPDATE SET
+        value = excluded.value, expires_at = excluded.expires_at, cost = excluded.cost
+"""
+SQLITE_DELETE = "DELETE FROM cache_entries WHERE namespace = ? AND key = ?"
+SQLITE_CLEAR = "DELETE FROM cache_entries WHERE namespace = ?"
+SQLITE_COUNT = "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?"
+SQLITE_EXPIRE = "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?"
+# Over the size limit, the entries closest to expiring go first
+SQLITE_TRIM = """
+    DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+        SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at LIMIT ?
+    )
+"""
+
+
+class SQLiteBackend:
+    """Entries in a SQLite file of their own, shared by every process on the host.
+
+    Reads do not write, so there is no exact LRU order: every ``trim_every``
+    sets to a namespace, expired entries are deleted and, past the
+    namespace's size, those closest to expiry are evicted.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, trim_every: int = 100):
+        self.path = sqlite_path_from_url(url)
+        self.trim_every = trim_every
+        self._conn = None
+        self._connect_lock = asyncio.Lock()
+        self._maxsize = {}
+        self._sets = {}
+        self.evictions = {}
+        self.expirations = {}
+
+    def add_namespace(self, namespace: str, maxsize: int) -> None:
+        self._maxsize[namespace] = maxsize
+        self._sets[namespace] = 0
+        self.evictions[namespace] = 0
+        self.expirations[namespace] = 0
+
+    async def _connection(self) -> aiosqlite.Connection:
+        async with self._connect_lock:
+            if self._conn is None:
+                if self.path != ":memory:":
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = aiosqlite.connect(self.path, isolation_level=None)
+                conn.daemon = True
+                await conn
+                for statement in ("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL",
+                                  "PRAGMA busy_timeout = 5000") + SQLITE_SCHEMA:
+                    await conn.execute(statement)
+                self._conn = conn
+            return self._conn
+
+    async def get(self, namespace: str, key: str):
+        conn = await self._connection()
+        rows = await conn.execute_fetchall(SQLITE_GET, (namespace, key))
+        if not rows or rows[0][1] <= time.time():
+            return None
+        value, expires_at, cost = rows[0]
+        return json.loads(value), expires_at, cost
+
+    async def set(self, namespace: str, key: str, value, expires_at: float, cost: float) -> None:
+        conn = await self._connection()
+        await conn.execute(SQLITE_SET, (namespace, key, json.dumps(value, ensure_ascii=False), expires_at, cost))
+        self._sets[namespace] += 1
+        if self._sets[namespace] % self.trim_every == 0:
+            await self._trim(conn, namespace)
+
+    async def _trim(self, conn: aiosqlite.Connection, namespace: str) -> None:
+        cursor = await conn.execute(SQLITE_EXPIRE, (namespace, time.time()))
+        self.expirations[namespace] += cursor.rowcount
+        (count,), = await conn.execute_fetchall(SQLITE_COUNT, (namespace,))
+        excess = count - self._maxsize[namespace]
+        if excess > 0:
+            cursor = await conn.execute(SQLITE_TRIM, (namespace, namespace, excess))
+            self.evictions[namespace] += cursor.rowcount
+
+    async def delete(self, namespace: str, key: str) -> None:
+        conn = await self._connection()
+        await conn.execute(SQLITE_DELETE, (namespace, key))
+
+    async def clear(self, namespace: str) -> None:
+        conn = await self._connection()
+        await conn.execute(SQLITE_CLEAR, (namespace,))
+
+    async def size(self, namespace: str) -> int:
+        conn = await self._connection()
+        (count,), = await conn.execute_fetchall(SQLITE_COUNT, (namespace,))
+        return count
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+class RespBackend:
+    """Entries in Redis, or anything speaking its protocol such as app.cache.resp.RespServer.
+
+    Keys are ``<prefix><namespace>:<key>`` and expire through the server's
+    own TTLs. Each namespace also keeps its keys in a sorted set scored by
+    expiry time; as with SQLiteBackend, every ``trim_every`` sets the
+    expired members are dropped and, past the namespace's size, the keys
+    closest to expiry are evicted. Processes sharing the server trim the
+    same sets, so a namespace may briefly exceed its size.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "cache:", pool_size: int = 4, trim_every: int = 100):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self.trim_every = trim_every
+        self._pool = asyncio.Queue()
+        self._opened = 0
+        self._maxsize = {}
+        self._sets = {}
+        self.evictions = {}
+        self.expirations = {}
+
+    def add_namespace(self, namespace: str, maxsize: int) -> None:
+        self._maxsize[namespace] = maxsize
+        self._sets[namespace] = 0
+        self.evictions[namespace] = 0
+        self.expirations[namespace] = 0
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def _index(self, namespace: str) -> str:
+        """The sorted set of the namespace's keys; outside the ``_key`` pattern, so SCAN skips it"""
+        return f"{self.prefix}index:{namespace}"
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for command in setup:
+            writer.write(encode_command(*command))
+            await read_reply(reader)
+        return reader, writer
+
+    async def _command(self, *args):
+        """Send one command on a pooled connection and return the reply"""
+        reply, = await self._pipeline(args)
+        return reply
+
+    async def _pipeline(self, *commands) -> list:
+        """Send several commands in one write and return their replies"""
+        if self._pool.empty() and self._opened < self.pool_size:
+            self._opened += 1
+            try:
+                connection = await self._open()
+            except BaseException:
+                self._opened -= 1
+                raise
+        else:
+            connection = await self._pool.get()
+        reader, writer = connection
+        try:
+            writer.write(b"".join(encode_command(*args) for args in commands))
+            replies = [await read_reply(reader) for _ in commands]
+        except BaseException:
+            # The connection may be half-way through a reply: drop it rather than reuse it
+            self._opened -= 1
+            writer.close()
+            raise
+        self._pool.put_nowait(connection)
+        return replies
+
+    async def get(self, namespace: str, key: str):
+        data = await self._command("GET", self._key(namespace, key))
+        if data is None:
+            return None
+        value, expires_at, cost = json.loads(data)
+        return value, expires_at, cost
+
+    async def set(self, namespace: str, key: str, value, expires_at: float, cost: float) -> None:
+        ttl_ms = max(1, int((expires_at - time.time()) * 1000))
+        data = json.dumps([value, expires_at, cost], ensure_ascii=False)
+        key = self._key(namespace, key)
+        await self._pipeline(("SET", key, data, "PX", ttl_ms), ("ZADD", self._index(namespace), expires_at, key))
+        self._sets[namespace] += 1
+        if self._sets[namespace] % self.trim_every == 0:
+            await self._trim(namespace)
+
+    async def _trim(self, namespace: str) -> None:
+        index = self._index(namespace)
+        expired, count = await self._pipeline(("ZREMRANGEBYSCORE", index, "-inf", time.time()), ("ZCARD", index))
+        self.expirations[namespace] += expired
+        excess = count - self._maxsize[namespace]
+        if excess > 0:
+            keys = await self._command("ZRANGE", index, 0, excess - 1)
+            if not keys:
+                return  # another process trimmed the index in the meantime; DEL needs a key
+            await self._pipeline(("DEL", *keys), ("ZREM", index, *keys))
+            self.evictions[namespace] += len(keys)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        key = self._key(namespace, key)
+        await self._pipeline(("DEL", key), ("ZREM", self._index(namespace), key))
+
+    async def _keys(self, namespace: str) -> list:
+        keys, cursor = [], b"0"
+        while True:
+            cursor, batch = await self._command("SCAN", cursor, "MATCH", self._key(namespace, "*"), "COUNT", 1000)
+            keys.extend(batch)
+            if cursor == b"0":
+                return keys
+
+    async def clear(self, namespace: str) -> None:
+        # Collected first: deleting while scanning may make the scan skip keys
+        keys = await self._keys(namespace)
+        for start in range(0, len(keys), 1000):
+            await self._command("DEL", *keys[start:start + 1000])
+        await self._command("DEL", self._index(namespace))
+
+    async def size(self, namespace: str) -> int:
+        return len(await self._keys(namespace))
+
+    async def close(self) -> None:
+        while not self._pool.empty():
+            _, writer = self._pool.get_nowait()
+            writer.close()
+        self._opened = 0
+
+
+def create_backend(kind: str, url: str):
+    """The shared backend named by CACHE_BACKEND: memory, sqlite or redis"""
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(url or "sqlite:///data/cache.db")
+    if kind in ("redis", "resp"):
+        return RespBackend(url or "redis://127.0.0.1:6379/0")
+    raise ValueError(f"Unknown CACHE_BACKEND {kind!r}: use memory, sqlite or redis")
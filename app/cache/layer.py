@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import time
+
+from app.cache.backends import MemoryBackend, create_backend
+from app.config import config
+
+try:
+    import xxhash
+except ImportError:  # Optional: pip install xxhash
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def key_hash(text: str) -> str:
+    """Short stable hash for cache keys: xxh3 if xxhash is installed, else 8-byte BLAKE2b.
+
+    Processes sharing a cache backend must agree on which one is used.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(text.encode())
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class CacheNamespace:
+    """One named cache on a backend, with its own size, TTL and counters.
+
+    Lookups refresh probabilistically before expiry (XFetch): an entry that
+    took ``cost`` seconds to compute is reported as a miss with a
+    probability that grows as expiry nears and with ``cost``, so a single
+    caller recomputes it while everyone else still gets the cached value.
+    ``get_or_set`` also lets concurrent misses for a key share one
+    computation. Backend failures are logged and treated as misses.
+    """
+
+    def __init__(self, name: str, backend, ttl: float, beta: float):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.beta = beta
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.early_refreshes = 0
+        self.sets = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def get(self, key: str, default=None):
+        try:
+            entry = await self.backend.get(self.name, key)
+        except Exception as e:
+            logger.error(f"Error reading cache '{self.name}': {e}")
+            self.errors += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at, cost = entry
+        if cost and self.beta and time.time() - cost * self.beta * math.log(1.0 - random.random()) >= expires_at:
+            self.early_refreshes += 1
+            return default
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value, ttl: float = None, cost: float = 0.0) -> None:
+        """Store ``value``; ``cost`` is how long it took to compute, in seconds"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            await self.backend.set(self.name, key, value, expires_at, cost)
+            self.sets += 1
+        except Exception as e:
+            logger.error(f"Error writing cache '{self.name}': {e}")
+            self.errors += 1
+
+    async def delete(self, key: str) -> None:
+        await self.backend.delete(self.name, key)
+
+    async def clear(self) -> None:
+        await self.backend.clear(self.name)
+
+    async def size(self) -> int:
+        return await self.backend.size(self.name)
+
+    async def single_flight(self, key: str, compute):
+        """Await ``compute()``, or the call already running for ``key``; errors reach every caller"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def get_or_set(self, key: str, compute, ttl: float = None):
+        """The cached value for ``key``, computing and storing it once on a miss.
+
+        ``compute`` is an async callable. Unlike ``get``, a cached None is
+        returned as a value, so negative results can be cached too.
+        """
+        value = await self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            started = time.monotonic()
+            value = await compute()
+            await self.set(key, value, ttl, cost=time.monotonic() - started)
+            return value
+
+        return await self.single_flight(key, load)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.early_refreshes
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "early_refreshes": self.early_refreshes,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "sets": self.sets,
+            "coalesced": self.coalesced,
+            "evictions": self.backend.evictions[self.name],
+            "expirations": self.backend.expirations[self.name],
+            "errors": self.errors,
+        }
+
+
+class CacheLayer:
+    """The application's cache namespaces, on process memory or the shared backend.
+
+    Each subsystem registers its own namespace with the size and TTL that
+    suit it. Shared namespaces use the backend chosen by CACHE_BACKEND, so
+    with sqlite or redis they are visible to every bot process; values
+    there must be JSON-serializable. Namespaces with ``shared=False`` always
+    stay in process memory and may hold any object.
+    """
+
+    def __init__(self, backend: str, url: str, beta: float):
+        self.local = MemoryBackend()
+        self.shared = self.local if backend == "memory" else create_backend(backend, url)
+        self.beta = beta
+        self._namespaces = {}
+
+    def namespace(self, name: str, maxsize: int, ttl: float, shared: bool = True) -> CacheNamespace:
+        if name in self._namespaces:
+            raise ValueError(f"Cache namespace '{name}' is already registered")
+        backend = self.shared if shared else self.local
+        backend.add_namespace(name, maxsize)
+        namespace = self._namespaces[name] = CacheNamespace(name, backend, ttl, self.beta)
+        return namespace
+
+    def stats(self) -> dict:
+        return {name: namespace.stats() for name, namespace in self._namespaces.items()}
+
+    async def close(self) -> None:
+        await self.shared.close()
+
+
+cache_layer = CacheLayer(config.cache_backend, config.cache_url, config.cache_early_refresh_beta)
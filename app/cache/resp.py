@@ -0,0 +1,251 @@
+import asyncio
+import fnmatch
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """An error reply from the server"""
+
+
+def encode_command(*args) -> bytes:
+    """A command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Read one RESP value; error replies are raised as RespError"""
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the cache server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unexpected reply type {kind!r}")
+
+
+def _encode_reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode_reply(item) for item in value)
+
+
+_WRONGTYPE = RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+
+class RespServer:
+    """A small in-memory server speaking the Redis protocol, as a local stand-in.
+
+    Implements the commands RespBackend uses (GET, SET with EX/PX, DEL,
+    SCAN, the sorted-set commands ZADD, ZREM, ZCARD, ZRANGE and
+    ZREMRANGEBYSCORE, DBSIZE, FLUSHDB, PING, INFO) so several bot processes
+    on one host can share a cache without installing Redis. Keys expire
+    lazily when read, and the least recently used key is evicted beyond
+    ``max_keys``. Sorted sets are plain dicts, sorted when ranged over.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._data = OrderedDict()  # key -> (value, expires_at or None), least recently used first
+        self._server = None
+        self._connections = {}  # handler task -> its writer
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"Cache server listening on {host}:{self.port}")
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening, then close open connections and wait for their handlers"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    command = await read_reply(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    return
+                except RespError as e:
+                    writer.write(_encode_reply(RespError(f"ERR {e}")))
+                    return
+                if not isinstance(command, list) or not command:
+                    writer.write(_encode_reply(RespError("ERR expected an array of bulk strings")))
+                    continue
+                name = command[0].decode().upper()
+                if name == "QUIT":
+                    writer.write(_encode_reply("OK"))
+                    return
+                try:
+                    reply = self.execute(name, command[1:])
+                except (ValueError, IndexError):
+                    reply = RespError(f"ERR wrong arguments for '{name.lower()}' command")
+                writer.write(_encode_reply(reply))
+                await writer.drain()
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    def _live(self, key: bytes):
+        """The entry under ``key`` unless it has expired"""
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            self.expired += 1
+            return None
+        return entry
+
+    def execute(self, name: str, args: list):
+        """Run one command and return its reply value"""
+        if name == "PING":
+            return args[0] if args else "PONG"
+        if name == "GET":
+            entry = self._live(args[0])
+            if entry is None:
+                self.misses += 1
+                return None
+            if isinstance(entry[0], dict):
+                return _WRONGTYPE
+            self.hits += 1
+            self._data.move_to_end(args[0])
+            return entry[0]
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            return sum(self._data.pop(key, None) is not None for key in args)
+        if name == "SCAN":
+            return self._scan(args)
+        if name.startswith("Z"):
+            return self._sorted_set(name, args)
+        if name == "DBSIZE":
+            for key in list(self._data):
+                self._live(key)
+            return len(self._data)
+        if name in ("FLUSHDB", "FLUSHALL"):
+            self._data.clear()
+            return "OK"
+        if name == "INFO":
+            return (f"# Stats\r\nkeyspace_hits:{self.hits}\r\nkeyspace_misses:{self.misses}\r\n"
+                    f"evicted_keys:{self.evicted}\r\nexpired_keys:{self.expired}\r\n").encode()
+        if name in ("SELECT", "CLIENT"):
+            return "OK"
+        if name == "COMMAND":
+            return []  # redis-cli asks for command docs on connect
+        return RespError(f"ERR unknown command '{name.lower()}'")
+
+    def _set(self, args: list):
+        key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+        expires_at = None
+        if b"EX" in options:
+            expires_at = time.time() + int(args[2 + options.index(b"EX") + 1])
+        elif b"PX" in options:
+            expires_at = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+        exists = self._live(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        self._store(key, value, expires_at)
+        return "OK"
+
+    def _store(self, key: bytes, value, expires_at) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+            self.evicted += 1
+
+    def _sorted_set(self, name: str, args: list):
+        entry = self._live(args[0])
+        if entry is not None and not isinstance(entry[0], dict):
+            return _WRONGTYPE
+        members = entry[0] if entry is not None else {}
+        if name == "ZADD":
+            pairs = list(zip(args[1::2], args[2::2]))
+            if not pairs or len(args) % 2 == 0:
+                raise ValueError(name)
+            added = sum(member not in members for _, member in pairs)
+            members.update((member, float(score)) for score, member in pairs)
+            self._store(args[0], members, None)
+            return added
+        if name == "ZREM":
+            removed = sum(members.pop(member, None) is not None for member in args[1:])
+            self._drop_if_empty(args[0], members)
+            return removed
+        if name == "ZCARD":
+            return len(members)
+        if name == "ZRANGE":
+            start, stop = int(args[1]), int(args[2])
+            ordered = sorted(members, key=lambda member: (members[member], member))
+            if stop < 0:
+                stop += len(ordered)
+            return ordered[max(0, start + len(ordered) if start < 0 else start):stop + 1]
+        if name == "ZREMRANGEBYSCORE":
+            low, high = float(args[1]), float(args[2])  # float() accepts "-inf" and "+inf"
+            removed = [member for member, score in members.items() if low <= score <= high]
+            for member in removed:
+                del members[member]
+            self._drop_if_empty(args[0], members)
+            return len(removed)
+        return RespError(f"ERR unknown command '{name.lower()}'")
+
+    def _drop_if_empty(self, key: bytes, members: dict) -> None:
+        """Like Redis, a sorted set goes away with its last member"""
+        if not members:
+            self._data.pop(key, None)
+
+    def _scan(self, args: list):
+        cursor = int(args[0])
+        options = [arg.upper() for arg in args[1:]]
+        pattern = args[1 + options.index(b"MATCH") + 1] if b"MATCH" in options else b"*"
+        count = int(args[1 + options.index(b"COUNT") + 1]) if b"COUNT" in options else 10
+        keys = list(self._data)[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(self._data) else 0
+        return [str(next_cursor).encode(), [key for key in keys if fnmatch.fnmatchcase(key, pattern)]]
@@ -1,10 +1,35 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_list(name: str, default: str) -> list:
+    """Read a comma-separated list from the environment"""
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+def _env_costs(name: str) -> dict:
+    """Read 'model=price,model=price' pairs (USD per 1K tokens) from the environment"""
+    costs = {}
+    for item in _env_list(name, ""):
+        model, _, price = item.rpartition("=")
+        if model:
+            costs[model.strip()] = float(price)
+    return costs
+
+
+def _env_weights(name: str) -> dict:
+    """Read 'user_id=weight,user_id=weight' pairs from the environment"""
+    weights = {}
+    for item in _env_list(name, ""):
+        user_id, _, weight = item.partition("=")
+        weights[int(user_id)] = float(weight)
+    return weights
+
+
 @dataclass
 class Config:
     # Telegram Bot
@@ -16,15 +41,120 @@ class Config:
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./logic_bot.db")
     database_driver: str = os.getenv("DATABASE_DRIVER", "aiosqlite")
+    database_readers: int = int(os.getenv("DATABASE_READERS", "4"))
+    database_pool_min: int = int(os.getenv("DATABASE_POOL_MIN", "2"))
+    database_pool_max: int = int(os.getenv("DATABASE_POOL_MAX", "10"))
+    db_flush_interval: float = float(os.getenv("DB_FLUSH_INTERVAL", "2"))
+    db_flush_batch: int = int(os.getenv("DB_FLUSH_BATCH", "500"))
+    db_flush_max_attempts: int = int(os.getenv("DB_FLUSH_MAX_ATTEMPTS", "5"))  # then a failing row is dropped
+    question_text_cache_size: int = int(os.getenv("QUESTION_TEXT_CACHE_SIZE", "10000"))
+
+    # Database maintenance (retention, archiving, vacuum)
+    maintenance_interval: float = float(os.getenv("MAINTENANCE_INTERVAL", str(24 * 3600)))
+    maintenance_batch_size: int = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+    maintenance_pause: float = float(os.getenv("MAINTENANCE_PAUSE", "0.05"))
+    maintenance_vacuum_pages: int = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "500"))
+    response_retention_days: float = float(os.getenv("RESPONSE_RETENTION_DAYS", "30"))
+    question_retention_days: float = float(os.getenv("QUESTION_RETENTION_DAYS", "90"))
+    archive_dir: str = os.getenv("ARCHIVE_DIR", "data/archive")
+
+    # Analytics export (scripts/export_analytics.py)
+    export_dir: str = os.getenv("EXPORT_DIR", "data/exports")
+    export_chunk_size: int = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
     
     # App Settings
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     
-    # Cache
-    cache_ttl: int = int(os.getenv("CACHE_TTL", "300"))
-    cache_maxsize: int = int(os.getenv("CACHE_MAXSIZE", "100"))
-    
+    # Sessions and conversation memory
+    session_timeout: int = int(os.getenv("SESSION_TIMEOUT", "1800"))
+    conversation_max_turns: int = int(os.getenv("CONVERSATION_MAX_TURNS", "6"))
+    conversation_token_budget: int = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "800"))
+    conversation_turn_tokens: int = int(os.getenv("CONVERSATION_TURN_TOKENS", "300"))
+    conversation_summary_tokens: int = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "120"))
+    conversation_summarize: bool = os.getenv("CONVERSATION_SUMMARIZE", "True").lower() == "true"
+
+    # Cache layer (app.cache): memory, sqlite or redis for the shared namespaces
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    cache_url: str = os.getenv("CACHE_URL", "")  # e.g. sqlite:///data/cache.db or redis://127.0.0.1:6379/0
+    cache_early_refresh_beta: float = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))  # 0 disables
+    # LLM answers
+    cache_ttl: int = int(os.getenv("CACHE_TTL", "3600"))
+    cache_maxsize: int = int(os.getenv("CACHE_MAXSIZE", "10000"))
+    # Results of the local engines (parsing, simplification, set evaluation)
+    route_cache_ttl: int = int(os.getenv("ROUTE_CACHE_TTL", "3600"))
+    route_cache_maxsize: int = int(os.getenv("ROUTE_CACHE_MAXSIZE", "5000"))
+    precomputed_path: str = os.getenv("PRECOMPUTED_PATH", "data/precomputed_responses.json")
+    precomputed_ttl: int = int(os.getenv("PRECOMPUTED_TTL", str(30 * 24 * 3600)))
+    precomputed_maxsize: int = int(os.getenv("PRECOMPUTED_MAXSIZE", "5000"))
+
+    # Scoring and progress
+    points_correct_answer: int = int(os.getenv("POINTS_CORRECT_ANSWER", "10"))
+    progress_cache_size: int = int(os.getenv("PROGRESS_CACHE_SIZE", "10000"))
+
+    # Telegram output
+    telegram_send_interval: float = float(os.getenv("TELEGRAM_SEND_INTERVAL", "0.5"))
+
+    # Image rendering
+    render_cache_dir: str = os.getenv("RENDER_CACHE_DIR", "data/render_cache")
+    render_cache_max_mb: int = int(os.getenv("RENDER_CACHE_MAX_MB", "100"))
+    render_workers: int = int(os.getenv("RENDER_WORKERS", "2"))
+
+    # LLM endpoint
+    llm_api_url: str = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+    # LLM scheduler
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_per_user_inflight: int = int(os.getenv("LLM_PER_USER_INFLIGHT", "1"))
+    llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "50"))
+    llm_per_user_queue: int = int(os.getenv("LLM_PER_USER_QUEUE", "3"))
+    llm_queue_timeout: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+    llm_user_weights: dict = field(default_factory=lambda: _env_weights("LLM_USER_WEIGHTS"))
+
+    # LLM retries, hedging and circuit breaker
+    llm_request_timeout: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "15"))
+    llm_total_timeout: float = float(os.getenv("LLM_TOTAL_TIMEOUT", "30"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    llm_retry_backoff: float = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+    llm_hedge_enabled: bool = os.getenv("LLM_HEDGE_ENABLED", "False").lower() == "true"
+    llm_hedge_min_samples: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    breaker_error_rate: float = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+    breaker_min_calls: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    breaker_window: float = float(os.getenv("BREAKER_WINDOW", "60"))
+    breaker_open_seconds: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+    # LLM model pool
+    llm_short_models: list = field(default_factory=lambda: _env_list(
+        "LLM_SHORT_MODELS", "mistralai/mistral-7b-instruct,meta-llama/llama-3.2-3b-instruct"))
+    llm_long_models: list = field(default_factory=lambda: _env_list(
+        "LLM_LONG_MODELS", "mistralai/mistral-7b-instruct,meta-llama/llama-3.1-8b-instruct"))
+    llm_model_costs: dict = field(default_factory=lambda: _env_costs("LLM_MODEL_COSTS"))
+    llm_long_request_chars: int = int(os.getenv("LLM_LONG_REQUEST_CHARS", "200"))
+    llm_ewma_alpha: float = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+    llm_error_penalty: float = float(os.getenv("LLM_ERROR_PENALTY", "10"))
+    llm_cost_weight: float = float(os.getenv("LLM_COST_WEIGHT", "100"))
+
+    # Prompt and token budgets
+    llm_prompt_version: str = os.getenv("LLM_PROMPT_VERSION", "v2")
+    llm_max_question_tokens: int = int(os.getenv("LLM_MAX_QUESTION_TOKENS", "400"))
+    llm_max_output_tokens: dict = field(default_factory=lambda: {
+        "short": int(os.getenv("LLM_MAX_OUTPUT_TOKENS_SHORT", "400")),
+        "long": int(os.getenv("LLM_MAX_OUTPUT_TOKENS_LONG", "1200")),
+    })
+
+    # LLM quotas (sliding window of QUOTA_WINDOW seconds)
+    quota_window: int = int(os.getenv("QUOTA_WINDOW", "3600"))
+    quota_user_requests: int = int(os.getenv("QUOTA_USER_REQUESTS", "30"))
+    quota_user_tokens: int = int(os.getenv("QUOTA_USER_TOKENS", "20000"))
+    quota_global_requests: int = int(os.getenv("QUOTA_GLOBAL_REQUESTS", "2000"))
+    quota_global_tokens: int = int(os.getenv("QUOTA_GLOBAL_TOKENS", "2000000"))
+    quota_flush_interval: int = int(os.getenv("QUOTA_FLUSH_INTERVAL", "30"))
+    quota_flush_batch: int = int(os.getenv("QUOTA_FLUSH_BATCH", "100"))
+
+    # Telegram user ids allowed to use admin commands
+    admin_user_ids: list = field(default_factory=lambda: [
+        int(user_id) for user_id in _env_list("ADMIN_USER_IDS", "")])
+
     
     def validate(self) -> None:
         """Validate configuration"""
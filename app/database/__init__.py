@@ -0,0 +1,14 @@
+# Database package initialization
+from .manager import DatabaseManager, create_database_manager, db_manager
+from .write_behind import WriteBehindQueue, write_queue
+from .maintenance import MaintenanceJob, maintenance_job
+
+__all__ = [
+    'DatabaseManager',
+    'create_database_manager',
+    'db_manager',
+    'WriteBehindQueue',
+    'write_queue',
+    'MaintenanceJob',
+    'maintenance_job',
+]
@@ -0,0 +1,231 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from app.database.manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """A table that can be exported, with its columns as ``(name, kind)`` pairs"""
+    name: str
+    columns: tuple
+
+    @property
+    def column_names(self) -> list:
+        return [name for name, _ in self.columns]
+
+
+QUESTIONS = ExportTable("questions", (
+    ("id", "int"),
+    ("user_id", "int"),
+    ("question_text", "str"),
+    ("question_type", "str"),
+    ("created_at", "time"),
+))
+USER_PROGRESS = ExportTable("user_progress", (
+    ("id", "int"),
+    ("user_id", "int"),
+    ("score", "int"),
+    ("level", "int"),
+    ("logic_correct", "int"),
+    ("set_theory_correct", "int"),
+    ("total_exercises", "int"),
+    ("updated_at", "time"),
+))
+TABLES = {table.name: table for table in (QUESTIONS, USER_PROGRESS)}
+
+# Ids skipped below the watermark are looked up again for this long; holes
+# wider than MAX_GAP come from deleted rows, not from uncommitted ones
+GAP_SECONDS = 3600
+MAX_GAP = 1000
+
+
+async def _question_pages(watermark: dict, chunk_size: int):
+    """Questions above the id watermark, and any that filled a gap since the last run.
+
+    Ids are never reused (AUTOINCREMENT, or a PostgreSQL sequence), so new
+    rows sort last even after archiving has emptied the table. On PostgreSQL,
+    though, concurrent writers can commit id N+1 before id N is visible, so
+    skipped ids are kept in the watermark as ``gaps`` and read again on each
+    run for ``GAP_SECONDS``.
+    """
+    now = int(time.time())
+    gaps = {gap_id: seen for gap_id, seen in watermark.get("gaps", []) if now - seen < GAP_SECONDS}
+    if gaps:
+        rows = await db_manager.export_questions_by_id(sorted(gaps))
+        if rows:
+            yield rows
+            for row in rows:
+                del gaps[row[0]]
+    watermark["gaps"] = sorted(gaps.items())
+
+    after_id = watermark.get("id", 0)
+    while True:
+        rows = await db_manager.export_questions(after_id, chunk_size)
+        if not rows:
+            return
+        yield rows
+        expected = after_id + 1
+        for row in rows:
+            if row[0] - expected <= MAX_GAP:
+                gaps.update((gap_id, now) for gap_id in range(expected, row[0]))
+            expected = row[0] + 1
+        after_id = watermark["id"] = rows[-1][0]
+        watermark["gaps"] = sorted(gaps.items())
+        if len(rows) < chunk_size:
+            return
+
+
+async def _progress_pages(watermark: dict, chunk_size: int):
+    """Progress rows updated since the (updated_at, id) watermark.
+
+    Rows are read only up to the start of the current second, so a row
+    updated later in the same second as the watermark is not skipped: its
+    new updated_at will be past the watermark on the next run.
+    """
+    before = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    after, after_id = watermark.get("updated_at", ""), watermark.get("id", 0)
+    while True:
+        rows = await db_manager.export_progress(after, after_id, before, chunk_size)
+        if not rows:
+            return
+        yield rows
+        after, after_id = str(rows[-1][-1]), rows[-1][0]
+        watermark.update(updated_at=after, id=after_id)
+        if len(rows) < chunk_size:
+            return
+
+
+PAGES = {"questions": _question_pages, "user_progress": _progress_pages}
+
+
+class CsvWriter:
+    extension = "csv"
+
+    def __init__(self, path: str, table: ExportTable):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(table.column_names)
+
+    def write(self, rows: list) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """One row group per page, so memory stays at one page however big the table is"""
+    extension = "parquet"
+
+    def __init__(self, path: str, table: ExportTable):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow") from e
+        types = {"int": pa.int64(), "str": pa.string(), "time": pa.timestamp("us")}
+        self._pa = pa
+        self._table = table
+        self._schema = pa.schema([(name, types[kind]) for name, kind in table.columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    @staticmethod
+    def _convert(value, kind: str):
+        if value is None or kind != "time" or isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value)  # SQLite keeps timestamps as text
+
+    def write(self, rows: list) -> None:
+        arrays = [
+            self._pa.array([self._convert(row[index], kind) for row in rows], type=self._schema.field(index).type)
+            for index, (_, kind) in enumerate(self._table.columns)
+        ]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def load_watermarks(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_watermarks(path: str, watermarks: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+async def export_table(table: ExportTable, fmt: str, output_dir: str, watermark: dict,
+                       chunk_size: int):
+    """Stream rows past ``watermark`` into a new file; returns (path, rows) or (None, 0).
+
+    Each page is a separate short read, so no read transaction stays open
+    for the whole export and writers are never held up. The file is written
+    under a ``.part`` name and renamed once complete; ``watermark`` is
+    advanced in place as pages are written.
+    """
+    writer_class = WRITERS[fmt]
+    directory = os.path.join(output_dir, table.name)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(directory, f"{table.name}-{stamp}.{writer_class.extension}")
+    part_path = f"{path}.part"
+
+    writer = None
+    exported = 0
+    try:
+        async for rows in PAGES[table.name](watermark, chunk_size):
+            if writer is None:
+                os.makedirs(directory, exist_ok=True)
+                writer = writer_class(part_path, table)
+            await asyncio.to_thread(writer.write, rows)
+            exported += len(rows)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(part_path)
+        raise
+
+    if writer is None:
+        return None, 0
+    writer.close()
+    os.replace(part_path, path)
+    return path, exported
+
+
+async def export_tables(names: list, fmt: str, output_dir: str, watermark_path: str,
+                        chunk_size: int, full: bool = False) -> dict:
+    """Export each table since its saved watermark (or from scratch with ``full``).
+
+    A table's watermark is saved only after its file is complete, so a
+    failed run is simply repeated by the next one.
+    """
+    watermarks = load_watermarks(watermark_path)
+    results = {}
+    for name in names:
+        watermark = {} if full else dict(watermarks.get(name, {}))
+        path, rows = await export_table(TABLES[name], fmt, output_dir, watermark, chunk_size)
+        results[name] = (path, rows)
+        if rows:
+            watermarks[name] = watermark
+            save_watermarks(watermark_path, watermarks)
+        logger.info(f"Exported {rows} rows from {name}" + (f" to {path}" if path else ""))
+    return results
@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from app.config import config
+from app.database.manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Tables whose planner statistics are refreshed after each run
+ANALYZE_TABLES = ("users", "questions", "question_texts", "user_progress", "cached_responses", "llm_usage")
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _cutoff(days: float) -> str:
+    """The time ``days`` ago in the format of SQLite's CURRENT_TIMESTAMP"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class MaintenanceJob:
+    """Periodic retention and compaction of the SQLite file.
+
+    Each run expires old cached responses, moves old questions to gzipped
+    JSON-lines files partitioned by day, hands free pages back with
+    incremental vacuum and refreshes planner statistics. All deletes run in
+    batches of ``batch_size`` rows with a ``pause`` in between, so the
+    writer lock is never held for long and foreground writes interleave.
+    """
+
+    def __init__(self, interval: float, batch_size: int, pause: float,
+                 response_retention_days: float, question_retention_days: float,
+                 archive_dir: str, vacuum_pages: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.response_retention_days = response_retention_days
+        self.question_retention_days = question_retention_days
+        self.archive_dir = archive_dir
+        self.vacuum_pages = vacuum_pages
+        self._task = None
+        self._lock = asyncio.Lock()
+        self.last_run = None
+
+    async def run(self) -> dict:
+        """Run every maintenance step once and return what was done"""
+        async with self._lock:
+            started = time.monotonic()
+            result = {
+                "expired_responses": await self.expire_responses(),
+                "archived_questions": await self.archive_questions(),
+                "freed_pages": await self.vacuum(),
+            }
+            await self.analyze()
+            result["seconds"] = round(time.monotonic() - started, 2)
+            self.last_run = result
+            logger.info(f"Database maintenance finished: {result}")
+            return result
+
+    async def expire_responses(self) -> int:
+        before = _cutoff(self.response_retention_days)
+        expired = 0
+        while True:
+            deleted = await db_manager.expire_cached_responses(before, self.batch_size)
+            expired += deleted
+            if deleted < self.batch_size:
+                return expired
+            await asyncio.sleep(self.pause)
+
+    async def archive_questions(self) -> int:
+        """Append old questions to the archive, then delete them from the table"""
+        before = _cutoff(self.question_retention_days)
+        archived = 0
+        while True:
+            rows = await db_manager.old_questions(before, self.batch_size)
+            if not rows:
+                return archived
+            # Written before deleting: a crash in between duplicates archive lines rather than losing rows
+            await asyncio.to_thread(self._write_archive, rows)
+            await db_manager.delete_questions([row[0] for row in rows])
+            archived += len(rows)
+            if len(rows) < self.batch_size:
+                return archived
+            await asyncio.sleep(self.pause)
+
+    def _write_archive(self, rows: list) -> None:
+        by_day = defaultdict(list)
+        for question_id, user_id, question_text, question_type, created_at in rows:
+            by_day[str(created_at)[:10]].append({
+                "id": question_id,
+                "user_id": user_id,
+                "question_text": question_text,
+                "question_type": question_type,
+                "created_at": str(created_at),
+            })
+        for day, records in by_day.items():
+            directory = os.path.join(self.archive_dir, "questions", day[:7])
+            os.makedirs(directory, exist_ok=True)
+            # Appending adds a gzip member; readers such as gzip.open and zcat see one stream
+            with gzip.open(os.path.join(directory, f"{day}.jsonl.gz"), "at", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def vacuum(self) -> int:
+        """Release free pages a few at a time; returns the number of pages freed"""
+        if db_manager.dialect != "sqlite":
+            return 0  # PostgreSQL's autovacuum takes care of it
+        if await db_manager.pragma("auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+            # Switching needs a full VACUUM, which would hold the writer for the whole rewrite
+            logger.warning("Database does not use incremental auto-vacuum, skipping vacuum; "
+                           "stop the bot and run scripts/enable_incremental_vacuum.py once")
+            return 0
+
+        free = await db_manager.pragma("freelist_count")
+        freed = 0
+        while free:
+            remaining = await db_manager.incremental_vacuum(self.vacuum_pages)
+            freed += free - remaining
+            if remaining >= free:
+                break
+            free = remaining
+            await asyncio.sleep(self.pause)
+        return freed
+
+    async def analyze(self) -> None:
+        for table in ANALYZE_TABLES:
+            await db_manager.analyze(table)
+            await asyncio.sleep(self.pause)
+
+    async def start(self) -> None:
+        """Start running maintenance every ``interval`` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run()
+            except Exception as e:
+                logger.error(f"Database maintenance failed: {e}")
+
+
+maintenance_job = MaintenanceJob(
+    interval=config.maintenance_interval,
+    batch_size=config.maintenance_batch_size,
+    pause=config.maintenance_pause,
+    response_retention_days=config.response_retention_days,
+    question_retention_days=config.question_retention_days,
+    archive_dir=config.archive_dir,
+    vacuum_pages=config.maintenance_vacuum_pages,
+)
@@ -0,0 +1,417 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import aiosqlite
+import cachetools
+
+from app.config import config
+from app.database import queries
+from app.database.texts import pack_text, question_hash, unpack_text
+from app.utils.helpers import sqlite_path_from_url
+
+logger = logging.getLogger(__name__)
+
+# Prepared statements kept per connection; every statement in queries.py fits
+STATEMENT_CACHE_SIZE = 256
+
+
+def _progress(row) -> dict:
+    score, level, logic_correct, set_theory_correct, total_exercises = row
+    return {
+        "score": score,
+        "level": level,
+        "logic_correct": logic_correct,
+        "set_theory_correct": set_theory_correct,
+        "total_exercises": total_exercises,
+    }
+
+
+def _with_text(rows: list, index: int) -> list:
+    """``rows`` with the stored question text at ``index`` unpacked"""
+    return [row[:index] + (unpack_text(row[index]),) + row[index + 1:] for row in rows]
+
+
+class DatabaseManager:
+    """Async access to the bot's SQLite database.
+
+    SQLite allows one writer at a time, so all writes go through a single
+    connection guarded by a lock, while reads are spread over a small pool
+    of read-only connections. In WAL mode readers never block the writer or
+    each other. Connections run in autocommit mode; multi-statement writes
+    use ``transaction()``.
+
+    Question texts are interned in ``question_texts``; the ids of recently
+    logged texts are cached so repeated questions cost a single insert.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, database_url: str, readers: int, text_cache_size: int):
+        self.path = sqlite_path_from_url(database_url)
+        # Private in-memory databases cannot be shared, so everything uses the writer
+        self.readers = 0 if self.path == ":memory:" else readers
+        self._writer = None
+        self._reader_pool = None
+        self._reader_connections = []
+        self._write_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
+        # Keyed by the exact text, so a repeat skips normalizing and hashing
+        self._text_ids = cachetools.LRUCache(maxsize=text_cache_size)  # text -> question_texts id
+
+    async def _open(self, pragmas: tuple) -> aiosqlite.Connection:
+        connection = aiosqlite.connect(
+            self.path,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        # Don't let a connection someone forgot to close keep the process alive
+        connection.daemon = True
+        await connection
+        for pragma in pragmas:
+            await connection.execute(pragma)
+        return connection
+
+    async def connect(self) -> None:
+        """Open the writer and reader connections; called lazily by every operation"""
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._writer = await self._open(queries.PRAGMAS)
+            self._reader_pool = asyncio.Queue()
+            for _ in range(self.readers):
+                reader = await self._open(queries.PRAGMAS + queries.READER_PRAGMAS)
+                self._reader_connections.append(reader)
+                self._reader_pool.put_nowait(reader)
+            logger.info(f"Connected to {self.path} with {self.readers} readers")
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        for reader in self._reader_connections:
+            await reader.close()
+        try:
+            # Fold the WAL back into the main file so it doesn't grow across restarts
+            await self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except aiosqlite.Error as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
+        await self._writer.close()
+        self._writer = None
+        self._reader_pool = None
+        self._reader_connections = []
+
+    @asynccontextmanager
+    async def writer(self):
+        """The writer connection, held exclusively"""
+        if self._writer is None:
+            await self.connect()
+        async with self._write_lock:
+            yield self._writer
+
+    @asynccontextmanager
+    async def transaction(self):
+        """The writer connection inside BEGIN ... COMMIT, rolled back on error"""
+        async with self.writer() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+
+    @asynccontextmanager
+    async def reader(self):
+        """A read-only connection from the pool"""
+        if self._writer is None:
+            await self.connect()
+        if not self.readers:
+            yield self._writer
+            return
+        conn = await self._reader_pool.get()
+        try:
+            yield conn
+        finally:
+            self._reader_pool.put_nowait(conn)
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> list:
+        # One round trip to the connection thread instead of execute + fetch + close
+        async with self.reader() as conn:
+            return list(await conn.execute_fetchall(sql, params))
+
+    async def _fetchone(self, sql: str, params: tuple = ()):
+        rows = await self._fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def init_db(self) -> None:
+        """Create any missing tables and indexes, migrating older layouts first"""
+        await self._migrate_question_texts()
+        await self._migrate_question_ids()
+        async with self.transaction() as conn:
+            for statement in queries.SCHEMA:
+                await conn.execute(statement)
+
+    async def _rebuild(self, conn: aiosqlite.Connection, statements: tuple) -> None:
+        """Run table-rebuilding ``statements`` in one transaction"""
+        # Rebuilding a table needs foreign keys off, and the pragma is ignored inside a transaction
+        await conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in statements:
+                    await conn.execute(statement)
+            except BaseException:
+                await conn.rollback()
+                raise
+            await conn.commit()
+        finally:
+            await conn.execute("PRAGMA foreign_keys = ON")
+
+    async def _migrate_question_texts(self) -> None:
+        """Move question texts into ``question_texts`` if ``questions`` still holds them"""
+        async with self.writer() as conn:
+            columns = {row[1] for row in await conn.execute_fetchall("PRAGMA table_info(questions)")}
+            if "question_text" not in columns:
+                return
+            logger.info("Moving question texts into question_texts")
+            await conn.create_function("question_hash", 1, question_hash, deterministic=True)
+            await conn.create_function("pack_text", 1, pack_text, deterministic=True)
+            await self._rebuild(conn, queries.MIGRATE_QUESTION_TEXTS)
+            rows = await conn.execute_fetchall("SELECT COUNT(*) FROM question_texts")
+            logger.info(f"Question texts migrated: {rows[0][0]} distinct texts")
+
+    async def _migrate_question_ids(self) -> None:
+        """Make ``questions.id`` AUTOINCREMENT so ids of archived questions are not handed out again"""
+        async with self.writer() as conn:
+            columns = await conn.execute_fetchall("PRAGMA table_info(questions)")
+            if not columns or await conn.execute_fetchall(queries.HAS_AUTOINCREMENT_QUESTIONS):
+                return
+            logger.info("Rebuilding questions with AUTOINCREMENT ids")
+            await self._rebuild(conn, queries.MIGRATE_QUESTION_IDS)
+
+    async def recreate_database(self) -> None:
+        """Drop every table and create the schema again"""
+        async with self.transaction() as conn:
+            for table in queries.TABLES:
+                await conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._text_ids.clear()
+        await self.init_db()
+
+    async def clear_database(self) -> None:
+        """Delete all rows but keep the schema"""
+        async with self.transaction() as conn:
+            for table in queries.TABLES:
+                await conn.execute(f"DELETE FROM {table}")
+            self._text_ids.clear()
+
+    # Users and progress
+
+    async def add_user(self, user_id: int, username: str = None, first_name: str = None,
+                       last_name: str = None) -> bool:
+        """Create the user and their progress row, or refresh the user's names"""
+        try:
+            async with self.transaction() as conn:
+                await conn.execute(queries.ADD_USER, (user_id, username, first_name, last_name))
+                await conn.execute(queries.INIT_PROGRESS, (user_id,))
+            return True
+        except aiosqlite.Error as e:
+            logger.error(f"Error adding user {user_id}: {e}")
+            return False
+
+    async def update_user_interaction(self, user_id: int) -> None:
+        try:
+            async with self.writer() as conn:
+                await conn.execute(queries.UPDATE_USER_INTERACTION, (user_id,))
+        except aiosqlite.Error as e:
+            logger.error(f"Error updating interaction for user {user_id}: {e}")
+
+    async def log_question(self, user_id: int, question_text: str, question_type: str = None) -> None:
+        try:
+            added = {}
+            async with self.transaction() as conn:
+                text_ids = await self._intern_texts(conn, [question_text], added)
+                await conn.execute(queries.LOG_QUESTION, (user_id, text_ids[0], question_type))
+            self._text_ids.update(added)
+        except aiosqlite.Error as e:
+            logger.error(f"Error logging question for user {user_id}: {e}")
+
+    async def _intern_texts(self, conn: aiosqlite.Connection, texts: list, added: dict) -> list:
+        """The ``question_texts`` id of each text, inserting texts not stored yet.
+
+        Ids looked up here are collected in ``added`` rather than cached
+        directly: the caller caches them once its transaction has committed,
+        since a rolled-back id may later be reused for a different text.
+        """
+        text_ids = []
+        for text in texts:
+            text_id = self._text_ids.get(text) or added.get(text)
+            if text_id is None:
+                key = question_hash(text)
+                rows = await conn.execute_fetchall(queries.INTERN_TEXT, (key, pack_text(text)))
+                if not rows:
+                    rows = await conn.execute_fetchall(queries.TEXT_ID, (key,))
+                text_id = added[text] = rows[0][0]
+            text_ids.append(text_id)
+        return text_ids
+
+    async def write_events(self, interactions: list, questions: list) -> None:
+        """Apply a batch from the write-behind queue in one transaction.
+
+        ``interactions`` holds ``(last_interaction, user_id)`` rows and
+        ``questions`` holds ``(user_id, question_text, question_type, created_at)`` rows.
+        """
+        added = {}
+        async with self.transaction() as conn:
+            if interactions:
+                await conn.executemany(queries.SET_USER_INTERACTION, interactions)
+            if questions:
+                text_ids = await self._intern_texts(conn, [row[1] for row in questions], added)
+                await conn.executemany(queries.LOG_QUESTION_AT, [
+                    (user_id, text_id, question_type, created_at)
+                    for (user_id, _, question_type, created_at), text_id in zip(questions, text_ids)
+                ])
+        self._text_ids.update(added)
+
+    async def get_recent_questions(self, user_id: int, limit: int = 20) -> list:
+        """The user's latest ``(question_text, question_type, created_at)`` rows, newest first"""
+        return _with_text(await self._fetchall(queries.RECENT_QUESTIONS, (user_id, limit)), 0)
+
+    async def top_questions(self, since: str, limit: int) -> list:
+        """``(question_text, times_asked)`` for the most repeated questions since ``since``"""
+        return _with_text(await self._fetchall(queries.TOP_QUESTIONS, (since, limit)), 0)
+
+    async def get_user_progress(self, user_id: int):
+        """The user's progress as a dict, or None for an unknown user"""
+        row = await self._fetchone(queries.GET_USER_PROGRESS, (user_id,))
+        return _progress(row) if row else None
+
+    async def record_answer(self, user_id: int, points: int, logic_correct: int = 0,
+                            set_theory_correct: int = 0) -> dict:
+        """Add one answered exercise to the user's progress and return the new totals"""
+        async with self.writer() as conn:
+            rows = await conn.execute_fetchall(
+                queries.RECORD_ANSWER, (user_id, points, logic_correct, set_theory_correct)
+            )
+        return _progress(rows[0])
+
+    async def set_level(self, user_id: int, level: int) -> None:
+        async with self.writer() as conn:
+            await conn.execute(queries.SET_LEVEL, (level, user_id))
+
+    async def load_scores(self) -> list:
+        """``(user_id, score)`` for every user with progress"""
+        return await self._fetchall(queries.LOAD_SCORES)
+
+    # Maintenance
+
+    async def expire_cached_responses(self, before: str, limit: int) -> int:
+        """Delete up to ``limit`` cached responses created before ``before``"""
+        async with self.writer() as conn:
+            cursor = await conn.execute(queries.EXPIRE_CACHED_RESPONSES, (before, limit))
+            return cursor.rowcount
+
+    async def old_questions(self, before: str, limit: int) -> list:
+        return _with_text(await self._fetchall(queries.OLD_QUESTIONS, (before, limit)), 2)
+
+    async def delete_questions(self, ids: list) -> None:
+        """Delete questions, and their texts where no other question uses them"""
+        async with self.transaction() as conn:
+            text_ids = await conn.execute_fetchall(queries.QUESTION_TEXT_IDS, (json.dumps(ids),))
+            await conn.executemany(queries.DELETE_QUESTION, [(question_id,) for question_id in ids])
+            cursor = await conn.execute(queries.DELETE_UNUSED_TEXTS, (json.dumps([row[0] for row in text_ids]),))
+            if cursor.rowcount:
+                self._text_ids.clear()
+
+    async def pragma(self, name: str):
+        """Read a single-valued pragma such as ``freelist_count``"""
+        # Through the writer: an idle reader may still report a header value cached before a VACUUM
+        async with self.writer() as conn:
+            rows = await conn.execute_fetchall(f"PRAGMA {name}")
+        return rows[0][0] if rows else None
+
+    async def enable_incremental_vacuum(self) -> None:
+        """Switch an existing database to incremental auto-vacuum; rewrites the whole file, so run it offline"""
+        async with self.writer() as conn:
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute("VACUUM")
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages to the filesystem; returns the free pages left"""
+        async with self.writer() as conn:
+            # sqlite3's execute() steps this pragma once, freeing a single page; executescript runs it to the end
+            await conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            rows = await conn.execute_fetchall("PRAGMA freelist_count")
+        return rows[0][0]
+
+    async def analyze(self, table: str) -> None:
+        async with self.writer() as conn:
+            await conn.execute(queries.ANALYZE_LIMIT)
+            await conn.execute(f"ANALYZE {table}")
+
+    # Analytics export
+
+    async def export_questions(self, after_id: int, limit: int) -> list:
+        """The next ``limit`` questions with an id above ``after_id``"""
+        return _with_text(await self._fetchall(queries.EXPORT_QUESTIONS, (after_id, limit)), 2)
+
+    async def export_questions_by_id(self, ids: list) -> list:
+        """The questions among ``ids`` that exist"""
+        return _with_text(await self._fetchall(queries.EXPORT_QUESTIONS_BY_ID, (json.dumps(ids),)), 2)
+
+    async def export_progress(self, after: str, after_id: int, before: str, limit: int) -> list:
+        """The next ``limit`` progress rows updated after ``(after, after_id)`` and before ``before``"""
+        return await self._fetchall(queries.EXPORT_PROGRESS, (after, after_id, before, limit))
+
+    # Response cache
+
+    async def get_cached_response(self, query_hash: str):
+        row = await self._fetchone(queries.GET_CACHED_RESPONSE, (query_hash,))
+        return row[0] if row else None
+
+    async def cache_response(self, query_hash: str, response_text: str) -> None:
+        async with self.writer() as conn:
+            await conn.execute(queries.CACHE_RESPONSE, (query_hash, response_text))
+
+    # LLM usage (see app.services.quota)
+
+    async def record_llm_usage(self, rows: list) -> None:
+        """Add ``(user_id, day, requests, tokens)`` rows to the daily totals"""
+        async with self.transaction() as conn:
+            await conn.executemany(queries.RECORD_LLM_USAGE, rows)
+
+    async def top_llm_consumers(self, since: str, limit: int) -> list:
+        return await self._fetchall(queries.TOP_LLM_CONSUMERS, (since, limit))
+
+    # Telegram file ids (see app.bot.media)
+
+    async def load_file_ids(self) -> list:
+        return await self._fetchall(queries.LOAD_FILE_IDS)
+
+    async def save_file_id(self, render_key: str, file_id: str, created_at: float) -> None:
+        async with self.writer() as conn:
+            await conn.execute(queries.SAVE_FILE_ID, (render_key, file_id, created_at))
+
+    async def delete_file_id(self, render_key: str) -> None:
+        async with self.writer() as conn:
+            await conn.execute(queries.DELETE_FILE_ID, (render_key,))
+
+
+def create_database_manager(database_url: str):
+    """DatabaseManager for SQLite URLs, PostgresDatabaseManager for postgresql:// ones"""
+    if database_url.startswith(("postgresql", "postgres://")):
+        # Imported here so asyncpg is only needed when PostgreSQL is configured
+        from app.database.postgres import PostgresDatabaseManager
+        return PostgresDatabaseManager(
+            database_url, min_size=config.database_pool_min, max_size=config.database_pool_max
+        )
+    return DatabaseManager(
+        database_url, readers=config.database_readers, text_cache_size=config.question_text_cache_size
+    )
+
+
+db_manager = create_database_manager(config.database_url)
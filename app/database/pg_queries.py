@@ -0,0 +1,215 @@
+# SQL used by PostgresDatabaseManager; the PostgreSQL counterparts of queries.py.
+# Timestamps are stored without a time zone, in UTC, like SQLite's CURRENT_TIMESTAMP.
+
+NOW = "(now() AT TIME ZONE 'utc')"
+
+QUESTION_TEXTS_TABLE = """CREATE TABLE IF NOT EXISTS question_texts (
+    id BIGSERIAL PRIMARY KEY,
+    text_hash BYTEA NOT NULL UNIQUE,
+    question_text TEXT NOT NULL
+)"""
+
+SCHEMA = (
+    f"""CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        username VARCHAR(100),
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        created_at TIMESTAMP DEFAULT {NOW},
+        last_interaction TIMESTAMP DEFAULT {NOW}
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_user_id ON users (user_id)",
+    """CREATE TABLE IF NOT EXISTS cached_responses (
+        id BIGSERIAL PRIMARY KEY,
+        query_hash VARCHAR(64) NOT NULL UNIQUE,
+        response_text TEXT NOT NULL,
+        created_at TIMESTAMP
+    )""",
+    # Texts are not compressed here; TOAST already compresses long values
+    QUESTION_TEXTS_TABLE,
+    """CREATE TABLE IF NOT EXISTS questions (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT REFERENCES users (user_id),
+        text_id BIGINT NOT NULL REFERENCES question_texts (id),
+        question_type VARCHAR(50),
+        created_at TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS user_progress (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL UNIQUE REFERENCES users (user_id) ON DELETE CASCADE,
+        score INTEGER NOT NULL DEFAULT 0,
+        level INTEGER NOT NULL DEFAULT 1,
+        logic_correct INTEGER NOT NULL DEFAULT 0,
+        set_theory_correct INTEGER NOT NULL DEFAULT 0,
+        total_exercises INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS llm_usage (
+        user_id BIGINT NOT NULL,
+        day VARCHAR(10) NOT NULL,
+        requests INTEGER NOT NULL DEFAULT 0,
+        tokens BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    )""",
+    """CREATE TABLE IF NOT EXISTS telegram_files (
+        render_key VARCHAR(32) PRIMARY KEY,
+        file_id TEXT NOT NULL,
+        created_at DOUBLE PRECISION NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_questions_user_created ON questions (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_created_at ON questions (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_text ON questions (text_id)",
+    "CREATE INDEX IF NOT EXISTS ix_cached_responses_created_at ON cached_responses (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_day ON llm_usage (day)",
+    "CREATE INDEX IF NOT EXISTS ix_user_progress_updated_at ON user_progress (updated_at, id)",
+)
+
+TABLES = ("user_progress", "questions", "question_texts", "cached_responses", "llm_usage", "telegram_files", "users")
+
+ADD_USER = f"""
+    INSERT INTO users (user_id, username, first_name, last_name, created_at, last_interaction)
+    VALUES ($1, $2, $3, $4, {NOW}, {NOW})
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = EXCLUDED.username,
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        last_interaction = EXCLUDED.last_interaction
+"""
+INIT_PROGRESS = f"""
+    INSERT INTO user_progress (user_id, updated_at) VALUES ($1, {NOW})
+    ON CONFLICT (user_id) DO NOTHING
+"""
+UPDATE_USER_INTERACTION = f"UPDATE users SET last_interaction = {NOW} WHERE user_id = $1"
+LOG_QUESTION = f"""
+    INSERT INTO questions (user_id, text_id, question_type, created_at)
+    VALUES ($1, $2, $3, {NOW})
+"""
+
+# Interning a batch: insert the new texts, then look up every id. Another
+# process may be inserting the same texts, so conflicts are simply skipped.
+INTERN_TEXTS = """
+    INSERT INTO question_texts (text_hash, question_text)
+    SELECT * FROM unnest($1::bytea[], $2::text[])
+    ON CONFLICT (text_hash) DO NOTHING
+"""
+TEXT_IDS = "SELECT text_hash, id FROM question_texts WHERE text_hash = ANY($1::bytea[])"
+
+# One statement for a whole batch of merged interactions
+SET_USER_INTERACTIONS = """
+    UPDATE users SET last_interaction = batch.at
+    FROM unnest($1::timestamp[], $2::bigint[]) AS batch (at, user_id)
+    WHERE users.user_id = batch.user_id
+"""
+QUESTION_COLUMNS = ("user_id", "text_id", "question_type", "created_at")
+
+RECENT_QUESTIONS = """
+    SELECT t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.user_id = $1 ORDER BY q.created_at DESC LIMIT $2
+"""
+TOP_QUESTIONS = """
+    SELECT t.question_text, top.asked FROM (
+        SELECT text_id, COUNT(*) AS asked FROM questions WHERE created_at >= $1
+        GROUP BY text_id ORDER BY asked DESC LIMIT $2
+    ) AS top JOIN question_texts t ON t.id = top.text_id
+    ORDER BY top.asked DESC
+"""
+
+GET_USER_PROGRESS = """
+    SELECT score, level, logic_correct, set_theory_correct, total_exercises
+    FROM user_progress WHERE user_id = $1
+"""
+RECORD_ANSWER = f"""
+    INSERT INTO user_progress (user_id, score, level, logic_correct, set_theory_correct, total_exercises, updated_at)
+    VALUES ($1, $2, 1, $3, $4, 1, {NOW})
+    ON CONFLICT (user_id) DO UPDATE SET
+        score = user_progress.score + EXCLUDED.score,
+        logic_correct = user_progress.logic_correct + EXCLUDED.logic_correct,
+        set_theory_correct = user_progress.set_theory_correct + EXCLUDED.set_theory_correct,
+        total_exercises = user_progress.total_exercises + 1,
+        updated_at = EXCLUDED.updated_at
+    RETURNING score, level, logic_correct, set_theory_correct, total_exercises
+"""
+SET_LEVEL = "UPDATE user_progress SET level = $1 WHERE user_id = $2"
+
+LOAD_SCORES = "SELECT user_id, score FROM user_progress"
+
+EXPIRE_CACHED_RESPONSES = """
+    DELETE FROM cached_responses WHERE id IN (
+        SELECT id FROM cached_responses WHERE created_at < $1 LIMIT $2
+    )
+"""
+OLD_QUESTIONS = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.created_at < $1 ORDER BY q.created_at, q.id LIMIT $2
+"""
+DELETE_QUESTIONS = "DELETE FROM questions WHERE id = ANY($1::bigint[]) RETURNING text_id"
+# A separate statement from DELETE_QUESTIONS: in one statement the NOT EXISTS
+# would still see the questions being deleted
+DELETE_UNUSED_TEXTS = """
+    DELETE FROM question_texts t WHERE t.id = ANY($1::bigint[])
+    AND NOT EXISTS (SELECT 1 FROM questions q WHERE q.text_id = t.id)
+"""
+
+GET_CACHED_RESPONSE = "SELECT response_text FROM cached_responses WHERE query_hash = $1"
+CACHE_RESPONSE = f"""
+    INSERT INTO cached_responses (query_hash, response_text, created_at)
+    VALUES ($1, $2, {NOW})
+    ON CONFLICT (query_hash) DO UPDATE SET
+        response_text = EXCLUDED.response_text,
+        created_at = EXCLUDED.created_at
+"""
+
+RECORD_LLM_USAGE = """
+    INSERT INTO llm_usage (user_id, day, requests, tokens) VALUES ($1, $2, $3, $4)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        requests = llm_usage.requests + EXCLUDED.requests,
+        tokens = llm_usage.tokens + EXCLUDED.tokens
+"""
+TOP_LLM_CONSUMERS = """
+    SELECT user_id, SUM(requests)::bigint, SUM(tokens)::bigint FROM llm_usage WHERE day >= $1
+    GROUP BY user_id ORDER BY 3 DESC LIMIT $2
+"""
+
+LOAD_FILE_IDS = "SELECT render_key, file_id FROM telegram_files"
+SAVE_FILE_ID = """
+    INSERT INTO telegram_files (render_key, file_id, created_at) VALUES ($1, $2, $3)
+    ON CONFLICT (render_key) DO UPDATE SET file_id = EXCLUDED.file_id, created_at = EXCLUDED.created_at
+"""
+DELETE_FILE_ID = "DELETE FROM telegram_files WHERE render_key = $1"
+
+EXPORT_QUESTIONS = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.id > $1 ORDER BY q.id LIMIT $2
+"""
+EXPORT_QUESTIONS_BY_ID = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.id = ANY($1::bigint[]) ORDER BY q.id
+"""
+EXPORT_PROGRESS = """
+    SELECT id, user_id, score, level, logic_correct, set_theory_correct, total_exercises, updated_at
+    FROM user_progress
+    WHERE (updated_at, id) > ($1, $2) AND updated_at < $3
+    ORDER BY updated_at, id LIMIT $4
+"""
+
+# Databases created before question_texts: the texts are hashed in Python,
+# mapped through a temporary table, then the old column is dropped
+HAS_QUESTION_TEXT_COLUMN = """
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'questions' AND column_name = 'question_text'
+"""
+DISTINCT_QUESTION_TEXTS = "SELECT DISTINCT question_text FROM questions"
+MIGRATE_QUESTION_TEXTS_BEGIN = (
+    QUESTION_TEXTS_TABLE,
+    "ALTER TABLE questions ADD COLUMN text_id BIGINT REFERENCES question_texts (id)",
+    "CREATE TEMPORARY TABLE text_map (question_text TEXT NOT NULL, text_id BIGINT NOT NULL) ON COMMIT DROP",
+)
+MIGRATE_QUESTION_TEXTS_END = (
+    "UPDATE questions q SET text_id = m.text_id FROM text_map m WHERE m.question_text = q.question_text",
+    "ALTER TABLE questions DROP COLUMN question_text, ALTER COLUMN text_id SET NOT NULL",
+)
@@ -0,0 +1,256 @@
+import logging
+from datetime import datetime
+
+from app.database import pg_queries as queries
+from app.database.texts import question_hash
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: str) -> datetime:
+    """Parse the ``YYYY-MM-DD HH:MM:SS`` strings the SQLite-oriented callers pass"""
+    return datetime.fromisoformat(value)
+
+
+def _progress(row) -> dict:
+    return {
+        "score": row["score"],
+        "level": row["level"],
+        "logic_correct": row["logic_correct"],
+        "set_theory_correct": row["set_theory_correct"],
+        "total_exercises": row["total_exercises"],
+    }
+
+
+class PostgresDatabaseManager:
+    """The DatabaseManager interface on PostgreSQL, through an asyncpg pool.
+
+    Lets several bot processes share one store. Queued questions are bulk
+    loaded with COPY, batched interactions are one UPDATE over unnest()ed
+    arrays, and progress and usage counters are server-side upserts.
+    Question texts are interned per batch rather than cached in process,
+    since another process's maintenance may delete a text.
+    """
+
+    dialect = "postgresql"
+
+    def __init__(self, database_url: str, min_size: int, max_size: int):
+        # asyncpg wants a plain libpq URL
+        self.dsn = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+
+    async def connect(self) -> None:
+        if self._pool is not None:
+            return
+        try:
+            import asyncpg
+        except ImportError as e:
+            raise RuntimeError("PostgreSQL support requires asyncpg: pip install asyncpg") from e
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        logger.info(f"Connected to PostgreSQL with a pool of {self.min_size}-{self.max_size} connections")
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _pool_ready(self):
+        if self._pool is None:
+            await self.connect()
+        return self._pool
+
+    async def _execute(self, sql: str, *args) -> str:
+        return await (await self._pool_ready()).execute(sql, *args)
+
+    async def _fetch(self, sql: str, *args) -> list:
+        return await (await self._pool_ready()).fetch(sql, *args)
+
+    async def _fetchrow(self, sql: str, *args):
+        return await (await self._pool_ready()).fetchrow(sql, *args)
+
+    async def init_db(self) -> None:
+        """Create any missing tables and indexes, migrating older layouts first"""
+        async with (await self._pool_ready()).acquire() as conn:
+            async with conn.transaction():
+                if await conn.fetchval(queries.HAS_QUESTION_TEXT_COLUMN):
+                    await self._migrate_question_texts(conn)
+                for statement in queries.SCHEMA:
+                    await conn.execute(statement)
+
+    async def _migrate_question_texts(self, conn, chunk_size: int = 1000) -> None:
+        """Move question texts into ``question_texts``; runs inside init_db's transaction"""
+        logger.info("Moving question texts into question_texts")
+        for statement in queries.MIGRATE_QUESTION_TEXTS_BEGIN:
+            await conn.execute(statement)
+        chunk = []
+        async for row in conn.cursor(queries.DISTINCT_QUESTION_TEXTS, prefetch=chunk_size):
+            chunk.append(row[0])
+            if len(chunk) == chunk_size:
+                await self._map_texts(conn, chunk)
+                chunk = []
+        if chunk:
+            await self._map_texts(conn, chunk)
+        for statement in queries.MIGRATE_QUESTION_TEXTS_END:
+            await conn.execute(statement)
+
+    async def _map_texts(self, conn, texts: list) -> None:
+        text_ids = await self._intern_texts(conn, texts)
+        await conn.copy_records_to_table("text_map", records=list(zip(texts, text_ids)))
+
+    async def _intern_texts(self, conn, texts: list) -> list:
+        """The ``question_texts`` id of each text, inserting texts not stored yet"""
+        keys = [question_hash(text) for text in texts]
+        # The first spelling of a question is the one stored, as with SQLite
+        first = {}
+        for key, text in zip(keys, texts):
+            first.setdefault(key, text)
+        # Sorted so concurrent batches lock the same rows in the same order
+        unique = dict(sorted(first.items()))
+        await conn.execute(queries.INTERN_TEXTS, list(unique), list(unique.values()))
+        text_ids = dict(await conn.fetch(queries.TEXT_IDS, list(unique)))
+        return [text_ids[key] for key in keys]
+
+    async def recreate_database(self) -> None:
+        """Drop every table and create the schema again"""
+        await self._execute(f"DROP TABLE IF EXISTS {', '.join(queries.TABLES)} CASCADE")
+        await self.init_db()
+
+    async def clear_database(self) -> None:
+        """Delete all rows but keep the schema"""
+        await self._execute(f"TRUNCATE {', '.join(queries.TABLES)} RESTART IDENTITY CASCADE")
+
+    # Users and progress
+
+    async def add_user(self, user_id: int, username: str = None, first_name: str = None,
+                       last_name: str = None) -> bool:
+        """Create the user and their progress row, or refresh the user's names"""
+        try:
+            async with (await self._pool_ready()).acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(queries.ADD_USER, user_id, username, first_name, last_name)
+                    await conn.execute(queries.INIT_PROGRESS, user_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error adding user {user_id}: {e}")
+            return False
+
+    async def update_user_interaction(self, user_id: int) -> None:
+        try:
+            await self._execute(queries.UPDATE_USER_INTERACTION, user_id)
+        except Exception as e:
+            logger.error(f"Error updating interaction for user {user_id}: {e}")
+
+    async def log_question(self, user_id: int, question_text: str, question_type: str = None) -> None:
+        try:
+            async with (await self._pool_ready()).acquire() as conn:
+                async with conn.transaction():
+                    text_ids = await self._intern_texts(conn, [question_text])
+                    await conn.execute(queries.LOG_QUESTION, user_id, text_ids[0], question_type)
+        except Exception as e:
+            logger.error(f"Error logging question for user {user_id}: {e}")
+
+    async def write_events(self, interactions: list, questions: list) -> None:
+        """Apply a batch from the write-behind queue in one transaction"""
+        async with (await self._pool_ready()).acquire() as conn:
+            async with conn.transaction():
+                if interactions:
+                    await conn.execute(
+                        queries.SET_USER_INTERACTIONS,
+                        [_timestamp(at) for at, _ in interactions],
+                        [user_id for _, user_id in interactions],
+                    )
+                if questions:
+                    text_ids = await self._intern_texts(conn, [row[1] for row in questions])
+                    await conn.copy_records_to_table(
+                        "questions",
+                        records=[(user_id, text_id, question_type, _timestamp(at))
+                                 for (user_id, _, question_type, at), text_id in zip(questions, text_ids)],
+                        columns=queries.QUESTION_COLUMNS,
+                    )
+
+    async def get_recent_questions(self, user_id: int, limit: int = 20) -> list:
+        rows = await self._fetch(queries.RECENT_QUESTIONS, user_id, limit)
+        return [tuple(row) for row in rows]
+
+    async def top_questions(self, since: str, limit: int) -> list:
+        return [tuple(row) for row in await self._fetch(queries.TOP_QUESTIONS, _timestamp(since), limit)]
+
+    async def get_user_progress(self, user_id: int):
+        row = await self._fetchrow(queries.GET_USER_PROGRESS, user_id)
+        return _progress(row) if row else None
+
+    async def record_answer(self, user_id: int, points: int, logic_correct: int = 0,
+                            set_theory_correct: int = 0) -> dict:
+        row = await self._fetchrow(queries.RECORD_ANSWER, user_id, points, logic_correct, set_theory_correct)
+        return _progress(row)
+
+    async def set_level(self, user_id: int, level: int) -> None:
+        await self._execute(queries.SET_LEVEL, level, user_id)
+
+    async def load_scores(self) -> list:
+        return [tuple(row) for row in await self._fetch(queries.LOAD_SCORES)]
+
+    # Maintenance; space is reclaimed by autovacuum, so there is no vacuum step here
+
+    async def expire_cached_responses(self, before: str, limit: int) -> int:
+        status = await self._execute(queries.EXPIRE_CACHED_RESPONSES, _timestamp(before), limit)
+        return int(status.split()[-1])  # "DELETE <count>"
+
+    async def old_questions(self, before: str, limit: int) -> list:
+        return [tuple(row) for row in await self._fetch(queries.OLD_QUESTIONS, _timestamp(before), limit)]
+
+    async def delete_questions(self, ids: list) -> None:
+        """Delete questions, and their texts where no other question uses them"""
+        async with (await self._pool_ready()).acquire() as conn:
+            async with conn.transaction():
+                text_ids = {row[0] for row in await conn.fetch(queries.DELETE_QUESTIONS, ids)}
+                await conn.execute(queries.DELETE_UNUSED_TEXTS, list(text_ids))
+
+    async def analyze(self, table: str) -> None:
+        await self._execute(f"ANALYZE {table}")
+
+    # Analytics export
+
+    async def export_questions(self, after_id: int, limit: int) -> list:
+        return [tuple(row) for row in await self._fetch(queries.EXPORT_QUESTIONS, after_id, limit)]
+
+    async def export_questions_by_id(self, ids: list) -> list:
+        return [tuple(row) for row in await self._fetch(queries.EXPORT_QUESTIONS_BY_ID, ids)]
+
+    async def export_progress(self, after: str, after_id: int, before: str, limit: int) -> list:
+        rows = await self._fetch(
+            queries.EXPORT_PROGRESS, _timestamp(after) if after else datetime.min, after_id, _timestamp(before), limit
+        )
+        return [tuple(row) for row in rows]
+
+    # Response cache
+
+    async def get_cached_response(self, query_hash: str):
+        row = await self._fetchrow(queries.GET_CACHED_RESPONSE, query_hash)
+        return row[0] if row else None
+
+    async def cache_response(self, query_hash: str, response_text: str) -> None:
+        await self._execute(queries.CACHE_RESPONSE, query_hash, response_text)
+
+    # LLM usage
+
+    async def record_llm_usage(self, rows: list) -> None:
+        async with (await self._pool_ready()).acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(queries.RECORD_LLM_USAGE, rows)
+
+    async def top_llm_consumers(self, since: str, limit: int) -> list:
+        return [tuple(row) for row in await self._fetch(queries.TOP_LLM_CONSUMERS, since, limit)]
+
+    # Telegram file ids
+
+    async def load_file_ids(self) -> list:
+        return [tuple(row) for row in await self._fetch(queries.LOAD_FILE_IDS)]
+
+    async def save_file_id(self, render_key: str, file_id: str, created_at: float) -> None:
+        await self._execute(queries.SAVE_FILE_ID, render_key, file_id, created_at)
+
+    async def delete_file_id(self, render_key: str) -> None:
+        await self._execute(queries.DELETE_FILE_ID, render_key)
@@ -0,0 +1,270 @@
+# SQL used by DatabaseManager. Statements are module constants so the same
+# string is passed every time and sqlite3's statement cache reuses the
+# prepared statement instead of compiling it again.
+
+PRAGMAS = (
+    # Must precede journal_mode, which writes the header of a new database;
+    # a no-op on existing files (MaintenanceJob converts those)
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # Durable at checkpoints; safe with WAL
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",  # 16 MB page cache per connection
+    "PRAGMA mmap_size = 134217728",  # 128 MB
+    "PRAGMA busy_timeout = 5000",
+)
+READER_PRAGMAS = ("PRAGMA query_only = ON",)
+
+# Each distinct question is stored once (see app.database.texts); question_text
+# holds the text, or zlib-compressed bytes for long texts
+QUESTION_TEXTS_TABLE = """CREATE TABLE IF NOT EXISTS question_texts (
+    id INTEGER NOT NULL,
+    text_hash BLOB NOT NULL,
+    question_text TEXT NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (text_hash)
+)"""
+# AUTOINCREMENT: ids are never reused, even once archiving has emptied the
+# table, so incremental exports can keep using the last exported id
+QUESTIONS_TABLE = """CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    text_id INTEGER NOT NULL,
+    question_type VARCHAR(50),
+    created_at DATETIME,
+    FOREIGN KEY(user_id) REFERENCES users (user_id),
+    FOREIGN KEY(text_id) REFERENCES question_texts (id)
+)"""
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        username VARCHAR(100),
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        created_at DATETIME,
+        last_interaction DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_user_id ON users (user_id)",
+    """CREATE TABLE IF NOT EXISTS cached_responses (
+        id INTEGER NOT NULL,
+        query_hash VARCHAR(64) NOT NULL,
+        response_text TEXT NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        UNIQUE (query_hash)
+    )""",
+    QUESTION_TEXTS_TABLE,
+    QUESTIONS_TABLE,
+    """CREATE TABLE IF NOT EXISTS user_progress (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        score INTEGER,
+        level INTEGER,
+        logic_correct INTEGER,
+        set_theory_correct INTEGER,
+        total_exercises INTEGER,
+        updated_at DATETIME,
+        PRIMARY KEY (id),
+        UNIQUE (user_id),
+        FOREIGN KEY(user_id) REFERENCES users (user_id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS llm_usage (
+        user_id INTEGER NOT NULL,
+        day VARCHAR(10) NOT NULL,
+        requests INTEGER NOT NULL DEFAULT 0,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    )""",
+    """CREATE TABLE IF NOT EXISTS telegram_files (
+        render_key VARCHAR(32) PRIMARY KEY,
+        file_id TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )""",
+    # Per-user history, and the foreign key check when a user is deleted
+    "CREATE INDEX IF NOT EXISTS ix_questions_user_created ON questions (user_id, created_at)",
+    # Retention: archiving old questions and expiring cached responses
+    "CREATE INDEX IF NOT EXISTS ix_questions_created_at ON questions (created_at)",
+    # Counting repeats, and the foreign key check when an unused text is deleted
+    "CREATE INDEX IF NOT EXISTS ix_questions_text ON questions (text_id)",
+    "CREATE INDEX IF NOT EXISTS ix_cached_responses_created_at ON cached_responses (created_at)",
+    # Usage reports over the last few days
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_day ON llm_usage (day)",
+    # Incremental progress exports
+    "CREATE INDEX IF NOT EXISTS ix_user_progress_updated_at ON user_progress (updated_at)",
+)
+
+# Child tables first so foreign keys never block the drop
+TABLES = ("user_progress", "questions", "question_texts", "cached_responses", "llm_usage", "telegram_files", "users")
+
+ADD_USER = """
+    INSERT INTO users (user_id, username, first_name, last_name, created_at, last_interaction)
+    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(user_id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        last_interaction = excluded.last_interaction
+"""
+INIT_PROGRESS = """
+    INSERT INTO user_progress (user_id, score, level, logic_correct, set_theory_correct, total_exercises, updated_at)
+    VALUES (?, 0, 1, 0, 0, 0, CURRENT_TIMESTAMP)
+    ON CONFLICT(user_id) DO NOTHING
+"""
+UPDATE_USER_INTERACTION = "UPDATE users SET last_interaction = CURRENT_TIMESTAMP WHERE user_id = ?"
+
+LOG_QUESTION = """
+    INSERT INTO questions (user_id, text_id, question_type, created_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+# Interning: returns the new id, or nothing if the text is already stored
+INTERN_TEXT = """
+    INSERT INTO question_texts (text_hash, question_text) VALUES (?, ?)
+    ON CONFLICT(text_hash) DO NOTHING RETURNING id
+"""
+TEXT_ID = "SELECT id FROM question_texts WHERE text_hash = ?"
+
+# Batched variants used by the write-behind queue, which stamps events when they happen
+SET_USER_INTERACTION = "UPDATE users SET last_interaction = ? WHERE user_id = ?"
+LOG_QUESTION_AT = """
+    INSERT INTO questions (user_id, text_id, question_type, created_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+RECENT_QUESTIONS = """
+    SELECT t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.user_id = ? ORDER BY q.created_at DESC LIMIT ?
+"""
+# Most repeated questions since a time, counted on the integer text_id. Without
+# the hint the planner walks ix_questions_text to skip the GROUP BY sort.
+TOP_QUESTIONS = """
+    SELECT t.question_text, top.asked FROM (
+        SELECT text_id, COUNT(*) AS asked FROM questions INDEXED BY ix_questions_created_at
+        WHERE created_at >= ?
+        GROUP BY text_id ORDER BY asked DESC LIMIT ?
+    ) AS top JOIN question_texts t ON t.id = top.text_id
+    ORDER BY top.asked DESC
+"""
+
+GET_USER_PROGRESS = """
+    SELECT score, level, logic_correct, set_theory_correct, total_exercises
+    FROM user_progress WHERE user_id = ?
+"""
+
+# Atomic increment for one answered exercise; the new totals come back in the same statement
+RECORD_ANSWER = """
+    INSERT INTO user_progress (user_id, score, level, logic_correct, set_theory_correct, total_exercises, updated_at)
+    VALUES (?, ?, 1, ?, ?, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT(user_id) DO UPDATE SET
+        score = score + excluded.score,
+        logic_correct = logic_correct + excluded.logic_correct,
+        set_theory_correct = set_theory_correct + excluded.set_theory_correct,
+        total_exercises = total_exercises + 1,
+        updated_at = excluded.updated_at
+    RETURNING score, level, logic_correct, set_theory_correct, total_exercises
+"""
+SET_LEVEL = "UPDATE user_progress SET level = ? WHERE user_id = ?"
+
+# Loaded whole at startup; full scans by design (see FULL_SCANS)
+LOAD_SCORES = "SELECT user_id, score FROM user_progress"
+
+GET_CACHED_RESPONSE = "SELECT response_text FROM cached_responses WHERE query_hash = ?"
+CACHE_RESPONSE = """
+    INSERT INTO cached_responses (query_hash, response_text, created_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(query_hash) DO UPDATE SET
+        response_text = excluded.response_text,
+        created_at = excluded.created_at
+"""
+
+RECORD_LLM_USAGE = """
+    INSERT INTO llm_usage (user_id, day, requests, tokens) VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id, day) DO UPDATE SET
+        requests = requests + excluded.requests,
+        tokens = tokens + excluded.tokens
+"""
+# Without the hint the planner walks the whole primary key to skip the GROUP BY sort
+TOP_LLM_CONSUMERS = """
+    SELECT user_id, SUM(requests), SUM(tokens) FROM llm_usage INDEXED BY ix_llm_usage_day
+    WHERE day >= ?
+    GROUP BY user_id ORDER BY SUM(tokens) DESC LIMIT ?
+"""
+
+LOAD_FILE_IDS = "SELECT render_key, file_id FROM telegram_files"
+SAVE_FILE_ID = "INSERT OR REPLACE INTO telegram_files (render_key, file_id, created_at) VALUES (?, ?, ?)"
+DELETE_FILE_ID = "DELETE FROM telegram_files WHERE render_key = ?"
+
+# Analytics export (see app.database.export): keyset pages, each a short read
+EXPORT_QUESTIONS = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.id > ? ORDER BY q.id LIMIT ?
+"""
+EXPORT_QUESTIONS_BY_ID = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.id IN (SELECT value FROM json_each(?)) ORDER BY q.id
+"""
+EXPORT_PROGRESS = """
+    SELECT id, user_id, score, level, logic_correct, set_theory_correct, total_exercises, updated_at
+    FROM user_progress
+    WHERE (updated_at, id) > (?, ?) AND updated_at < ?
+    ORDER BY updated_at, id LIMIT ?
+"""
+
+# Maintenance (see app.database.maintenance). Batches are keyed by rowid so each
+# DELETE touches at most LIMIT rows and holds the write lock only briefly.
+EXPIRE_CACHED_RESPONSES = """
+    DELETE FROM cached_responses WHERE id IN (
+        SELECT id FROM cached_responses WHERE created_at < ? LIMIT ?
+    )
+"""
+OLD_QUESTIONS = """
+    SELECT q.id, q.user_id, t.question_text, q.question_type, q.created_at
+    FROM questions q JOIN question_texts t ON t.id = q.text_id
+    WHERE q.created_at < ? ORDER BY q.created_at, q.id LIMIT ?
+"""
+DELETE_QUESTION = "DELETE FROM questions WHERE id = ?"
+# Ids arrive as a JSON array; texts still used by other questions are kept
+QUESTION_TEXT_IDS = "SELECT DISTINCT text_id FROM questions WHERE id IN (SELECT value FROM json_each(?))"
+DELETE_UNUSED_TEXTS = """
+    DELETE FROM question_texts WHERE id IN (SELECT value FROM json_each(?))
+    AND NOT EXISTS (SELECT 1 FROM questions WHERE questions.text_id = question_texts.id)
+"""
+ANALYZE_LIMIT = "PRAGMA analysis_limit = 1000"  # Sample indexes instead of scanning them fully
+
+# Databases created before question_texts: intern every text, then rebuild
+# questions around text_id. question_hash() and pack_text() are registered by
+# DatabaseManager for the duration of the migration.
+MIGRATE_QUESTION_TEXTS = (
+    QUESTION_TEXTS_TABLE,
+    """INSERT INTO question_texts (text_hash, question_text)
+       SELECT question_hash(question_text), pack_text(question_text) FROM questions WHERE true ORDER BY id
+       ON CONFLICT(text_hash) DO NOTHING""",
+    "ALTER TABLE questions RENAME TO questions_old",
+    QUESTIONS_TABLE,
+    """INSERT INTO questions (id, user_id, text_id, question_type, created_at)
+       SELECT q.id, q.user_id, t.id, q.question_type, q.created_at
+       FROM questions_old q JOIN question_texts t ON t.text_hash = question_hash(q.question_text)""",
+    "DROP TABLE questions_old",
+)
+
+# Databases whose questions table predates AUTOINCREMENT; copying the rows
+# with their ids also sets the table's sqlite_sequence entry. The check reads
+# the small schema table once at startup (see FULL_SCANS)
+HAS_AUTOINCREMENT_QUESTIONS = "SELECT 1 FROM sqlite_master WHERE name = 'questions' AND sql LIKE '%AUTOINCREMENT%'"
+MIGRATE_QUESTION_IDS = (
+    "ALTER TABLE questions RENAME TO questions_old",
+    QUESTIONS_TABLE,
+    """INSERT INTO questions (id, user_id, text_id, question_type, created_at)
+       SELECT id, user_id, text_id, question_type, created_at FROM questions_old WHERE true ORDER BY id""",
+    "DROP TABLE questions_old",
+)
+
+# Statements allowed to scan a whole table; scripts/check_query_plans.py fails on any other scan
+FULL_SCANS = {"LOAD_SCORES", "LOAD_FILE_IDS", "HAS_AUTOINCREMENT_QUESTIONS"}
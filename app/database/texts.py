@@ -0,0 +1,27 @@
+import hashlib
+import zlib
+
+from app.utils.cache import normalize_query
+
+# Shorter texts rarely shrink enough to be worth inflating on every read
+COMPRESS_MIN_BYTES = 512
+
+
+def question_hash(text: str) -> bytes:
+    """Key of a question in ``question_texts``; spellings that normalize alike share it"""
+    return hashlib.blake2b(normalize_query(text).encode(), digest_size=16).digest()
+
+
+def pack_text(text: str):
+    """The stored form of ``text``: zlib-compressed bytes if that is smaller, else the text"""
+    encoded = text.encode()
+    if len(encoded) < COMPRESS_MIN_BYTES:
+        return text
+    packed = zlib.compress(encoded)
+    return packed if len(packed) < len(encoded) else text
+
+
+def unpack_text(value) -> str:
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode()
+    return value
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime, timezone
+
+from app.config import config
+from app.database.manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp() -> str:
+    """Now in the format SQLite's CURRENT_TIMESTAMP uses"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Constraint violations (SQLite, or SQLSTATE class 23 from asyncpg) fail on every retry"""
+    return isinstance(error, sqlite3.IntegrityError) or str(getattr(error, "sqlstate", "")).startswith("23")
+
+
+class WriteBehindQueue:
+    """Buffers interaction and question writes off the request path.
+
+    Handlers only touch memory. A background task writes everything that
+    accumulated in one transaction, every ``flush_interval`` seconds or as
+    soon as ``flush_batch`` events are waiting. Repeated interactions by the
+    same user collapse into one update carrying the latest time.
+
+    When a batch fails, its rows are retried one by one so a single bad row
+    (say, a question from a user whose ``users`` row is missing) cannot hold
+    up the rest. Rows that violate a constraint are dropped at once; rows
+    still failing after ``max_attempts`` flushes are dropped as well.
+    """
+
+    def __init__(self, flush_interval: float, flush_batch: int, max_attempts: int):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_attempts = max_attempts
+        self._attempts = {}  # row key -> failed flushes so far
+        self._interactions = {}  # user_id -> last interaction timestamp
+        self._questions = []
+        self._flush_task = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self.events = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def touch(self, user_id: int) -> None:
+        """Record that the user interacted with the bot just now"""
+        self._interactions[user_id] = _timestamp()
+        self._added()
+
+    def log_question(self, user_id: int, question_text: str, question_type: str = None) -> None:
+        self._questions.append((user_id, question_text, question_type, _timestamp()))
+        self._added()
+
+    def _added(self) -> None:
+        self.events += 1
+        if len(self._interactions) + len(self._questions) >= self.flush_batch:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._interactions) + len(self._questions)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        async with self._flush_lock:
+            if not self._interactions and not self._questions:
+                return 0
+            interactions = [(at, user_id) for user_id, at in self._interactions.items()]
+            questions = self._questions
+            self._interactions = {}
+            self._questions = []
+            try:
+                await db_manager.write_events(interactions, questions)
+                written = len(interactions) + len(questions)
+            except asyncio.CancelledError:
+                # Put the batch back so a later flush still writes it
+                self._restore(interactions, questions)
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing {len(interactions) + len(questions)} buffered writes: {e}")
+                written = await self._write_rows(interactions, questions)
+            else:
+                for _, user_id in interactions:
+                    self._attempts.pop(("interaction", user_id), None)
+                for row in questions:
+                    self._attempts.pop(row, None)
+            self.flushes += 1
+            self.rows_written += written
+            return written
+
+    async def _write_rows(self, interactions: list, questions: list) -> int:
+        """Write a failed batch row by row; returns the number of rows written"""
+        rows = [(("interaction", user_id), [(at, user_id)], []) for at, user_id in interactions]
+        rows += [(row, [], [row]) for row in questions]
+        written = 0
+        for index, (key, row_interactions, row_questions) in enumerate(rows):
+            try:
+                await db_manager.write_events(row_interactions, row_questions)
+            except Exception as e:
+                if _is_permanent(e):
+                    logger.error(f"Dropping buffered write {key}: {e}")
+                    self._attempts.pop(key, None)
+                    self.dropped += 1
+                    continue
+                # The database itself is failing: keep this row and the rest for the next flush
+                self._requeue(rows[index:])
+                return written
+            self._attempts.pop(key, None)
+            written += 1
+        return written
+
+    def _restore(self, interactions: list, questions: list) -> None:
+        for at, user_id in interactions:
+            self._interactions.setdefault(user_id, at)
+        self._questions[:0] = questions
+
+    def _requeue(self, rows: list) -> None:
+        questions = []
+        for key, row_interactions, row_questions in rows:
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts >= self.max_attempts:
+                logger.error(f"Dropping buffered write {key} after {attempts} failed flushes")
+                self._attempts.pop(key, None)
+                self.dropped += 1
+                continue
+            self._attempts[key] = attempts
+            # Newer interactions win over the failed ones
+            for at, user_id in row_interactions:
+                self._interactions.setdefault(user_id, at)
+            questions.extend(row_questions)
+        self._questions[:0] = questions
+
+    async def start(self) -> None:
+        """Start the background flush task"""
+        if self._flush_task is None:
+            self._stopping = False
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out anything still buffered.
+
+        The task is woken and awaited rather than cancelled, so a flush
+        already in progress finishes its write.
+        """
+        if self._flush_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "pending": self.pending(),
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+        }
+
+
+write_queue = WriteBehindQueue(
+    flush_interval=config.db_flush_interval,
+    flush_batch=config.db_flush_batch,
+    max_attempts=config.db_flush_max_attempts,
+)
@@ -4,6 +4,7 @@ import sys
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ConversationHandler
 
 from app.config import config
+from app.utils.cache import load_precomputed
 from app.bot import (
     start,
     main_menu,
@@ -14,6 +15,10 @@ from app.bot import (
     handle_general_question,
     cancel,
     handle_message,
+    show_llm_usage,
+    show_top_questions,
+    on_startup,
+    on_shutdown,
     MAIN_MENU,
     LOGIC_INPUT,
     SET_INPUT,
@@ -37,9 +42,21 @@ async def main():
         logger.error(f"Configuration error: {e}")
         return
     
+    # Load answers precomputed by scripts/precompute_explanations.py
+    await load_precomputed(config.precomputed_path)
     
     # Create application
-    application = Application.builder().token(config.telegram_token).build()
+    application = (
+        Application.builder()
+        .token(config.telegram_token)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    
+    # Admin commands
+    application.add_handler(CommandHandler('usage', show_llm_usage))
+    application.add_handler(CommandHandler('top_questions', show_top_questions))
     
     # Add conversation handler
     conv_handler = ConversationHandler(
@@ -1,11 +1,36 @@
 # Services package initialization
 from .parser import LogicSetParser
 from .exercise_generator import ExerciseGenerator
+from .scoring import ScoringSystem, scoring_system
+from .leaderboard import Leaderboard, leaderboard
+from .progress import ProgressService, progress_service
+from .llm_scheduler import LLMScheduler, LLMBusyError, llm_scheduler
+from .model_pool import ModelPool, model_pool
 from .llm_service import LLMService, llm_service
+from .query_router import QueryRouter, RouteResult, query_router
+from .quota import QuotaManager, quota_manager
+from .kmap import KarnaughMap, draw_kmap
 
 __all__ = [
     'LogicSetParser',
     'ExerciseGenerator',
     'ScoringSystem',
-    'llm_service'
+    'scoring_system',
+    'Leaderboard',
+    'leaderboard',
+    'ProgressService',
+    'progress_service',
+    'LLMScheduler',
+    'LLMBusyError',
+    'llm_scheduler',
+    'ModelPool',
+    'model_pool',
+    'llm_service',
+    'QueryRouter',
+    'RouteResult',
+    'query_router',
+    'QuotaManager',
+    'quota_manager',
+    'KarnaughMap',
+    'draw_kmap'
 ]
\ No newline at end of file
@@ -0,0 +1,133 @@
+import logging
+import re
+import time
+from collections import deque
+
+from app.config import config
+from app.services.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Messages that only make sense together with the previous turns. Persian words
+# may take a suffix ('مرحله‌ی') but must start a word ('هنگام' is not 'گام');
+# English words must match whole, so 'steps' or 'continued' do not count
+_FOLLOW_UP = re.compile(
+    r"(?<!\w)(?:دوباره|مجدد|بیشتر|قبلی|همین|مرحله|گام|ادامه|منظورت|یعنی چه|چرا این)"
+    r"|\b(?:again|previous|step|continue)\b",
+    re.IGNORECASE,
+)
+
+
+def is_follow_up(text: str) -> bool:
+    """Whether a message refers back to the conversation, e.g. 'explain step 2 again'"""
+    return bool(_FOLLOW_UP.search(text))
+
+
+class ConversationMemory:
+    """Bounded per-user memory of recent question/answer turns.
+
+    Each user has a ring buffer of ``(question, answer, tokens)`` tuples with
+    both texts already cut to a per-turn budget. When turns fall off the
+    buffer, their questions can be folded into a short summary.
+    Users idle for longer than the session timeout are evicted, so memory
+    stays bounded by active users.
+    """
+
+    def __init__(self, max_turns: int, token_budget: int, turn_tokens: int,
+                 summary_tokens: int, idle_seconds: float, summarize: bool = True):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.turn_tokens = turn_tokens
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.summarize = summarize
+
+        self._turns = {}
+        self._summaries = {}
+        self._last_seen = {}
+        self._writes = 0
+
+    def add_turn(self, user_id: int, question: str, answer: str) -> None:
+        question = truncate_to_tokens(question, self.turn_tokens // 4)
+        answer = truncate_to_tokens(answer, self.turn_tokens)
+        turn = (question, answer, count_tokens(question) + count_tokens(answer))
+
+        turns = self._turns.get(user_id)
+        if turns is None:
+            turns = self._turns[user_id] = deque(maxlen=self.max_turns)
+        if len(turns) == turns.maxlen:
+            self._fold_into_summary(user_id, turns[0])
+        turns.append(turn)
+        self._last_seen[user_id] = time.monotonic()
+
+        # Sweep idle users now and then instead of running a background task
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict_expired()
+
+    def history(self, user_id: int) -> list:
+        """Most recent turns as chat messages, oldest first, within the token budget"""
+        turns = self._turns.get(user_id)
+        if not turns:
+            return []
+
+        messages = []
+        used = 0
+        for question, answer, tokens in reversed(turns):
+            if used + tokens > self.token_budget:
+                break
+            messages[:0] = [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": answer},
+            ]
+            used += tokens
+
+        summary = self._summaries.get(user_id)
+        if summary and used + count_tokens(summary) <= self.token_budget:
+            messages.insert(0, {"role": "system", "content": f"Earlier in this conversation: {summary}"})
+        return messages
+
+    def clear(self, user_id: int) -> None:
+        """Forget a user's conversation, e.g. when their session expires"""
+        self._turns.pop(user_id, None)
+        self._summaries.pop(user_id, None)
+        self._last_seen.pop(user_id, None)
+
+    def evict_expired(self) -> int:
+        """Drop conversations idle for longer than the session timeout"""
+        cutoff = time.monotonic() - self.idle_seconds
+        expired = [user_id for user_id, seen in self._last_seen.items() if seen < cutoff]
+        for user_id in expired:
+            self.clear(user_id)
+        if expired:
+            logger.debug(f"Evicted {len(expired)} idle conversations")
+        return len(expired)
+
+    def _fold_into_summary(self, user_id: int, turn: tuple) -> None:
+        """Keep the gist of a turn that is about to leave the ring buffer"""
+        if not self.summarize:
+            return
+        question = turn[0]
+        summary = self._summaries.get(user_id)
+        summary = f"{summary}; {question}" if summary else question
+        # Keep the newest part of the summary when it grows past its budget
+        while count_tokens(summary) > self.summary_tokens and "; " in summary:
+            summary = summary.split("; ", 1)[1]
+        self._summaries[user_id] = truncate_to_tokens(summary, self.summary_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._turns),
+            "turns": sum(len(turns) for turns in self._turns.values()),
+            "summaries": len(self._summaries),
+        }
+
+
+conversation_memory = ConversationMemory(
+    max_turns=config.conversation_max_turns,
+    token_budget=config.conversation_token_budget,
+    turn_tokens=config.conversation_turn_tokens,
+    summary_tokens=config.conversation_summary_tokens,
+    idle_seconds=config.session_timeout,
+    summarize=config.conversation_summarize,
+)
@@ -2,6 +2,7 @@ import random
 import logging
 from sympy import symbols, simplify_logic
 from sympy.sets import FiniteSet, Union, Intersection
+from app.services.kmap import KarnaughMap
 
 logger = logging.getLogger(__name__)
 
@@ -57,14 +58,25 @@ class ExerciseGenerator:
             ]
         
         expression = random.choice(patterns)
-        simplified = simplify_logic(eval(expression))
+        original = eval(expression)
+        simplified = simplify_logic(original)
         
-        return {
+        exercise = {
             "question": f"عبارت منطقی زیر را ساده کنید: {expression}",
             "answer": str(simplified),
             "type": "logic",
             "difficulty": difficulty
         }
+        
+        # The K-map of the original expression shows where the answer comes from
+        try:
+            kmap = KarnaughMap(original)
+            exercise["kmap"] = kmap.to_text()
+            exercise["kmap_source"] = kmap.source()
+        except ValueError as e:
+            logger.debug(f"No K-map for {expression}: {e}")
+        
+        return exercise
     
     def generate_truth_table_exercise(self, difficulty: int):
         """Generate a truth table exercise"""
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+from app.utils.cache import hash_query, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Curated concepts: key -> (keywords that identify it, question sent to the LLM)
+CONCEPTS = {
+    "de_morgan": (("دمورگان", "دی مورگان", "de morgan"), "قوانین دمورگان را با مثال توضیح بده."),
+    "distributive": (("توزیعی", "پخشی", "distributive"), "قوانین توزیعی در منطق گزاره‌ای را با مثال توضیح بده."),
+    "implication": (("شرطی", "استلزام", "implication"), "گزاره شرطی p → q و جدول درستی آن را توضیح بده."),
+    "biconditional": (("دوشرطی", "اگر و فقط اگر", "biconditional"), "گزاره دوشرطی p ↔ q را توضیح بده."),
+    "tautology": (("همانگو", "راستگو", "تاتولوژی", "tautology"), "همانگویی (تاتولوژی) و تناقض در منطق را با مثال توضیح بده."),
+    "truth_table": (("جدول درستی", "truth table"), "جدول درستی چیست و چگونه ساخته می‌شود؟"),
+    "equivalence": (("همارزی", "هم‌ارزی", "equivalence"), "همارزی منطقی دو گزاره را با مثال توضیح بده."),
+    "union": (("اجتماع", "union"), "اجتماع دو مجموعه را با مثال توضیح بده."),
+    "intersection": (("اشتراک", "intersection"), "اشتراک دو مجموعه را با مثال توضیح بده."),
+    "complement": (("مکمل", "متمم", "complement"), "مکمل یک مجموعه را با مثال توضیح بده."),
+    "difference": (("تفاضل", "difference"), "تفاضل دو مجموعه را با مثال توضیح بده."),
+    "power_set": (("مجموعه توانی", "power set"), "مجموعه توانی چیست؟ با مثال توضیح بده."),
+    "cartesian_product": (("حاصلضرب کارتزین", "حاصل‌ضرب دکارتی", "cartesian"), "حاصلضرب کارتزین دو مجموعه را با مثال توضیح بده."),
+    "subset": (("زیرمجموعه", "subset"), "زیرمجموعه و زیرمجموعه سره را با مثال توضیح بده."),
+}
+
+# A concept keyword only counts when the user asks for an explanation
+_EXPLAIN_INTENT = re.compile(r"توضیح|چیست|چیه|یعنی چه|یعنی چی|تعریف|explain|what is|define", re.IGNORECASE)
+
+
+def concept_hash(concept: str) -> str:
+    """Cache key of a curated concept explanation: the hash of its LLM question"""
+    return hash_query(CONCEPTS[concept][1])
+
+
+def match_concept(text: str) -> Optional[str]:
+    """Return the curated concept an explanation request refers to, if any"""
+    normalized = normalize_query(text)
+    if not _EXPLAIN_INTENT.search(normalized) and len(normalized.split()) > 3:
+        return None
+    for concept, (keywords, _) in CONCEPTS.items():
+        if any(keyword in normalized for keyword in keywords):
+            return concept
+    return None
+
+
+async def precompute_explanations(llm_service, questions: dict, concurrency: int = 4) -> dict:
+    """Generate answers for ``{cache_key: question}`` with at most ``concurrency`` calls in flight.
+
+    Returns ``{cache_key: {question, response, created_at}}`` for the questions
+    that got a real upstream answer; failures are logged and skipped so a
+    fallback text is never cached as an explanation.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def generate(key: str, question: str):
+        async with semaphore:
+            try:
+                response = await llm_service.complete(question)
+            except Exception as e:
+                logger.warning(f"Could not precompute '{question[:40]}': {e}")
+                return
+            results[key] = {"question": question, "response": response, "created_at": time.time()}
+
+    await asyncio.gather(*(generate(key, question) for key, question in questions.items()))
+    return results
+
+
+def concept_questions() -> dict:
+    """Cache keys and LLM questions of all curated concepts"""
+    return {concept_hash(concept): question for concept, (_, question) in CONCEPTS.items()}
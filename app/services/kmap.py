@@ -0,0 +1,211 @@
+import json
+from functools import lru_cache
+from io import BytesIO
+
+from sympy import And, Not, Or, pretty, simplify_logic
+from sympy.logic.boolalg import BooleanFalse, BooleanTrue
+
+from app.utils.render import RenderStyle, load_font
+
+MIN_VARIABLES = 2
+MAX_VARIABLES = 6
+
+# Outline colours of the groups, reused in order
+GROUP_COLORS = [
+    (214, 39, 40), (31, 119, 180), (44, 160, 44), (255, 127, 14),
+    (148, 103, 189), (140, 86, 75), (227, 119, 194), (23, 190, 207),
+]
+
+CELL_SIZE = 56
+MARGIN_LEFT = 90
+MARGIN_TOP = 70
+
+
+def _gray(bits: int) -> list:
+    return [i ^ (i >> 1) for i in range(2 ** bits)]
+
+
+def _runs(positions: list) -> list:
+    """Split sorted grid positions into contiguous (first, last) runs"""
+    runs = []
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1][1] = position
+        else:
+            runs.append([position, position])
+    return [tuple(run) for run in runs]
+
+
+@lru_cache(maxsize=None)
+def kmap_layout(count: int) -> dict:
+    """Gray-code axes, minterm positions and the rectangles of every cube for ``count`` variables.
+
+    The first ``count // 2`` variables index the rows and the rest the
+    columns; variable 0 is the most significant bit of a minterm. A cube
+    ``(mask, value)`` covers the minterms ``m`` with ``m & mask == value``,
+    and its rectangles are precomputed for all 3**count cubes, with
+    wrap-around groups split at the map edge.
+    """
+    row_bits = count // 2
+    col_bits = count - row_bits
+    rows, cols = _gray(row_bits), _gray(col_bits)
+    row_position = {code: index for index, code in enumerate(rows)}
+    col_position = {code: index for index, code in enumerate(cols)}
+    col_mask = 2 ** col_bits - 1
+
+    cells = {m: (row_position[m >> col_bits], col_position[m & col_mask]) for m in range(2 ** count)}
+
+    rectangles = {}
+    for mask in range(2 ** count):
+        for value in range(2 ** count):
+            if value & ~mask:
+                continue
+            row_mask, row_value = mask >> col_bits, value >> col_bits
+            col_mask_, col_value = mask & col_mask, value & col_mask
+            row_runs = _runs(sorted(row_position[c] for c in rows if c & row_mask == row_value))
+            col_runs = _runs(sorted(col_position[c] for c in cols if c & col_mask_ == col_value))
+            rectangles[(mask, value)] = [(r0, r1, c0, c1) for r0, r1 in row_runs for c0, c1 in col_runs]
+
+    return {
+        "row_bits": row_bits,
+        "col_bits": col_bits,
+        "rows": rows,
+        "cols": cols,
+        "cells": cells,
+        "rectangles": rectangles,
+    }
+
+
+def _term_cube(term, variables: list):
+    """(mask, value) of a product of literals"""
+    index = {variable: len(variables) - 1 - i for i, variable in enumerate(variables)}
+    mask = value = 0
+    literals = term.args if isinstance(term, And) else (term,)
+    for literal in literals:
+        if isinstance(literal, Not):
+            mask |= 1 << index[literal.args[0]]
+        else:
+            bit = 1 << index[literal]
+            mask |= bit
+            value |= bit
+    return mask, value
+
+
+class KarnaughMap:
+    """Minterms of an expression and the prime implicants of its minimal DNF"""
+
+    def __init__(self, expr):
+        self.variables = sorted(expr.free_symbols, key=str)
+        count = len(self.variables)
+        if not MIN_VARIABLES <= count <= MAX_VARIABLES:
+            raise ValueError(f"K-maps need {MIN_VARIABLES}-{MAX_VARIABLES} variables, got {count}")
+        self.layout = kmap_layout(count)
+
+        minimal = simplify_logic(expr, form="dnf")
+        if isinstance(minimal, BooleanTrue):
+            self.terms = [minimal]
+            self.groups = [(0, 0)]
+        elif isinstance(minimal, BooleanFalse):
+            self.terms, self.groups = [], []
+        else:
+            self.terms = list(minimal.args) if isinstance(minimal, Or) else [minimal]
+            self.groups = [_term_cube(term, self.variables) for term in self.terms]
+        self.minimal = minimal
+
+        # The minimal DNF is equivalent to expr, so its cubes cover exactly the minterms
+        self.minterms = [m for m in range(2 ** count)
+                         if any(m & mask == value for mask, value in self.groups)]
+
+    def to_text(self) -> str:
+        """Unicode grid: '1' plus the letters of the groups covering a cell, '0' elsewhere"""
+        layout = self.layout
+        row_bits = layout["row_bits"]
+        names = [str(v) for v in self.variables]
+        cells = {}
+        ones = set(self.minterms)
+        for m, position in layout["cells"].items():
+            letters = "".join(chr(ord("a") + i) for i, (mask, value) in enumerate(self.groups)
+                              if m & mask == value)
+            cells[position] = f"1{letters}" if m in ones else "0"
+
+        corner = f"{''.join(names[:row_bits])}\\{''.join(names[row_bits:])}"
+        width = max(layout["col_bits"], *(len(text) for text in cells.values())) + 2
+        lines = [(corner.ljust(len(corner) + 2)
+                  + "".join(format(c, f"0{layout['col_bits']}b").ljust(width) for c in layout["cols"])).rstrip()]
+        for r, code in enumerate(layout["rows"]):
+            label = format(code, f"0{row_bits}b").ljust(len(corner) + 2)
+            lines.append((label + "".join(cells[(r, c)].ljust(width) for c in range(len(layout["cols"])))).rstrip())
+
+        lines.append("")
+        lines.append(f"Σm({', '.join(str(m) for m in self.minterms)})")
+        for i, term in enumerate(self.terms):
+            lines.append(f"{chr(ord('a') + i)}: {pretty(term, use_unicode=True)}")
+        return "\n".join(lines)
+
+    def source(self) -> str:
+        """Canonical description used as the render source of the image"""
+        return json.dumps({
+            "variables": [str(v) for v in self.variables],
+            "minterms": self.minterms,
+            "groups": [list(group) for group in self.groups],
+            "labels": [pretty(term, use_unicode=True) for term in self.terms],
+        }, ensure_ascii=False)
+
+
+def draw_kmap(source: str, style: RenderStyle) -> bytes:
+    """Render a K-map with its groups outlined, using the precomputed rectangles"""
+    from PIL import Image, ImageColor, ImageDraw
+
+    spec = json.loads(source)
+    names = spec["variables"]
+    layout = kmap_layout(len(names))
+    row_bits, col_bits = layout["row_bits"], layout["col_bits"]
+    n_rows, n_cols = len(layout["rows"]), len(layout["cols"])
+
+    legend_height = (style.fontsize + 8) * len(spec["groups"]) + 16
+    width = MARGIN_LEFT + n_cols * CELL_SIZE + 20
+    height = MARGIN_TOP + n_rows * CELL_SIZE + legend_height
+    canvas = Image.new("RGB", (width, height), ImageColor.getrgb(style.background))
+    draw = ImageDraw.Draw(canvas)
+    font = load_font(style.fontsize)
+    color = ImageColor.getrgb(style.color)
+
+    def cell_box(r: int, c: int):
+        x, y = MARGIN_LEFT + c * CELL_SIZE, MARGIN_TOP + r * CELL_SIZE
+        return x, y, x + CELL_SIZE, y + CELL_SIZE
+
+    # Axis names and Gray-code headers
+    draw.text((MARGIN_LEFT - 10, MARGIN_TOP - 40), "".join(names[:row_bits]) + " \\ " + "".join(names[row_bits:]),
+              font=font, fill=color, anchor="rm")
+    for c, code in enumerate(layout["cols"]):
+        x0, y0, x1, _ = cell_box(0, c)
+        draw.text(((x0 + x1) / 2, y0 - 14), format(code, f"0{col_bits}b"), font=font, fill=color, anchor="mm")
+    for r, code in enumerate(layout["rows"]):
+        x0, y0, _, y1 = cell_box(r, 0)
+        draw.text((x0 - 12, (y0 + y1) / 2), format(code, f"0{row_bits}b"), font=font, fill=color, anchor="rm")
+
+    ones = set(spec["minterms"])
+    for m, (r, c) in layout["cells"].items():
+        box = cell_box(r, c)
+        draw.rectangle(box, outline=color, width=1)
+        draw.text(((box[0] + box[2]) / 2, (box[1] + box[3]) / 2), "1" if m in ones else "0",
+                  font=font, fill=color if m in ones else (170, 170, 170), anchor="mm")
+
+    for index, (mask, value) in enumerate(spec["groups"]):
+        group_color = GROUP_COLORS[index % len(GROUP_COLORS)]
+        inset = 4 + 3 * (index % 4)
+        for r0, r1, c0, c1 in layout["rectangles"][(mask, value)]:
+            x0, y0, _, _ = cell_box(r0, c0)
+            _, _, x1, y1 = cell_box(r1, c1)
+            draw.rounded_rectangle((x0 + inset, y0 + inset, x1 - inset, y1 - inset),
+                                   radius=10, outline=group_color, width=3)
+
+    y = MARGIN_TOP + n_rows * CELL_SIZE + 16
+    for index, label in enumerate(spec["labels"]):
+        group_color = GROUP_COLORS[index % len(GROUP_COLORS)]
+        draw.text((MARGIN_LEFT, y), f"{chr(ord('a') + index)}: {label}", font=font, fill=group_color, anchor="lt")
+        y += style.fontsize + 8
+
+    buf = BytesIO()
+    canvas.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
@@ -0,0 +1,65 @@
+import logging
+from itertools import islice
+
+from sortedcontainers import SortedList
+
+from app.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """Scores of all users, kept ordered in memory.
+
+    Entries are ``(-score, user_id)`` in a SortedList, so an update is
+    O(log n), the top N is a slice from the front and a rank is one bisect.
+    Scores are only mirrored here: ``user_progress`` is updated atomically
+    when an answer is recorded, and the board is rebuilt from it at startup.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._ranking = SortedList()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    async def load(self) -> int:
+        """Rebuild the board from ``user_progress``"""
+        try:
+            rows = await db_manager.load_scores()
+        except Exception as e:
+            logger.error(f"Error loading leaderboard: {e}")
+            return 0
+        self._scores = {user_id: score or 0 for user_id, score in rows}
+        self._ranking = SortedList((-score, user_id) for user_id, score in self._scores.items())
+        logger.info(f"Leaderboard loaded with {len(self._scores)} users")
+        return len(self._scores)
+
+    def score(self, user_id: int) -> int:
+        return self._scores.get(user_id, 0)
+
+    def set_score(self, user_id: int, score: int) -> None:
+        """Move the user to ``score``, as just stored in ``user_progress``"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._ranking.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._ranking.add((-score, user_id))
+
+    def top(self, n: int = 10) -> list:
+        """``(user_id, score)`` of the ``n`` best users, highest first"""
+        return [(user_id, -neg_score) for neg_score, user_id in islice(self._ranking, n)]
+
+    def rank(self, user_id: int):
+        """1-based rank of the user, shared with everyone on the same score; None if unknown"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        # Entries before (-score,) are exactly the users with a higher score
+        return self._ranking.bisect_left((-score,)) + 1
+
+
+leaderboard = Leaderboard()
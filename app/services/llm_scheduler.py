@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBusyError(Exception):
+    """Raised when a request cannot be admitted or waited too long in the queue"""
+
+    def __init__(self, position: int):
+        super().__init__(f"LLM scheduler is busy (queue position {position})")
+        self.position = position
+
+
+@dataclass
+class _Waiter:
+    user_id: int
+    start_tag: float
+    finish_tag: float
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class LLMScheduler:
+    """Bounds concurrent LLM calls and shares capacity fairly between users.
+
+    A request starts immediately when a global slot is free and its user is
+    below the per-user in-flight limit. Otherwise it is queued and dispatched
+    by weighted fair queuing: every request gets a virtual finish tag and the
+    eligible request with the smallest tag runs next, so a user who floods the
+    bot only delays their own messages. A user with weight 2 gets twice the
+    share of a queued user with the default weight of 1.
+    """
+
+    def __init__(self, max_concurrency: int, per_user_inflight: int,
+                 max_queue: int, per_user_queue: int, queue_timeout: float,
+                 weights: dict = None):
+        self.max_concurrency = max_concurrency
+        self.per_user_inflight = per_user_inflight
+        self.max_queue = max_queue
+        self.per_user_queue = per_user_queue
+        self.queue_timeout = queue_timeout
+
+        self._inflight = 0
+        self._user_inflight = defaultdict(int)
+        self._queues: dict[int, deque] = {}
+        self._last_finish: dict[int, float] = {}
+        self._weights: dict[int, float] = {}
+        self._virtual_time = 0.0
+        for user_id, weight in (weights or {}).items():
+            self.set_weight(user_id, weight)
+
+        # Metrics
+        self._wait_times = deque(maxlen=1000)
+        self._max_queue_depth = 0
+        self._counters = defaultdict(int)
+
+    def set_weight(self, user_id: int, weight: float) -> None:
+        """Give a user a larger (or smaller) share of the queue"""
+        self._weights[user_id] = max(weight, 0.01)
+
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a slot"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def run(self, user_id: Optional[int], func: Callable[[], Awaitable],
+                  on_queued: Optional[Callable[[int], Awaitable]] = None):
+        """Run ``func`` once the scheduler grants a slot to ``user_id``"""
+        user_id = user_id or 0
+        await self._acquire(user_id, on_queued)
+        try:
+            return await func()
+        finally:
+            self._release(user_id)
+
+    async def _acquire(self, user_id: int, on_queued) -> None:
+        if self._has_capacity(user_id):
+            self._grant(user_id)
+            self._wait_times.append(0.0)
+            self._counters["immediate"] += 1
+            return
+
+        depth = self.queue_depth()
+        user_depth = len(self._queues.get(user_id, ()))
+        if depth >= self.max_queue or user_depth >= self.per_user_queue:
+            self._counters["rejected"] += 1
+            raise LLMBusyError(depth + 1)
+
+        waiter = self._enqueue(user_id)
+        position = self._position(waiter)
+        self._counters["queued"] += 1
+        if on_queued is not None:
+            try:
+                await on_queued(position)
+            except Exception as e:
+                logger.warning(f"Queue notification failed: {e}")
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                # Granted at the same moment the timeout fired; keep the slot
+                return
+            self._remove(waiter)
+            self._counters["timed_out"] += 1
+            raise LLMBusyError(self._position(waiter))
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self._release(user_id)
+            else:
+                self._remove(waiter)
+            raise
+
+    def _has_capacity(self, user_id: int) -> bool:
+        return (self._inflight < self.max_concurrency
+                and self._user_inflight.get(user_id, 0) < self.per_user_inflight)
+
+    def _grant(self, user_id: int) -> None:
+        self._inflight += 1
+        self._user_inflight[user_id] += 1
+
+    def _release(self, user_id: int) -> None:
+        self._inflight -= 1
+        self._user_inflight[user_id] -= 1
+        if self._user_inflight[user_id] <= 0:
+            del self._user_inflight[user_id]
+        self._dispatch()
+
+    def _enqueue(self, user_id: int) -> _Waiter:
+        weight = self._weights.get(user_id, 1.0)
+        start_tag = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+        finish_tag = start_tag + 1.0 / weight
+        self._last_finish[user_id] = finish_tag
+
+        waiter = _Waiter(user_id, start_tag, finish_tag,
+                         asyncio.get_running_loop().create_future())
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._max_queue_depth = max(self._max_queue_depth, self.queue_depth())
+        return waiter
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.user_id]
+
+    def _position(self, waiter: _Waiter) -> int:
+        """1-based position of a waiter in dispatch order"""
+        ahead = sum(
+            1 for queue in self._queues.values() for other in queue
+            if other is not waiter and other.finish_tag <= waiter.finish_tag
+        )
+        return ahead + 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the eligible waiters with the smallest finish tags"""
+        while self._inflight < self.max_concurrency and self._queues:
+            best = None
+            for user_id, queue in self._queues.items():
+                if self._user_inflight.get(user_id, 0) >= self.per_user_inflight:
+                    continue
+                head = queue[0]
+                if best is None or head.finish_tag < best.finish_tag:
+                    best = head
+            if best is None:
+                return
+
+            self._remove(best)
+            self._virtual_time = max(self._virtual_time, best.start_tag)
+            self._grant(best.user_id)
+            self._wait_times.append(time.monotonic() - best.enqueued_at)
+            best.future.set_result(None)
+
+        if not self._queues:
+            # Idle: forget old finish tags so they cannot grow without bound
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+
+    def stats(self) -> dict:
+        """Queue depth, wait-time and admission metrics"""
+        waits = sorted(self._wait_times)
+        if waits:
+            mean_wait = sum(waits) / len(waits)
+            p95_wait = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        else:
+            mean_wait = p95_wait = 0.0
+        return {
+            "inflight": self._inflight,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self._max_queue_depth,
+            "waiting_users": len(self._queues),
+            "wait_mean_s": round(mean_wait, 3),
+            "wait_p95_s": round(p95_wait, 3),
+            "wait_max_s": round(waits[-1], 3) if waits else 0.0,
+            "immediate": self._counters["immediate"],
+            "queued": self._counters["queued"],
+            "rejected": self._counters["rejected"],
+            "timed_out": self._counters["timed_out"],
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=config.llm_max_concurrency,
+    per_user_inflight=config.llm_per_user_inflight,
+    max_queue=config.llm_max_queue,
+    per_user_queue=config.llm_per_user_queue,
+    queue_timeout=config.llm_queue_timeout,
+    weights=config.llm_user_weights,
+)
@@ -1,8 +1,22 @@
 import logging
 import os
 import asyncio
+import time
 import httpx
+from app.cache import cache_layer
 from app.config import config
+from app.services.llm_scheduler import llm_scheduler, LLMBusyError
+from app.services.model_pool import model_pool, classify_request
+from app.services.prompts import build_messages
+from app.services.quota import quota_manager
+from app.services.tokens import UsageStats, count_message_tokens, truncate_to_tokens
+from app.utils.cache import answer_cache, hash_query, normalize_query, store_local_response
+from app.services.resilience import (
+    CircuitOpenError,
+    RETRYABLE_STATUSES,
+    backoff_delay,
+    first_successful,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +26,141 @@ class LLMService:
         if not api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is not set")
         self.api_key = api_key
-        self.model = "mistralai/mistral-7b-instruct"  # You can change to other OpenRouter models
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.pool = model_pool  # Models are configured with LLM_SHORT_MODELS / LLM_LONG_MODELS
+        self.api_url = config.llm_api_url  # Override with OPENROUTER_API_URL, e.g. scripts/mock_openrouter.py
+        self.usage = UsageStats()
+        self._client = None
 
-    async def get_response(self, text: str) -> str:
-        """Get response from OpenRouter API via HTTP."""
-        prompt = self._create_prompt(text)
+    async def get_response(self, text: str, user_id: int = None, on_queued=None,
+                           history: list = None) -> str:
+        """Get response from OpenRouter API, admitted through the LLM scheduler.
+
+        ``history`` holds earlier turns of the conversation as chat messages.
+        """
+        response, _ = await self.get_reply(text, user_id, on_queued, history)
+        return response
+
+    async def get_reply(self, text: str, user_id: int = None, on_queued=None,
+                        history: list = None) -> tuple:
+        """Like ``get_response``, as ``(response, answered)``.
+
+        ``answered`` is False when the response is a quota, busy or fallback
+        text rather than an answer from a model.
+        """
+        if not quota_manager.allow(user_id):
+            logger.info(f"User {user_id} is over the LLM quota, serving fallback response")
+            return self.get_quota_response(text), False
+        if not self.pool.candidates(classify_request(text)):
+            logger.info("All model circuits are open, serving fallback response")
+            return self.get_fallback_response(text), False
+        try:
+            response = await llm_scheduler.run(
+                user_id, lambda: self._shared_request(text, history, user_id), on_queued=on_queued
+            )
+            return response, True
+        except LLMBusyError as e:
+            logger.warning(f"LLM request from user {user_id} not admitted: {e}")
+            return self.get_busy_response(), False
+        except CircuitOpenError:
+            logger.info("Model circuits opened during retries, serving fallback response")
+            return self.get_fallback_response(text), False
+        except Exception as e:
+            logger.error(f"Error calling OpenRouter API: {e}")
+            return self.get_fallback_response(text), False
+
+    async def complete(self, text: str) -> str:
+        """Get an upstream answer for batch jobs: no scheduler, no fallback, errors are raised."""
+        return await self._request(text)
+
+    async def _shared_request(self, text: str, history: list = None, user_id: int = None) -> str:
+        """``_request``, with one upstream call for identical questions asked at the same time.
+
+        Every user sharing the call is charged its tokens, as if they had made it.
+        """
+        if history:
+            return await self._request(text, history, user_id)
+        result, tokens = await answer_cache.single_flight(
+            hash_query(normalize_query(text)), lambda: self._upstream(text)
+        )
+        quota_manager.record(user_id, tokens)
+        return result
+
+    async def _request(self, text: str, history: list = None, user_id: int = None) -> str:
+        """``_upstream``, charging the tokens used to the user's quota"""
+        result, tokens = await self._upstream(text, history)
+        quota_manager.record(user_id, tokens)
+        return result
+
+    async def _upstream(self, text: str, history: list = None) -> tuple:
+        """Send a chat-completions request to the best healthy model, failing over on errors.
+
+        Returns ``(answer, tokens used)``.
+        A failed attempt moves straight on to the next untried model; only when
+        every model has failed is a model retried, after an exponential backoff.
+        """
+        request_class = classify_request(text)
+        question = truncate_to_tokens(text, config.llm_max_question_tokens)
+        version = config.llm_prompt_version
+        messages = build_messages(question, version, history)
+        estimated_input = count_message_tokens(messages)
+        started = time.monotonic()
+        deadline = started + config.llm_total_timeout
+        tried = set()
+        exhausted = set()  # Models that returned a non-retryable error
+        error = None
+        attempt = 0
+        while True:
+            candidates = [h for h in self.pool.candidates(request_class) if h.name not in exhausted]
+            fresh = [h for h in candidates if h.name not in tried]
+            model = next((h.name for h in (fresh or candidates) if h.breaker.allow()), None)
+            if model is None:
+                if exhausted and not candidates:
+                    # Every model refused the request itself; no circuit is open
+                    raise error
+                raise CircuitOpenError(request_class)
+
+            try:
+                served_by, result, usage = await first_successful(
+                    self._post(model, messages, request_class),
+                    lambda: self._post(self._hedge_model(candidates, model), messages, request_class),
+                    self._hedge_delay(model),
+                )
+                entry = self.usage.record(served_by, version, estimated_input, usage, result,
+                                          truncated=question != text)
+                if not history:
+                    # Answers that depend on earlier turns are not reusable for others
+                    await store_local_response(hash_query(normalize_query(text)), result,
+                                               cost=time.monotonic() - started)
+                return result, entry["input_tokens"] + entry["output_tokens"]
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in RETRYABLE_STATUSES:
+                    exhausted.add(model)
+                retry_after = self._retry_after(e.response)
+                error = e
+            except (httpx.TransportError, KeyError, IndexError, ValueError) as e:
+                # Connection errors, timeouts and malformed responses
+                retry_after = None
+                error = e
+            tried.add(model)
+
+            attempt += 1
+            if attempt > config.llm_max_retries:
+                raise error
+            remaining = [h for h in self.pool.candidates(request_class)
+                         if h.name not in tried and h.name not in exhausted]
+            delay = 0.0 if remaining else backoff_delay(
+                attempt - 1, config.llm_retry_backoff, retry_after=retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise error
+            logger.warning(f"Model {model} failed ({error}), next attempt in {delay:.2f}s")
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def _post(self, model: str, messages: list, request_class: str):
+        """Perform one HTTP call to OpenRouter and record the outcome for ``model``.
+
+        Returns the model, the answer text and the upstream ``usage`` block.
+        """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -25,29 +168,80 @@ class LLMService:
             "X-Title": "Logic Set Bot"
         }
         payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant for mathematical logic and set theory. Always respond in Persian (Farsi)."},
-                {"role": "user", "content": prompt}
-            ]
+            "model": model,
+            "messages": messages,
+            "max_tokens": config.llm_max_output_tokens[request_class],
         }
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=config.llm_request_timeout)
+        started = time.monotonic()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.api_url, headers=headers, json=payload, timeout=60)
-                response.raise_for_status()
-                data = response.json()
-                result = data["choices"][0]["message"]["content"].strip()
-                return result
-        except Exception as e:
-            logger.error(f"Error calling OpenRouter API: {e}")
-            return "پاسخ دریافت نشد."
+            response = await self._client.post(self.api_url, headers=headers, json=payload)
+            response.raise_for_status()
+            data = response.json()
+            result = data["choices"][0]["message"]["content"].strip()
+        except (httpx.HTTPError, KeyError, IndexError, ValueError):
+            self.pool.record_failure(model)
+            raise
+        usage = data.get("usage") or {}
+        self.pool.record_success(model, time.monotonic() - started, usage.get("total_tokens", 0))
+        return model, result, usage
+
+    @staticmethod
+    def _hedge_model(candidates: list, model: str) -> str:
+        """Model for a hedged request: another one whose breaker admits a call, else ``model`` again.
+
+        Picked only when the hedge is sent, so a half-open breaker is not
+        spent on a hedge that never happens.
+        """
+        return next((h.name for h in candidates if h.name != model and h.breaker.allow()), model)
+
+    def _hedge_delay(self, model: str):
+        """Delay after which a second request is sent, or None to disable hedging"""
+        latency = self.pool.health(model).latency
+        if not config.llm_hedge_enabled or len(latency) < config.llm_hedge_min_samples:
+            return None
+        return latency.percentile(95)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response):
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def usage_stats(self) -> dict:
+        """Token usage totals, per prompt version and per model"""
+        return self.usage.summary()
+
+    def stats(self) -> dict:
+        """Upstream health: per-model statistics, token usage and scheduler metrics"""
+        return {
+            "models": self.pool.stats(),
+            "usage": self.usage.summary(),
+            "scheduler": llm_scheduler.stats(),
+            "quota": quota_manager.window_usage(),
+            "cache": cache_layer.stats(),
+        }
 
     async def close(self):
-        pass  # No session to close for OpenRouter
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_busy_response(self) -> str:
+        """For a request the scheduler turned away: it was not queued and will not be answered"""
+        return (
+            "ربات در حال حاضر شلوغ است و درخواست شما پذیرفته نشد. "
+            "لطفاً چند لحظه بعد دوباره بپرسید."
+        )
 
-    def _create_prompt(self, text: str) -> str:
-        """Create system prompt for mathematical logic with clear instructions"""
-        return f"""You are a specialized educational assistant in mathematical logic and set theory.\nRole: Mathematics and Logic Tutor\nLanguage: Persian (Farsi)\nStyle: Educational, precise, and step-by-step explanations\n\nGuidelines:\n1. Always respond in Persian (Farsi)\n2. For mathematical expressions, use standard notation (∧, ∨, ¬, →, ∪, ∩, etc.)\n3. If solving a problem, show steps clearly\n4. Use formal mathematical language when appropriate\n5. Provide examples when helpful\n\nQuestion/Task:\n{text}\n\nPlease provide a clear, educational response in Persian."""
+    def get_quota_response(self, text: str) -> str:
+        return (
+            "سهمیه استفاده شما از دستیار هوشمند فعلاً تمام شده است. "
+            "محاسبات منطقی و مجموعه‌ای همچنان در دسترس هستند.\n\n"
+            + self.get_fallback_response(text)
+        )
 
     def get_fallback_response(self, text: str) -> str:
         import re
@@ -0,0 +1,128 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import config
+from app.services.resilience import CircuitBreaker, LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+SHORT = "short"
+LONG = "long"
+
+_LONG_KEYWORDS = re.compile(
+    r"توضیح|چرا|اثبات|ثابت کن|مقایسه|گام به گام|explain|why|prove|proof|compare|step", re.IGNORECASE
+)
+
+
+def classify_request(text: str) -> str:
+    """Short factual question or long explanation"""
+    if len(text) > config.llm_long_request_chars or _LONG_KEYWORDS.search(text):
+        return LONG
+    return SHORT
+
+
+@dataclass
+class ModelHealth:
+    """Exponentially weighted health statistics of one upstream model"""
+    name: str
+    cost_per_1k: float
+    breaker: CircuitBreaker
+    latency_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    cost_ewma: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def score(self) -> float:
+        """Lower is better. Untried models get an optimistic score so they are explored."""
+        if self.latency_ewma is not None:
+            latency = self.latency_ewma
+        else:
+            # Never succeeded: untried models go first, failing ones are assumed to time out
+            latency = 0.0 if self.calls == 0 else config.llm_request_timeout
+        return (latency * (1 + config.llm_error_penalty * self.error_ewma)
+                + config.llm_cost_weight * self.cost_ewma)
+
+
+class ModelPool:
+    """Routes each request class to the healthiest configured model.
+
+    Latency, error rate and cost are tracked per model as EWMAs. Every model
+    has its own circuit breaker, so one failing free-tier model is skipped
+    while the others keep serving.
+    """
+
+    def __init__(self, models_by_class: dict, costs: dict, alpha: float):
+        self.models_by_class = models_by_class
+        self.alpha = alpha
+        self._health = {}
+        for names in models_by_class.values():
+            for name in names:
+                if name not in self._health:
+                    self._health[name] = ModelHealth(
+                        name=name,
+                        cost_per_1k=costs.get(name, 0.0),
+                        breaker=CircuitBreaker(
+                            name,
+                            error_rate=config.breaker_error_rate,
+                            min_calls=config.breaker_min_calls,
+                            window=config.breaker_window,
+                            open_seconds=config.breaker_open_seconds,
+                        ),
+                    )
+
+    def candidates(self, request_class: str) -> list:
+        """Models for this class whose circuit is not open, best first"""
+        names = self.models_by_class.get(request_class) or self.models_by_class[SHORT]
+        healthy = [self._health[name] for name in names
+                   if self._health[name].breaker.state != CircuitBreaker.OPEN]
+        # Stable sort keeps the configured order among equally scored models
+        return sorted(healthy, key=lambda health: health.score())
+
+    def health(self, name: str) -> ModelHealth:
+        return self._health[name]
+
+    def record_success(self, name: str, seconds: float, total_tokens: int = 0) -> None:
+        health = self._health[name]
+        health.calls += 1
+        health.breaker.record_success()
+        health.latency.record(seconds)
+        health.latency_ewma = self._ewma(health.latency_ewma, seconds)
+        health.error_ewma = self._ewma(health.error_ewma, 0.0)
+        health.cost_ewma = self._ewma(health.cost_ewma, total_tokens / 1000 * health.cost_per_1k)
+
+    def record_failure(self, name: str) -> None:
+        health = self._health[name]
+        health.calls += 1
+        health.failures += 1
+        health.breaker.record_failure()
+        health.error_ewma = self._ewma(health.error_ewma, 1.0)
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self.alpha * sample + (1 - self.alpha) * current
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "state": health.breaker.state,
+                "latency_ewma_s": round(health.latency_ewma, 3) if health.latency_ewma is not None else None,
+                "latency_p95_s": health.latency.percentile(95),
+                "error_ewma": round(health.error_ewma, 3),
+                "cost_ewma": round(health.cost_ewma, 6),
+                "calls": health.calls,
+                "failures": health.failures,
+            }
+            for name, health in self._health.items()
+        }
+
+
+model_pool = ModelPool(
+    models_by_class={SHORT: config.llm_short_models, LONG: config.llm_long_models},
+    costs=config.llm_model_costs,
+    alpha=config.llm_ewma_alpha,
+)
@@ -1,11 +1,62 @@
+import ast
 import re
 import logging
 from sympy import symbols, sympify, SympifyError
 from sympy.logic import simplify_logic
-from sympy.sets import FiniteSet, Union, Intersection, Complement, ProductSet
+from sympy.sets import FiniteSet
 
 logger = logging.getLogger(__name__)
 
+
+class _Biconditionals(ast.NodeTransformer):
+    """Rewrite ``a == b`` as ``Equivalent(a, b)``; evaluated, == would compare the expressions"""
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if all(isinstance(op, ast.Eq) for op in node.ops):
+            return ast.Call(ast.Name("Equivalent", ast.Load()), [node.left, *node.comparators], [])
+        return node
+
+
+def _with_biconditionals(text: str) -> str:
+    if "==" not in text:
+        return text
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError:
+        return text  # sympify reports the error
+    return ast.unparse(_Biconditionals().visit(tree))
+
+
+# Functional set spellings and the infix operator each one becomes
+_SET_FUNCTIONS = {'Union': '∪', 'Intersection': '∩', 'Complement': '\\', 'ProductSet': '×'}
+
+
+def _functional_to_infix(text: str) -> str:
+    """Rewrite calls such as ``Union(A, Intersection(B, C))`` as ``(A ∪ (B ∩ C))``"""
+    match = re.search(r'\b(Union|Intersection|Complement|ProductSet)\s*\(', text)
+    if match is None:
+        return text
+    args, depth, start = [], 0, match.end()
+    for index in range(match.end() - 1, len(text)):
+        char = text[index]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                break
+        elif char == ',' and depth == 1:
+            args.append(text[start:index])
+            start = index + 1
+    else:
+        return text  # unbalanced; the evaluator reports it
+    args.append(text[start:index])
+    operator = f" {_SET_FUNCTIONS[match.group(1)]} "
+    infix = "(" + operator.join(_functional_to_infix(arg).strip() for arg in args) + ")"
+    return text[:match.start()] + infix + _functional_to_infix(text[index + 1:])
+
+
 class LogicSetParser:
     def __init__(self):
         # Extended symbol mapping with more symbols
@@ -26,6 +77,24 @@ class LogicSetParser:
             'حاصلضرب': 'ProductSet', 'product': 'ProductSet', '×': 'ProductSet', '⊗': 'ProductSet',
         }
         
+        # Longest first, so '<->' is not read as '<' + '->' and 'اگر و فقط اگر' keeps its 'و'
+        self.replacements = sorted(self.symbols_map.items(), key=lambda item: len(item[0]), reverse=True)
+
+        # Operator words, in any case, mapped to the functional spelling they stand for
+        self.set_words = {
+            'اجتماع': 'Union', 'union': 'Union',
+            'اشتراک': 'Intersection', 'intersection': 'Intersection',
+            'مکمل': 'Complement', 'complement': 'Complement', 'تفاضل': 'Complement', 'difference': 'Complement',
+            'حاصلضرب': 'ProductSet', 'product': 'ProductSet', 'productset': 'ProductSet',
+        }
+        self.set_word_pattern = re.compile(
+            r'(?<!\w)(' + '|'.join(sorted(self.set_words, key=len, reverse=True)) + r')(?!\w)', re.IGNORECASE)
+
+        # Infix set operators mapped to the SymPy set operators
+        self.set_operators = {
+            '∪': '|', '∩': '&', '\\': '-', '×': '*',
+        }
+
         # Common sets
         self.common_sets = {
             'طبیعی': 'Naturals', 'N': 'Naturals', 'ℕ': 'Naturals',
@@ -50,7 +119,7 @@ class LogicSetParser:
             text = self.clean_input(text)
             
             # Replace all known symbols
-            for persian, english in self.symbols_map.items():
+            for persian, english in self.replacements:
                 text = text.replace(persian, english)
             
             # Extract variables from expression
@@ -61,15 +130,16 @@ class LogicSetParser:
                     variables = set(re.findall(r'\b[a-z]\b', text))
             
             # Create symbols
-            syms = symbols(' '.join(variables))
+            syms = symbols(' '.join(sorted(variables)), seq=True)
             syms_dict = {str(sym): sym for sym in syms}
             
-            # Convert to sympy expression
-            expr = sympify(text, locals=syms_dict)
+            # Convert to sympy expression; ^ is exclusive or here, not a power
+            expr = sympify(_with_biconditionals(text), locals=syms_dict, convert_xor=False)
             return expr, variables
         
         except (SympifyError, Exception) as e:
-            logger.error(f"Error parsing logical expression: {str(e)}")
+            # Most messages the router tries are not formulas, so this is routine
+            logger.debug(f"Error parsing logical expression: {str(e)}")
             raise ValueError(f"خطا در پردازش عبارت منطقی: {str(e)}")
     
     def parse_set_expression(self, text: str):
@@ -77,63 +147,77 @@ class LogicSetParser:
         try:
             # Clean the input first
             text = self.clean_input(text)
-            
-            # Replace all known symbols
-            for persian, english in self.symbols_map.items():
-                text = text.replace(persian, english)
-            
-            # Replace common sets
-            for persian, english in self.common_sets.items():
-                text = text.replace(persian, english)
-            
-            # Extract set definitions
-            set_pattern = r'([A-Z])\s*=\s*\{([^}]+)\}'
-            sets = dict(re.findall(set_pattern, text))
-            
-            # Create set objects
-            set_objects = {}
-            for name, elements in sets.items():
-                elements = [elem.strip() for elem in elements.split(',')]
-                processed_elements = []
-                
-                for elem in elements:
-                    try:
-                        # Try to convert to number
-                        if '.' in elem:
-                            processed_elements.append(float(elem))
-                        else:
-                            processed_elements.append(int(elem))
-                    except ValueError:
-                        # Keep as string if not a number
-                        processed_elements.append(elem)
-                
-                set_objects[name] = FiniteSet(*processed_elements)
-            
-            # Replace set names with their objects in the expression
-            for set_name in set_objects:
-                text = text.replace(set_name, f'set_objects["{set_name}"]')
-            
-            # Define available operations
-            operations = {
-                "Union": Union,
-                "Intersection": Intersection,
-                "Complement": Complement,
-                "ProductSet": ProductSet,
-                "set_objects": set_objects
-            }
-            
-            # Evaluate the expression
-            result = eval(text, operations)
-            return result
-        
+
+            set_objects, remaining = self.extract_set_definitions(text)
+            expression = self.select_set_expression(self.normalize_set_operators(remaining), set_objects)
+            return self.evaluate_set_expression(expression, set_objects)
+
         except Exception as e:
-            logger.error(f"Error parsing set expression: {str(e)}")
+            logger.debug(f"Error parsing set expression: {str(e)}")
             raise ValueError(f"خطا در پردازش عبارت مجموعه‌ای: {str(e)}")
-    
+
+    def extract_set_definitions(self, text: str):
+        """Split 'A ∪ B که A={1,2}, B={2,3}' into set objects and the remaining expression"""
+        set_pattern = r'([A-Z])\s*=\s*\{([^}]*)\}'
+        set_objects = {}
+        for name, elements in re.findall(set_pattern, text):
+            processed_elements = []
+            for elem in elements.split(','):
+                elem = elem.strip().strip('\'"')
+                if not elem:
+                    continue
+                try:
+                    # Try to convert to number
+                    if '.' in elem:
+                        processed_elements.append(float(elem))
+                    else:
+                        processed_elements.append(int(elem))
+                except ValueError:
+                    # Keep as string if not a number
+                    processed_elements.append(elem)
+
+            set_objects[name] = FiniteSet(*processed_elements)
+
+        remaining = re.sub(set_pattern, ' ', text)
+        return set_objects, remaining
+
+    def normalize_set_operators(self, text: str) -> str:
+        """Turn operator words ('A اجتماع B', 'union(A, B)') and functional spellings into infix symbols"""
+        text = self.set_word_pattern.sub(lambda m: self.set_words[m.group(1).lower()], text).replace('⊗', '×')
+        # A function name not followed by '(' was written infix, as in 'A Union B'
+        text = re.sub(r'\b(Union|Intersection|Complement|ProductSet)\b(?!\s*\()',
+                      lambda m: f" {_SET_FUNCTIONS[m.group(1)]} ", text)
+        return _functional_to_infix(text)
+
+    def select_set_expression(self, expression: str, set_objects: dict) -> str:
+        """Pick the infix set expression out of the text left after the definitions"""
+        # Keep the longest run that looks like a set expression over the defined names
+        runs = re.findall(r'[A-Z()∪∩\-\\×\s]+', expression)
+        candidates = [run.strip() for run in runs if re.search(r'[A-Z]', run)]
+        if not candidates:
+            raise ValueError("no set expression found")
+        expr = max(candidates, key=len)
+
+        unknown = set(re.findall(r'[A-Z]', expr)) - set(set_objects)
+        if unknown:
+            raise ValueError(f"undefined sets: {', '.join(sorted(unknown))}")
+        return expr
+
+    def evaluate_set_expression(self, expression: str, set_objects: dict):
+        """Evaluate an infix set expression such as '(A ∪ B) - C', as picked by ``select_set_expression``"""
+        expr = expression
+        for symbol, operator in self.set_operators.items():
+            expr = expr.replace(symbol, operator)
+        if not re.fullmatch(r'[A-Z()|&\-*\s]+', expr):
+            raise ValueError(f"unsupported set expression: {expr}")
+
+        # Only set names and operators remain, so evaluation cannot reach builtins
+        return eval(expr, {"__builtins__": {}}, dict(set_objects))
+
     def simplify_logic(self, expr):
         """Simplify a logical expression"""
         try:
             return simplify_logic(expr)
         except Exception as e:
-            logger.error(f"Error simplifying expression: {str(e)}")
+            logger.debug(f"Error simplifying expression: {str(e)}")
             raise ValueError(f"خطا در ساده‌سازی عبارت: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,79 @@
+import logging
+
+import cachetools
+
+from app.config import config
+from app.database import db_manager
+from app.services.leaderboard import leaderboard
+from app.services.scoring import scoring_system
+
+logger = logging.getLogger(__name__)
+
+NEW_USER_PROGRESS = {
+    "score": 0,
+    "level": 1,
+    "logic_correct": 0,
+    "set_theory_correct": 0,
+    "total_exercises": 0,
+}
+
+
+class ProgressService:
+    """User progress with a per-user read cache in front of ``user_progress``.
+
+    Reads are served from memory after the first one. Every answer is a
+    single atomic upsert whose RETURNING row replaces the cached entry, so
+    the cache never needs a separate invalidation read.
+    """
+
+    def __init__(self, cache_size: int):
+        self._cache = cachetools.LRUCache(maxsize=cache_size)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int) -> dict:
+        """The user's progress; users without a row start from zero"""
+        progress = self._cache.get(user_id)
+        if progress is not None:
+            self.hits += 1
+            return progress
+        self.misses += 1
+        progress = await db_manager.get_user_progress(user_id) or dict(NEW_USER_PROGRESS)
+        self._cache[user_id] = progress
+        return progress
+
+    async def difficulty(self, user_id: int) -> int:
+        """Exercise difficulty for the user's current level"""
+        progress = await self.get(user_id)
+        return scoring_system.get_exercise_difficulty(progress["level"])
+
+    async def record_answer(self, user_id: int, exercise: dict, is_correct: bool):
+        """Score an answered exercise; returns the points earned and the new progress"""
+        points = scoring_system.calculate_points(exercise["difficulty"], is_correct, exercise["type"])
+        progress = await db_manager.record_answer(
+            user_id,
+            points,
+            logic_correct=int(is_correct and exercise["type"] == "logic"),
+            set_theory_correct=int(is_correct and exercise["type"] == "set_theory"),
+        )
+
+        level = scoring_system.get_user_level(progress["score"])
+        if level != progress["level"]:
+            await db_manager.set_level(user_id, level)
+            progress["level"] = level
+
+        # Concurrent answers may finish out of order; keep the newest totals
+        cached = self._cache.get(user_id)
+        if cached is None or progress["total_exercises"] >= cached["total_exercises"]:
+            self._cache[user_id] = progress
+            leaderboard.set_score(user_id, progress["score"])
+        return points, progress
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+progress_service = ProgressService(cache_size=config.progress_cache_size)
@@ -0,0 +1,46 @@
+"""Versioned prompt templates for the LLM service.
+
+Each version is a system message plus a user message template. The active
+version is chosen with LLM_PROMPT_VERSION, and usage statistics are
+broken down by version so that template changes can be measured.
+"""
+
+# The original prompt: a long instruction block around every question, repeated
+# in a separate system message. Kept so its token cost can be compared.
+_V1_SYSTEM = (
+    "You are a helpful assistant for mathematical logic and set theory. "
+    "Always respond in Persian (Farsi)."
+)
+_V1_USER = (
+    "You are a specialized educational assistant in mathematical logic and set theory.\n"
+    "Role: Mathematics and Logic Tutor\nLanguage: Persian (Farsi)\n"
+    "Style: Educational, precise, and step-by-step explanations\n\n"
+    "Guidelines:\n1. Always respond in Persian (Farsi)\n"
+    "2. For mathematical expressions, use standard notation (∧, ∨, ¬, →, ∪, ∩, etc.)\n"
+    "3. If solving a problem, show steps clearly\n"
+    "4. Use formal mathematical language when appropriate\n"
+    "5. Provide examples when helpful\n\n"
+    "Question/Task:\n{question}\n\nPlease provide a clear, educational response in Persian."
+)
+
+# Compact prompt: the instructions live once in the system message and the
+# question is sent as-is.
+_V2_SYSTEM = (
+    "Logic & set theory tutor. Reply in Persian, precise and step by step, "
+    "with standard notation (∧ ∨ ¬ → ↔ ∪ ∩ ⊆). Give a short example if useful."
+)
+_V2_USER = "{question}"
+
+PROMPT_TEMPLATES = {
+    "v1": (_V1_SYSTEM, _V1_USER),
+    "v2": (_V2_SYSTEM, _V2_USER),
+}
+
+
+def build_messages(question: str, version: str, history: list = None) -> list:
+    """Chat-completions messages for ``question`` using template ``version``"""
+    system, user = PROMPT_TEMPLATES[version]
+    messages = [{"role": "system", "content": system}]
+    messages.extend(history or [])
+    messages.append({"role": "user", "content": user.format(question=question)})
+    return messages
@@ -0,0 +1,246 @@
+import asyncio
+import itertools
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from sympy import Equivalent, Not, satisfiable, pretty, latex
+from sympy.logic.boolalg import Boolean
+
+from app.cache import cache_layer
+from app.config import config
+from app.services.parser import LogicSetParser
+from app.services.llm_service import llm_service
+from app.services.explanations import match_concept, concept_hash
+from app.services.conversation import conversation_memory, is_follow_up
+from app.utils.cache import get_local_response, hash_query, normalize_query
+from app.utils.render import draw_latex
+from app.utils.venn import draw_venn, venn_source
+
+logger = logging.getLogger(__name__)
+
+# Characters that may appear in a typed logic formula (ASCII and Unicode operators)
+_LOGIC_RUN = re.compile(r"[A-Za-z0-9\s()∧∨¬→↔⇔⇒⊃⋀⋁∼!~&|^⊕<>=\-]+")
+
+# Command words stripped before looking for the formula
+_COMMAND_WORDS = re.compile(
+    r"\b(simplify|truth\s+table|table|for|of|is|equivalent|to|the|expression)\b", re.IGNORECASE
+)
+
+_TRUTH_TABLE_KEYWORDS = ("جدول درستی", "جدول", "truth table")
+_EQUIVALENCE_KEYWORDS = ("معادل", "همارز", "هم‌ارز", "equivalent to", "equivalent", "≡")
+_SIMPLIFY_KEYWORDS = ("ساده", "simplify", "کوچک کن")
+
+# Truth tables beyond this many variables are too long for a chat message
+_MAX_TABLE_VARIABLES = 5
+
+# Local engine results, including "not answerable locally"; they hold sympy
+# expressions and drawing functions, so they stay in process memory
+route_cache = cache_layer.namespace(
+    "routes", maxsize=config.route_cache_maxsize, ttl=config.route_cache_ttl, shared=False
+)
+
+
+@dataclass
+class RouteResult:
+    path: str  # 'simplify', 'truth_table', 'equivalence', 'set_eval', 'concept', 'cache', 'llm' or 'fallback'
+    response: str
+    expression: Optional[object] = None
+    image: Optional[tuple] = None  # (draw function, source) of a picture sent with the answer
+
+
+class QueryRouter:
+    """Answers parsable expressions locally and sends only free-form text to the LLM.
+
+    Each message is tried against the deterministic engines first
+    (simplification, truth table, equivalence, set evaluation), then against
+    precomputed concept explanations and cached answers. Only when none of
+    them applies does the request go to ``llm_service``.
+    """
+
+    def __init__(self, parser: LogicSetParser):
+        self.parser = parser
+        self.path_counts = Counter()
+
+    async def answer(self, text: str, domain: str = None, user_id: int = None,
+                     on_queued=None) -> RouteResult:
+        """Answer a user message, preferring local engines over the LLM"""
+        history = conversation_memory.history(user_id) if user_id and is_follow_up(text) else []
+        result = await route_cache.get_or_set(
+            hash_query(f"{domain or ''}\0{text}"), lambda: asyncio.to_thread(self.route_local, text, domain)
+        )
+        if result is None and not history:
+            result = await self.route_cached(text)
+        if result is None:
+            response, answered = await llm_service.get_reply(
+                text, user_id=user_id, on_queued=on_queued, history=history
+            )
+            result = RouteResult("llm" if answered else "fallback", response)
+        # Quota, busy and fallback texts are not worth sending back as earlier answers
+        if user_id and result.path != "fallback":
+            conversation_memory.add_turn(user_id, text, result.response)
+        self.path_counts[result.path] += 1
+        logger.info(f"Query from user {user_id} answered via '{result.path}'")
+        return result
+
+    def route_local(self, text: str, domain: str = None) -> Optional[RouteResult]:
+        """Try the local engines in the order that suits ``domain``; None if none applies"""
+        engines = [self._try_logic, self._try_set]
+        if domain == "set_theory":
+            engines.reverse()
+        for engine in engines:
+            try:
+                result = engine(text)
+            except Exception as e:
+                logger.debug(f"Local engine could not answer: {e}")
+                result = None
+            if result is not None:
+                return result
+        return None
+
+    async def route_cached(self, text: str) -> Optional[RouteResult]:
+        """Answer from precomputed concept explanations or earlier LLM answers"""
+        concept = match_concept(text)
+        if concept is not None:
+            response = await get_local_response(concept_hash(concept))
+            if response:
+                return RouteResult("concept", response)
+        response = await get_local_response(hash_query(normalize_query(text)))
+        if response:
+            return RouteResult("cache", response)
+        return None
+
+    def stats(self) -> dict:
+        """How many queries took each path"""
+        total = sum(self.path_counts.values())
+        local = total - self.path_counts["llm"] - self.path_counts["fallback"]
+        return {
+            "paths": dict(self.path_counts),
+            "local_ratio": round(local / total, 3) if total else 0.0,
+        }
+
+    def _try_logic(self, text: str) -> Optional[RouteResult]:
+        lowered = text.lower()
+        if "{" in text:
+            return None
+
+        if any(keyword in lowered for keyword in _EQUIVALENCE_KEYWORDS):
+            return self._equivalence(text)
+
+        if any(keyword in lowered for keyword in _TRUTH_TABLE_KEYWORDS):
+            expr = self._parse_formula(text)
+            return self._truth_table(expr) if expr is not None else None
+
+        explicit = any(keyword in lowered for keyword in _SIMPLIFY_KEYWORDS)
+        expr = self._parse_formula(text, require_whole=not explicit)
+        if expr is None:
+            return None
+        simplified = self.parser.simplify_logic(expr)
+        return RouteResult(
+            "simplify",
+            f"عبارت ساده شده: {pretty(simplified, use_unicode=True)}",
+            simplified,
+            image=(draw_latex, latex(simplified)),
+        )
+
+    def _try_set(self, text: str) -> Optional[RouteResult]:
+        if "{" not in text:
+            return None
+        set_objects, remaining = self.parser.extract_set_definitions(self.parser.clean_input(text))
+        remaining = self.parser.normalize_set_operators(remaining)
+        if not re.search(r"[∪∩×\\\-]", remaining):
+            return None
+        expression = self.parser.select_set_expression(remaining, set_objects)
+        if not re.search(r"[∪∩×\\\-]", expression):
+            return None
+        result = self.parser.evaluate_set_expression(expression, set_objects)
+        source = venn_source(set_objects, expression)
+        return RouteResult(
+            "set_eval",
+            f"نتیجه: {self._format_set(result)}",
+            result,
+            image=(draw_venn, source) if source else None,
+        )
+
+    def _parse_formula(self, text: str, require_whole: bool = False):
+        """Extract and parse the formula part of a message.
+
+        With ``require_whole`` the message must be nothing but a formula, so
+        questions that merely contain one still go to the LLM.
+        """
+        cleaned = self.parser.clean_input(text).strip("؟?.:")
+        candidate = _COMMAND_WORDS.sub(" ", cleaned)
+        runs = [run.strip() for run in _LOGIC_RUN.findall(candidate) if run.strip()]
+        if not runs:
+            return None
+        formula = max(runs, key=len)
+
+        if require_whole:
+            leftover = candidate.replace(formula, "", 1)
+            if re.search(r"\w", leftover):
+                return None
+
+        # Single letters are variables; anything longer must be an operator word
+        words = re.findall(r"[A-Za-z]{2,}", formula)
+        if any(word.lower() not in self.parser.symbols_map for word in words):
+            return None
+        if not re.search(r"[A-Za-z]", formula):
+            return None
+        if require_whole and not (words or re.search(r"[∧∨¬→↔⇔⇒⊃⋀⋁∼!~&|^⊕>]", formula)):
+            # A lone letter or word is not worth answering as a formula
+            return None
+
+        expr, _ = self.parser.parse_logic_expression(formula)
+        return expr if isinstance(expr, Boolean) else None
+
+    def _truth_table(self, expr) -> Optional[RouteResult]:
+        variables = sorted(expr.free_symbols, key=str)
+        if not variables or len(variables) > _MAX_TABLE_VARIABLES:
+            return None
+
+        header = [str(v) for v in variables] + [pretty(expr, use_unicode=True)]
+        rows = [" | ".join(header)]
+        for values in itertools.product([True, False], repeat=len(variables)):
+            value = expr.xreplace(dict(zip(variables, values)))
+            cells = ["T" if v else "F" for v in values] + ["T" if bool(value) else "F"]
+            rows.append(" | ".join(cells))
+        return RouteResult("truth_table", "جدول درستی:\n" + "\n".join(rows), expr)
+
+    def _equivalence(self, text: str) -> Optional[RouteResult]:
+        parts = re.split("|".join(map(re.escape, _EQUIVALENCE_KEYWORDS)), text, maxsplit=1,
+                         flags=re.IGNORECASE)
+        if len(parts) != 2:
+            return None
+        left = self._parse_formula(parts[0])
+        right = self._parse_formula(parts[1])
+        if left is None or right is None:
+            return None
+
+        counterexample = satisfiable(Not(Equivalent(left, right)))
+        left_text = pretty(left, use_unicode=True)
+        right_text = pretty(right, use_unicode=True)
+        if not counterexample:
+            return RouteResult("equivalence", f"✅ بله، {left_text} معادل {right_text} است.", left)
+
+        assignment = ", ".join(
+            f"{name}={'T' if value else 'F'}"
+            for name, value in sorted(counterexample.items(), key=lambda item: str(item[0]))
+        )
+        return RouteResult(
+            "equivalence",
+            f"❌ خیر، {left_text} معادل {right_text} نیست.\nمثال نقض: {assignment}",
+            left,
+        )
+
+    @staticmethod
+    def _format_set(result) -> str:
+        if getattr(result, "is_finite_set", False) and not result.is_FiniteSet:
+            # e.g. a Cartesian product: list its elements instead of ProductSet(...)
+            elements = sorted((str(element) for element in result), key=str)
+            return "{" + ", ".join(elements) + "}"
+        return str(result)
+
+
+query_router = QueryRouter(LogicSetParser())
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from app.config import config
+from app.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+GLOBAL = "global"
+
+
+class SlidingWindow:
+    """Requests and tokens spent within the last ``window`` seconds"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._events = deque()
+        self.requests = 0
+        self.tokens = 0
+
+    def add(self, tokens: int, now: float) -> None:
+        self._events.append((now, tokens))
+        self.requests += 1
+        self.tokens += tokens
+
+    def prune(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > self.window:
+            _, tokens = self._events.popleft()
+            self.requests -= 1
+            self.tokens -= tokens
+
+    def __bool__(self) -> bool:
+        return bool(self._events)
+
+
+class QuotaManager:
+    """Per-user and global LLM quotas over sliding windows.
+
+    Usage is tracked in memory on the request path. Per-user daily totals
+    are buffered and written to the ``llm_usage`` table in batches by the
+    flush task, as soon as the buffer is full or every ``flush_interval``
+    seconds. Users whose window has emptied are forgotten every
+    ``sweep_every`` recorded calls.
+    """
+
+    def __init__(self, window: float, user_requests: int, user_tokens: int,
+                 global_requests: int, global_tokens: int,
+                 flush_interval: float, flush_batch: int, sweep_every: int = 1000):
+        self.window = window
+        self.limits = {
+            "user": (user_requests, user_tokens),
+            GLOBAL: (global_requests, global_tokens),
+        }
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.sweep_every = sweep_every
+
+        self._windows = {}
+        self._global = SlidingWindow(window)
+        self._pending = defaultdict(lambda: [0, 0])  # (user_id, day) -> [requests, tokens]
+        self._rejected = 0
+        self._records = 0
+        self._flush_task = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    def allow(self, user_id: int = None) -> bool:
+        """Whether the user (and the bot as a whole) may make another upstream call"""
+        now = time.monotonic()
+        self._global.prune(now)
+        if self._over(self._global, GLOBAL):
+            self._rejected += 1
+            return False
+        if user_id is None:
+            return True
+
+        window = self._windows.get(user_id)
+        if window is None:
+            return True
+        window.prune(now)
+        if self._over(window, "user"):
+            self._rejected += 1
+            return False
+        return True
+
+    def record(self, user_id: int, tokens: int) -> None:
+        """Account one completed upstream call"""
+        now = time.monotonic()
+        self._global.add(tokens, now)
+        if user_id is None:
+            return
+
+        window = self._windows.get(user_id)
+        if window is None:
+            window = self._windows[user_id] = SlidingWindow(self.window)
+        window.prune(now)
+        window.add(tokens, now)
+
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        pending = self._pending[(user_id, day)]
+        pending[0] += 1
+        pending[1] += tokens
+        if len(self._pending) >= self.flush_batch:
+            self._wakeup.set()
+
+        self._records += 1
+        if self._records % self.sweep_every == 0:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        """Forget users whose window has emptied so the dict stays bounded"""
+        for idle_user in [u for u, w in self._windows.items() if (w.prune(now) or not w)]:
+            del self._windows[idle_user]
+
+    def _over(self, window: SlidingWindow, scope: str) -> bool:
+        max_requests, max_tokens = self.limits[scope]
+        return window.requests >= max_requests or window.tokens >= max_tokens
+
+    async def flush(self) -> int:
+        """Write buffered usage to the database in one transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            rows = [(user_id, day, requests, tokens)
+                    for (user_id, day), (requests, tokens) in self._pending.items()]
+            self._pending.clear()
+            try:
+                await db_manager.record_llm_usage(rows)
+            except asyncio.CancelledError:
+                self._restore(rows)
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing LLM usage: {e}")
+                # Put the rows back so the next flush retries them
+                self._restore(rows)
+                return 0
+            return len(rows)
+
+    def _restore(self, rows: list) -> None:
+        for user_id, day, requests, tokens in rows:
+            pending = self._pending[(user_id, day)]
+            pending[0] += requests
+            pending[1] += tokens
+
+    async def top_consumers(self, limit: int = 10, days: int = 1) -> list:
+        """Users with the most tokens over the last ``days`` days, including unflushed usage"""
+        await self.flush()
+        since = datetime.fromtimestamp(time.time() - days * 86400, timezone.utc).strftime("%Y-%m-%d")
+        return await db_manager.top_llm_consumers(since, limit)
+
+    def window_usage(self) -> dict:
+        self._global.prune(time.monotonic())
+        return {
+            "window_s": self.window,
+            "requests": self._global.requests,
+            "tokens": self._global.tokens,
+            "active_users": len(self._windows),
+            "rejected": self._rejected,
+        }
+
+    async def start(self) -> None:
+        """Start the periodic flush task"""
+        if self._flush_task is None:
+            self._stopping = False
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush task, letting a flush in progress finish, and write out the rest"""
+        if self._flush_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+quota_manager = QuotaManager(
+    window=config.quota_window,
+    user_requests=config.quota_user_requests,
+    user_tokens=config.quota_user_tokens,
+    global_requests=config.quota_global_requests,
+    global_tokens=config.quota_global_tokens,
+    flush_interval=config.quota_flush_interval,
+    flush_batch=config.quota_flush_batch,
+)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth another attempt: rate limiting and transient upstream failures
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the breaker is open"""
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 8.0,
+                  retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, honouring an upstream Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class LatencyTracker:
+    """Keeps recent successful call latencies to derive percentiles"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with a rolling time window.
+
+    Closed: calls pass and outcomes are recorded. When at least ``min_calls``
+    outcomes in the window fail at ``error_rate`` or more, the breaker opens
+    and rejects calls for ``open_seconds``. It then lets a single probe
+    through (half-open); success closes it, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, error_rate: float, min_calls: int,
+                 window: float, open_seconds: float):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+
+        self._outcomes = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_started = None
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted right now"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            now = time.monotonic()
+            # A probe that never reported back (e.g. it was never sent) must not
+            # keep the breaker half-open forever
+            if self._probe_started is None or now - self._probe_started > self.open_seconds:
+                self._probe_started = now
+                return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state == self.HALF_OPEN:
+            logger.info(f"Circuit '{self.name}' closed after successful probe")
+            self._state = self.CLOSED
+            self._outcomes.clear()
+        self._record(True)
+
+    def record_failure(self) -> None:
+        if self._state == self.HALF_OPEN:
+            self._trip()
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.error_rate):
+            self._trip()
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _trip(self) -> None:
+        logger.warning(f"Circuit '{self.name}' opened for {self.open_seconds}s")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+
+    def stats(self) -> dict:
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "state": self.state,
+            "calls_in_window": len(self._outcomes),
+            "failures_in_window": failures,
+        }
+
+
+async def first_successful(primary, hedge_factory, hedge_after: Optional[float]):
+    """Await ``primary``; if it is still running after ``hedge_after`` seconds,
+    start a second attempt from ``hedge_factory`` and return whichever succeeds first.
+    """
+    first = asyncio.ensure_future(primary)
+    if hedge_after is None:
+        return await first
+
+    try:
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done:
+        return first.result()
+
+    logger.info(f"Hedging slow request after {hedge_after:.2f}s")
+    pending = {first, asyncio.ensure_future(hedge_factory())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,5 +1,6 @@
 import logging
 from app.config import config
+from app.services.leaderboard import leaderboard
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,10 @@ class ScoringSystem:
                 level = i + 2
         return level
     
+    def get_exercise_difficulty(self, level: int) -> int:
+        """Map a user level (1-6) to an exercise difficulty (1-3)"""
+        return min(3, (level + 1) // 2)
+
     def get_level_progress(self, score: int, level: int) -> float:
         """Calculate progress to next level"""
         level_thresholds = [100, 300, 600, 1000, 1500]
@@ -35,6 +40,12 @@ class ScoringSystem:
         return min(100, max(0, progress))
     
     async def get_leaderboard(self, top_n: int = 10):
-        """Get top users by score"""
-        # For now, return an empty list
-        return []
\ No newline at end of file
+        """Get top users by score as ``(user_id, score)`` pairs"""
+        return leaderboard.top(top_n)
+
+    async def get_user_rank(self, user_id: int):
+        """Get the user's position on the leaderboard, or None if they have no score"""
+        return leaderboard.rank(user_id)
+
+
+scoring_system = ScoringSystem()
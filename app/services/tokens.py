@@ -0,0 +1,102 @@
+import logging
+import math
+import re
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers, and single non-space symbols, roughly as a BPE tokenizer sees them
+_PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]", re.UNICODE)
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens in ``text`` without a model-specific tokenizer.
+
+    Latin words average about four characters per token. Persian and other
+    non-Latin scripts split much finer, at about two characters per token.
+    Digits and symbols are counted one per token.
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece.isascii() and piece.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece.isalpha():
+            tokens += math.ceil(len(piece) / 2)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def count_message_tokens(messages: list) -> int:
+    """Estimated prompt tokens of a chat-completions message list"""
+    return sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut ``text`` at a word boundary so that it fits in ``budget`` tokens"""
+    if count_tokens(text) <= budget:
+        return text
+    used = 0
+    end = 0
+    for match in _PIECES.finditer(text):
+        used += count_tokens(match.group())
+        if used > budget:
+            break
+        end = match.end()
+    return text[:end].rstrip() + " …"
+
+
+class UsageStats:
+    """Input/output token accounting for LLM requests.
+
+    Prompt tokens are estimated locally before sending. When the upstream
+    reports its own ``usage`` block, those numbers are recorded as well.
+    """
+
+    def __init__(self, history: int = 200):
+        self.totals = defaultdict(int)
+        self.by_version = defaultdict(lambda: defaultdict(int))
+        self.by_model = defaultdict(lambda: defaultdict(int))
+        self.recent = deque(maxlen=history)
+
+    def record(self, model: str, version: str, estimated_input: int, usage: dict,
+               output_text: str, truncated: bool = False) -> dict:
+        prompt_tokens = usage.get("prompt_tokens") or estimated_input
+        completion_tokens = usage.get("completion_tokens") or count_tokens(output_text)
+        entry = {
+            "model": model,
+            "prompt_version": version,
+            "estimated_input_tokens": estimated_input,
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "truncated": truncated,
+        }
+        self.recent.append(entry)
+
+        for bucket in (self.totals, self.by_version[version], self.by_model[model]):
+            bucket["requests"] += 1
+            bucket["input_tokens"] += prompt_tokens
+            bucket["output_tokens"] += completion_tokens
+            bucket["estimated_input_tokens"] += estimated_input
+        if truncated:
+            self.totals["truncated_questions"] += 1
+        return entry
+
+    def summary(self) -> dict:
+        def averaged(bucket):
+            requests = bucket.get("requests", 0)
+            result = dict(bucket)
+            result["avg_input_tokens"] = round(bucket["input_tokens"] / requests, 1) if requests else 0
+            result["avg_output_tokens"] = round(bucket["output_tokens"] / requests, 1) if requests else 0
+            return result
+
+        return {
+            "totals": averaged(self.totals),
+            "by_prompt_version": {v: averaged(b) for v, b in self.by_version.items()},
+            "by_model": {m: averaged(b) for m, b in self.by_model.items()},
+        }
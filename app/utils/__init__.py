@@ -1,12 +1,38 @@
 # Utils package initialization
-from .cache import hash_query, get_cached_response, cache_response
-from .latex import latex_to_image
+from .cache import (
+    hash_query,
+    normalize_query,
+    get_cached_response,
+    cache_response,
+    get_local_response,
+    store_local_response,
+    load_precomputed,
+    save_precomputed
+)
+from .latex import latex_to_image, render_latex
+from .render import RenderStyle, renderer
+from .venn import draw_venn, venn_source
 from .helpers import format_progress_message
+from .formatting import format_text, prettify_logic, split_message, send_long_message
 
 __all__ = [
     'hash_query',
     'get_cached_response',
     'cache_response',
+    'normalize_query',
+    'get_local_response',
+    'store_local_response',
+    'load_precomputed',
+    'save_precomputed',
     'latex_to_image',
-    'format_progress_message'
+    'render_latex',
+    'RenderStyle',
+    'renderer',
+    'draw_venn',
+    'venn_source',
+    'format_progress_message',
+    'format_text',
+    'prettify_logic',
+    'split_message',
+    'send_long_message'
 ]
\ No newline at end of file
@@ -1,31 +1,104 @@
-import hashlib
+import json
 import logging
+import os
+import re
+import time
+from app.cache import cache_layer, key_hash
 from app.config import config
-import cachetools
 
 logger = logging.getLogger(__name__)
 
-# Create a TTL cache
-ttl_cache = cachetools.TTLCache(maxsize=config.cache_maxsize, ttl=config.cache_ttl)
+# LLM answers, shared between processes when CACHE_BACKEND is sqlite or redis
+answer_cache = cache_layer.namespace("answers", maxsize=config.cache_maxsize, ttl=config.cache_ttl)
+
+# Long-lived cache for precomputed answers (see scripts/precompute_explanations.py);
+# every process loads the file itself, so it stays in process memory
+precomputed_cache = cache_layer.namespace(
+    "precomputed", maxsize=config.precomputed_maxsize, ttl=config.precomputed_ttl, shared=False
+)
 
 
 def hash_query(text: str) -> str:
     """Create a hash of a query for caching"""
-    return hashlib.md5(text.encode()).hexdigest()
+    return key_hash(text)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a question so trivially different spellings share a cache entry"""
+    text = re.sub(r'[•·∙‣⁃?؟!.،,]', ' ', text.lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+async def get_local_response(query_hash: str):
+    """Get a response from the answer caches, precomputed answers first"""
+    return await precomputed_cache.get(query_hash) or await answer_cache.get(query_hash)
+
+
+async def store_local_response(query_hash: str, response: str, precomputed: bool = False, cost: float = 0.0):
+    """Store a response; precomputed answers go to the long-lived cache.
+
+    ``cost`` is the seconds the answer took to produce, which makes the
+    cache refresh expensive answers a little ahead of their expiry.
+    """
+    if precomputed:
+        await precomputed_cache.set(query_hash, response)
+    else:
+        await answer_cache.set(query_hash, response, cost=cost)
+
+
+async def load_precomputed(path: str) -> int:
+    """Load precomputed answers written by the batch job into the long-lived cache"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.error(f"Error loading precomputed responses: {e}")
+        return 0
+
+    now = time.time()
+    loaded = 0
+    for entry in entries.values():
+        age = now - entry.get('created_at', 0)
+        if age < config.precomputed_ttl:
+            # Keyed by the question rather than the file's key, so files written
+            # with an older hash function still load
+            await precomputed_cache.set(hash_query(entry['question']), entry['response'],
+                                        ttl=config.precomputed_ttl - age)
+            loaded += 1
+    logger.info(f"Loaded {loaded} precomputed responses from {path}")
+    return loaded
+
+
+def save_precomputed(path: str, entries: dict) -> None:
+    """Merge ``{hash: {question, response, created_at}}`` into the precomputed file"""
+    existing = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            existing = json.load(f)
+    existing.update(entries)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(existing, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
 
 
 async def get_cached_response(db_manager, query_hash: str):
     """Get a cached response from database"""
     try:
-        # First check in-memory cache
-        if query_hash in ttl_cache:
-            return ttl_cache[query_hash]
+        # First check the answer cache
+        response = await answer_cache.get(query_hash)
+        if response:
+            return response
 
         # Then check database cache
         response = await db_manager.get_cached_response(query_hash)
         if response:
-            # Store in memory cache for faster access
-            ttl_cache[query_hash] = response
+            # Store in the answer cache for faster access
+            await answer_cache.set(query_hash, response)
             return response
 
         return None
@@ -39,7 +112,7 @@ async def cache_response(db_manager, query_hash: str, response: str):
     try:
         # Store in database cache
         await db_manager.cache_response(query_hash, response)
-        # Store in memory cache
-        ttl_cache[query_hash] = response
+        # Store in the answer cache
+        await answer_cache.set(query_hash, response)
     except Exception as e:
         logger.error(f"Error caching response: {e}")
\ No newline at end of file
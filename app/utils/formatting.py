@@ -0,0 +1,108 @@
+import asyncio
+import html
+import re
+
+from telegram.constants import MessageLimit, ParseMode
+
+from app.config import config
+
+MESSAGE_LIMIT = MessageLimit.MAX_TEXT_LENGTH  # 4096
+
+# sympy's str() operators and function names -> logic symbols
+_LOGIC_SYMBOLS = {
+    ">>": "→",
+    "<<": "←",
+    "&": "∧",
+    "|": "∨",
+    "~": "¬",
+    "^": "⊕",
+    "Implies": "→",
+    "Equivalent": "↔",
+}
+_LOGIC_OPERATOR = re.compile(r">>|<<|[&|~^]")
+_LOGIC_CALL = re.compile(r"\b(Implies|Equivalent)\(([^(),]+), ([^(),]+)\)")
+
+# Boundaries to split at, best first: paragraphs, lines, sentences, words
+_BOUNDARIES = ("\n\n", "\n", ". ", "؟ ", "? ", "، ", " ")
+
+_PRE_OPEN, _PRE_CLOSE = "<pre>", "</pre>"
+
+
+def prettify_logic(text: str) -> str:
+    """Show sympy's ``&``, ``|``, ``~`` and ``>>`` as ∧, ∨, ¬ and →"""
+    # Two-argument Implies/Equivalent calls become infix; nested calls are left as they are
+    text = _LOGIC_CALL.sub(lambda m: f"({m.group(2)} {_LOGIC_SYMBOLS[m.group(1)]} {m.group(3)})", text)
+    text = _LOGIC_OPERATOR.sub(lambda m: _LOGIC_SYMBOLS[m.group(0)], text)
+    return text.replace("¬ ", "¬")
+
+
+def escape_html(text: str) -> str:
+    return html.escape(text, quote=False)
+
+
+def format_text(text: str, preformatted: bool = False) -> str:
+    """Plain text as Telegram HTML, optionally as a monospaced block (tables, grids)"""
+    escaped = escape_html(text)
+    return f"{_PRE_OPEN}{escaped}{_PRE_CLOSE}" if preformatted else escaped
+
+
+def _cut_point(text: str, limit: int) -> int:
+    """Index to split ``text`` at: the best boundary within ``limit``, past its first half if possible"""
+    for boundary in _BOUNDARIES:
+        index = text.rfind(boundary, 0, limit)
+        if index > limit // 2:
+            return index + len(boundary)
+    for boundary in _BOUNDARIES:
+        index = text.rfind(boundary, 0, limit)
+        if index > 0:
+            return index + len(boundary)
+    # No boundary at all: hard cut, but never inside an HTML entity or tag
+    for opener, closer in (("&", ";"), ("<", ">")):
+        start = text.rfind(opener, 0, limit)
+        if start > 0 and text.find(closer, start, limit) == -1:
+            limit = start
+    return limit
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list:
+    """Split Telegram HTML into chunks of at most ``limit`` characters at semantic boundaries.
+
+    A ``<pre>`` block that spans a cut is closed at the end of one chunk and
+    reopened at the start of the next, so every chunk is valid HTML.
+    """
+    chunks = []
+    in_pre = False
+    while text:
+        prefix = _PRE_OPEN if in_pre else ""
+        if len(prefix) + len(text) <= limit:
+            chunks.append(prefix + text)
+            break
+
+        cut = _cut_point(text, limit - len(prefix) - len(_PRE_CLOSE))
+        head, text = text[:cut], text[cut:]
+        in_pre = in_pre + head.count(_PRE_OPEN) - head.count(_PRE_CLOSE) > 0
+        chunk = prefix + (head if in_pre else head.rstrip())
+        chunks.append(chunk + _PRE_CLOSE if in_pre else chunk)
+        if not in_pre:
+            text = text.lstrip()
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+async def send_long_message(message, text: str, parse_mode=ParseMode.HTML, reply_markup=None,
+                            interval: float = None):
+    """Reply with ``text`` split into Telegram-sized chunks, pausing between sends.
+
+    ``reply_markup`` is attached to the last chunk. Returns the last message sent.
+    """
+    interval = config.telegram_send_interval if interval is None else interval
+    chunks = split_message(text)
+    sent = None
+    for index, chunk in enumerate(chunks):
+        if index:
+            # Stay below Telegram's per-chat rate when an answer takes several messages
+            await asyncio.sleep(interval)
+        last = index == len(chunks) - 1
+        sent = await message.reply_text(
+            chunk, parse_mode=parse_mode, reply_markup=reply_markup if last else None
+        )
+    return sent
@@ -1,18 +1,19 @@
+PROGRESS_TEMPLATE = (
+    "📊 پیشرفت شما:\n"
+    "🏆 سطح: {level}\n"
+    "⭐ امتیاز: {score}\n"
+    "🧠 تمرین‌های منطق حل شده: {logic_correct}\n"
+    "📚 تمرین‌های نظریه مجموعه حل شده: {set_theory_correct}\n"
+    "📝 کل تمرین‌های انجام شده: {total_exercises}"
+)
+
+
 def format_progress_message(user_progress: dict) -> str:
     """Format user progress into a message"""
-    score = user_progress["score"]
-    level = user_progress["level"]
-    logic_correct = user_progress["logic_correct"]
-    set_theory_correct = user_progress["set_theory_correct"]
-    total_exercises = user_progress["total_exercises"]
-
-    message = (
-        f"📊 پیشرفت شما:\n"
-        f"🏆 سطح: {level}\n"
-        f"⭐ امتیاز: {score}\n"
-        f"🧠 تمرین‌های منطق حل شده: {logic_correct}\n"
-        f"📚 تمرین‌های نظریه مجموعه حل شده: {set_theory_correct}\n"
-        f"📝 کل تمرین‌های انجام شده: {total_exercises}"
-    )
+    return PROGRESS_TEMPLATE.format_map(user_progress)
 
-    return message
\ No newline at end of file
+def sqlite_path_from_url(database_url: str) -> str:
+    """Extract the file path from a sqlite:/// or sqlite+aiosqlite:/// database URL"""
+    if not database_url.startswith("sqlite"):
+        raise ValueError(f"Not a SQLite database URL: {database_url}")
+    return database_url.split(":///", 1)[1]
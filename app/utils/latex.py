@@ -1,28 +1,24 @@
 import logging
 from io import BytesIO
-import matplotlib.pyplot as plt
-from sympy import latex
+
+from app.utils.render import DEFAULT_STYLE, RenderStyle, draw_latex, renderer
 
 logger = logging.getLogger(__name__)
 
 
-def latex_to_image(latex_str: str):
+def latex_to_image(latex_str: str, style: RenderStyle = DEFAULT_STYLE):
     """Convert LaTeX string to an image"""
     try:
-        # Use Matplotlib mathtext (faster, no external TeX needed)
-        plt.rcParams['text.usetex'] = False
-
-        fig, ax = plt.subplots(figsize=(8, 3))
-        ax.text(0.5, 0.5, f'${latex_str}$', fontsize=16,
-                ha='center', va='center')
-        ax.axis('off')
+        return BytesIO(renderer.render_sync(draw_latex, latex_str, style))
+    except Exception as e:
+        logger.error(f"Error converting LaTeX to image: {e}")
+        return None
 
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-        plt.close(fig)
 
-        return buf
+async def render_latex(latex_str: str, style: RenderStyle = DEFAULT_STYLE):
+    """Convert LaTeX string to an image in the render worker pool"""
+    try:
+        return BytesIO(await renderer.render(draw_latex, latex_str, style))
     except Exception as e:
         logger.error(f"Error converting LaTeX to image: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RenderStyle:
+    """Everything besides the source that changes the rendered pixels"""
+    fontsize: int = 16
+    dpi: int = 150
+    color: str = "black"
+    background: str = "white"
+    padding: float = 0.15  # inches around the drawing
+
+
+DEFAULT_STYLE = RenderStyle()
+
+
+def render_key(draw, source: str, style: RenderStyle = DEFAULT_STYLE) -> str:
+    """Content address of an image: the drawing function, its source and the style"""
+    ident = f"{draw.__module__}.{draw.__qualname__}\0{source}\0{style!r}"
+    return hashlib.blake2b(ident.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def load_font(size: int):
+    """DejaVu Sans from matplotlib's bundled fonts, for drawings made with Pillow"""
+    from matplotlib import get_data_path
+    from PIL import ImageFont
+
+    return ImageFont.truetype(f"{get_data_path()}/fonts/ttf/DejaVuSans.ttf", size)
+
+
+def draw_latex(latex_str: str, style: RenderStyle) -> bytes:
+    """Render a mathtext formula to PNG bytes with the Agg canvas, no pyplot involved"""
+    # Imported here so the bot process only loads matplotlib if it renders in-process
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.mathtext import MathTextParser
+
+    text = f"${latex_str}$"
+    prop = FontProperties(size=style.fontsize)
+    width, height, depth, _, _ = MathTextParser("path").parse(text, dpi=72, prop=prop)
+
+    pad = style.padding
+    fig = Figure(figsize=(width / 72 + 2 * pad, height / 72 + 2 * pad), facecolor=style.background)
+    FigureCanvasAgg(fig)
+    fig_height = height / 72 + 2 * pad
+    fig.text(pad / (width / 72 + 2 * pad), (pad + depth / 72) / fig_height, text,
+             fontproperties=prop, color=style.color)
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=style.dpi, facecolor=style.background)
+    return buf.getvalue()
+
+
+class DiskLRUCache:
+    """PNG files under ``directory`` named by their key, evicted least recently used first.
+
+    The access order is kept in memory and seeded from file mtimes on first
+    use, so the cache survives restarts. Hits refresh the file's mtime.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = None  # key -> size, least recently used first
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load_index(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        self._entries = {key: size for _, key, size in sorted(files)}
+        self._size = sum(self._entries.values())
+
+    def get(self, key: str):
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries[key] = self._entries.pop(key)  # Move to most recently used
+        try:
+            path = self._path(key)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error(f"Error writing render cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._size -= self._entries.pop(oldest)
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries or ()),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class Renderer:
+    """Renders images in a process pool, at most once per (drawing, source, style).
+
+    Finished PNGs go to the disk cache; concurrent requests for an image that
+    is still being drawn wait for the same job.
+    """
+
+    def __init__(self, cache: DiskLRUCache, workers: int):
+        self.cache = cache
+        self.workers = workers
+        self._pool = None
+        self._inflight = {}
+        self.rendered = 0
+
+    def _executor(self):
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def render(self, draw, source: str, style: RenderStyle = DEFAULT_STYLE) -> bytes:
+        """PNG bytes of ``draw(source, style)``, from the cache when possible"""
+        key = render_key(draw, source, style)
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            return data
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._render(key, draw, source, style))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _render(self, key: str, draw, source: str, style: RenderStyle) -> bytes:
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._executor(), draw, source, style)
+        self.rendered += 1
+        await asyncio.to_thread(self.cache.put, key, data)
+        return data
+
+    def render_sync(self, draw, source: str, style: RenderStyle = DEFAULT_STYLE) -> bytes:
+        """Blocking variant for code outside the event loop; draws in the calling process"""
+        key = render_key(draw, source, style)
+        data = self.cache.get(key)
+        if data is None:
+            data = draw(source, style)
+            self.rendered += 1
+            self.cache.put(key, data)
+        return data
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {"rendered": self.rendered, "inflight": len(self._inflight), **self.cache.stats()}
+
+
+renderer = Renderer(
+    DiskLRUCache(config.render_cache_dir, config.render_cache_max_mb * 1024 * 1024),
+    workers=config.render_workers,
+)
@@ -0,0 +1,118 @@
+import json
+import re
+from functools import lru_cache
+from io import BytesIO
+
+from app.utils.render import RenderStyle, load_font
+
+# Fill colour of the region that makes up the result
+SHADE_COLOR = (158, 202, 225)
+# Elements outside the result are drawn in this colour
+MUTED_COLOR = (140, 140, 140)
+# Elements listed per region before the rest is elided
+MAX_REGION_ELEMENTS = 6
+
+# Canvas size, circle centres and radius per number of sets
+_GEOMETRY = {
+    2: ((520, 340), ((190, 170), (330, 170)), 120),
+    3: ((520, 420), ((200, 160), (320, 160), (260, 264)), 120),
+}
+
+_SET_OPERATORS = {"∪": "|", "∩": "&", "\\": "&~", "-": "&~"}
+
+
+def venn_source(set_objects: dict, expression: str):
+    """Canonical description of a Venn diagram, or None if the expression cannot be drawn as one"""
+    names = sorted(set(re.findall(r"[A-Z]", expression)))
+    if not 2 <= len(names) <= 3 or "×" in expression or set(names) - set(set_objects):
+        return None
+    sets = [[name, sorted(str(element) for element in set_objects[name])] for name in names]
+    return json.dumps({"sets": sets, "expression": expression.strip()}, ensure_ascii=False)
+
+
+@lru_cache(maxsize=None)
+def _layout(count: int):
+    """Pixel masks of each circle and anchor points of each region for ``count`` sets.
+
+    Computed once per process and shared by every diagram with that many sets.
+    """
+    import numpy as np
+
+    (width, height), centers, radius = _GEOMETRY[count]
+    ys, xs = np.mgrid[0:height, 0:width]
+    distances = [np.hypot(xs - cx, ys - cy) for cx, cy in centers]
+    circles = [d <= radius for d in distances]
+    outline = np.zeros((height, width), dtype=bool)
+    for d in distances:
+        outline |= np.abs(d - radius) <= 1.5
+
+    # Anchor of each membership pattern, e.g. (True, False, True) = in A and C only
+    anchors = {}
+    for pattern in range(1, 2 ** count):
+        members = tuple(bool(pattern >> i & 1) for i in range(count))
+        mask = np.ones((height, width), dtype=bool)
+        for inside, circle in zip(members, circles):
+            mask &= circle if inside else ~circle
+        rows, cols = np.nonzero(mask)
+        anchors[members] = (int(cols.mean()), int(rows.mean()))
+
+    # Set names sit just outside their circle, away from the middle of the diagram
+    mid_x = sum(cx for cx, _ in centers) / count
+    mid_y = sum(cy for _, cy in centers) / count
+    labels = []
+    for cx, cy in centers:
+        dx, dy = cx - mid_x, cy - mid_y
+        norm = max((dx * dx + dy * dy) ** 0.5, 1e-9)
+        labels.append((int(cx + dx / norm * (radius + 16)), int(cy + dy / norm * (radius + 16))))
+    return (width, height), circles, outline, anchors, labels
+
+
+def draw_venn(source: str, style: RenderStyle) -> bytes:
+    """Render a Venn diagram with the result of the expression shaded"""
+    import numpy as np
+    from PIL import Image, ImageColor, ImageDraw
+
+    spec = json.loads(source)
+    names = [name for name, _ in spec["sets"]]
+    (width, height), circles, outline, anchors, labels = _layout(len(names))
+
+    expression = spec["expression"]
+    for symbol, operator in _SET_OPERATORS.items():
+        expression = expression.replace(symbol, operator)
+    if not re.fullmatch(r"[A-Z()|&~\s]+", expression):
+        raise ValueError(f"unsupported set expression: {spec['expression']}")
+    # Evaluate the expression on whole pixel masks instead of region by region
+    shaded = eval(expression, {"__builtins__": {}}, dict(zip(names, circles)))
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = ImageColor.getrgb(style.background)
+    image[shaded] = SHADE_COLOR
+    image[outline] = ImageColor.getrgb(style.color)
+
+    canvas = Image.fromarray(image)
+    draw = ImageDraw.Draw(canvas)
+    font = load_font(style.fontsize)
+    text_color = ImageColor.getrgb(style.color)
+
+    for name, position in zip(names, labels):
+        draw.text(position, name, font=load_font(style.fontsize + 4), fill=text_color, anchor="mm")
+
+    regions = {}
+    members = [set(elements) for _, elements in spec["sets"]]
+    for element in sorted(set().union(*members)):
+        regions.setdefault(tuple(element in m for m in members), []).append(element)
+
+    line_height = style.fontsize + 6
+    for pattern, elements in regions.items():
+        x, y = anchors[pattern]
+        color = text_color if shaded[y, x] else MUTED_COLOR
+        if len(elements) > MAX_REGION_ELEMENTS:
+            elements = elements[:MAX_REGION_ELEMENTS - 1] + ["…"]
+        lines = [", ".join(elements[i:i + 3]) for i in range(0, len(elements), 3)]
+        top = y - (len(lines) - 1) * line_height / 2
+        for index, line in enumerate(lines):
+            draw.text((x, top + index * line_height), line, font=font, fill=color, anchor="mm")
+
+    buf = BytesIO()
+    canvas.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
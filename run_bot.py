@@ -9,7 +9,9 @@ import sys
 from telegram.ext import Application
 
 from app.config import config
+from app.utils.cache import load_precomputed
 from app.bot.handlers import setup_handlers
+from app.bot.lifecycle import on_startup, on_shutdown
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +31,9 @@ async def async_main():
     
     # Initialize database
     logger.info("Database initialized successfully")
+
+    # Load answers precomputed by scripts/precompute_explanations.py
+    await load_precomputed(config.precomputed_path)
     
     # Create and setup application
     application = Application.builder().token(config.telegram_token).build()
@@ -37,6 +42,7 @@ async def async_main():
     # Start polling
     logger.info("Starting bot...")
     await application.initialize()
+    await on_startup(application)
     await application.start()
     await application.updater.start_polling()
     
@@ -51,6 +57,7 @@ async def async_main():
     finally:
         await application.updater.stop()
         await application.stop()
+        await on_shutdown(application)
         await application.shutdown()
 
 def main():
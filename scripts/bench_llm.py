@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Load generator for LLMService, meant to run against scripts/mock_openrouter.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.llm_service import llm_service
+
+QUESTIONS = [
+    "منطق گزاره‌ای چیست؟",
+    "تفاوت استلزام و همارزی را توضیح بده",
+    "چرا (p → q) با (¬q → ¬p) معادل است؟",
+    "اصل شمول و عدم شمول را با مثال توضیح بده",
+    "مجموعه تهی زیرمجموعه هر مجموعه‌ای است؟ چرا؟",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main():
+    """Send concurrent requests from several simulated users and report latencies"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--unique", action="store_true", help="make every question unique to bypass the cache")
+    args = parser.parse_args()
+
+    print(f"Target: {llm_service.api_url}")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(index: int):
+        question = random.choice(QUESTIONS)
+        if args.unique:
+            question = f"{question} ({index})"
+        async with semaphore:
+            started = time.monotonic()
+            await llm_service.get_response(question, user_id=index % args.users)
+            latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.monotonic() - started
+    await llm_service.close()
+
+    print(f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    for pct in (50, 90, 95, 99):
+        print(f"p{pct}: {percentile(latencies, pct) * 1000:.0f} ms")
+    print(json.dumps(llm_service.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Run a small in-memory cache server speaking the Redis protocol.
+Lets several bot processes on one host share a cache without installing
+Redis: start it, then set CACHE_BACKEND=redis and CACHE_URL=redis://HOST:PORT/0.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.cache.resp import RespServer
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--max-keys", type=int, default=100000,
+                        help="least recently used keys are evicted beyond this")
+    args = parser.parse_args()
+
+    server = RespServer(args.max_keys)
+    await server.start(args.host, args.port)
+    print(f"✓ Cache server on redis://{args.host}:{server.port}/0 (max {args.max_keys} keys)")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Exercise the cache layer on each backend: memory, a SQLite file, and the
+Redis protocol (an in-process RespServer, or a real server with --redis-url).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.cache import CacheLayer
+from app.cache.resp import RespServer
+
+
+async def run_checks(layer: CacheLayer, label: str, size_slack: int) -> list:
+    """Returns (name, passed) pairs; ``size_slack`` is how far the backend may overshoot a
+    namespace's size between trims"""
+    results = []
+
+    def check(name: str, passed: bool):
+        results.append((f"{label}: {name}", passed))
+        print(f"{'✓' if passed else '✗'} {label}: {name}")
+
+    answers = layer.namespace("answers", maxsize=50, ttl=60)
+    routes = layer.namespace("routes", maxsize=50, ttl=60)
+    await answers.clear()
+    await routes.clear()
+
+    check("miss returns the default", await answers.get("q", "default") == "default")
+    await answers.set("q", "answer")
+    check("hit returns the value", await answers.get("q") == "answer")
+    check("namespaces are separate", await routes.get("q") is None)
+    await answers.set("unicode", {"text": "∀x ∈ A"})
+    check("values round-trip", await answers.get("unicode") == {"text": "∀x ∈ A"})
+    await answers.delete("q")
+    check("delete", await answers.get("q") is None)
+
+    await answers.set("short", "value", ttl=0.05)
+    await asyncio.sleep(0.1)
+    check("entries expire", await answers.get("short") is None)
+
+    # An entry that was expensive and is about to expire is refreshed early
+    await answers.set("expensive", "value", ttl=0.5, cost=10.0)
+    refreshed = sum([await answers.get("expensive") is None for _ in range(100)])
+    check("expensive entries near expiry refresh early", refreshed > 50)
+    await answers.set("cheap", "value", ttl=60, cost=0.001)
+    check("cheap fresh entries are served", all([await answers.get("cheap") == "value" for _ in range(100)]))
+
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "computed"
+
+    values = await asyncio.gather(*(routes.get_or_set("key", compute) for _ in range(20)))
+    check("concurrent misses share one computation", calls == 1 and set(values) == {"computed"})
+    check("the computed value is cached", await routes.get_or_set("key", compute) == "computed" and calls == 1)
+
+    async def nothing():
+        return None
+
+    await routes.get_or_set("none", nothing)
+    check("None results are cached", await routes.get("none", "missing") is None)
+
+    for i in range(200):
+        await routes.set(f"fill{i}", i)
+    check("namespaces keep to their size", await routes.size() <= 50 + size_slack)
+    check("evictions are counted", layer.stats()["routes"]["evictions"] > 0)
+
+    started = time.perf_counter()
+    for i in range(1000):
+        await answers.get(f"fill{i % 200}")
+    elapsed = time.perf_counter() - started
+    print(f"  1000 lookups in {elapsed * 1000:.0f}ms")
+
+    stats = layer.stats()["answers"]
+    check("stats count hits and misses", stats["hits"] > 0 and stats["misses"] > 0)
+    await answers.clear()
+    check("clear empties the namespace", await answers.size() == 0)
+    return results
+
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", help="check a real Redis server instead of an in-process RespServer")
+    args = parser.parse_args()
+
+    results = []
+    layer = CacheLayer("memory", "", beta=1.0)
+    results += await run_checks(layer, "memory", size_slack=0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        layer = CacheLayer("sqlite", f"sqlite:///{directory}/cache.db", beta=1.0)
+        try:
+            results += await run_checks(layer, "sqlite", size_slack=layer.shared.trim_every)
+        finally:
+            await layer.close()
+
+    server = None
+    url = args.redis_url
+    if url is None:
+        server = RespServer(max_keys=10000)
+        await server.start("127.0.0.1", 0)
+        url = f"redis://127.0.0.1:{server.port}/0"
+    layer = CacheLayer("redis", url, beta=1.0)
+    try:
+        results += await run_checks(layer, "redis", size_slack=layer.shared.trim_every)
+    finally:
+        await layer.close()
+        if server is not None:
+            await server.close()
+
+    failed = [name for name, passed in results if not passed]
+    if failed:
+        print(f"✗ {len(failed)} checks failed")
+        return False
+    print(f"✓ All {len(results)} cache checks passed")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
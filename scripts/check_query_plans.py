@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check: runs EXPLAIN QUERY PLAN on every statement in
+app/database/queries.py and fails if one scans a whole table
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import queries
+
+STATEMENT_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def production_statements() -> dict:
+    """Name -> SQL for every DML statement defined in the queries module"""
+    return {
+        name: value for name, value in vars(queries).items()
+        if name.isupper() and isinstance(value, str) and value.lstrip().upper().startswith(STATEMENT_KEYWORDS)
+    }
+
+
+def is_full_scan(detail: str, subqueries: set) -> bool:
+    # "SCAN questions" or "SCAN questions USING INDEX ..." both read every row;
+    # SEARCH means the index narrows the range. Scans of a materialized
+    # subquery's result or of json_each() over a bound array are not table scans.
+    if not detail.startswith("SCAN ") or detail.startswith("SCAN CONSTANT ROW") or " VIRTUAL TABLE" in detail:
+        return False
+    return detail.split()[1] not in subqueries
+
+
+def check(conn: sqlite3.Connection, verbose: bool) -> list:
+    """Names of statements with an unexpected full scan"""
+    failures = []
+    for name, sql in sorted(production_statements().items()):
+        params = (None,) * sql.count("?")
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        subqueries = {detail.split()[1] for detail in plan if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        scans = [detail for detail in plan if is_full_scan(detail, subqueries)]
+        allowed = name in queries.FULL_SCANS
+        ok = not scans or allowed
+        if not ok:
+            failures.append(name)
+        if verbose or not ok:
+            mark = "✓" if ok else "✗"
+            note = " (full scan allowed)" if scans and allowed else ""
+            print(f"{mark} {name}{note}")
+            for detail in plan:
+                print(f"    {detail}")
+    return failures
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", default=":memory:",
+                        help="SQLite file whose statistics to plan with (default: a fresh schema)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    # Read-only for existing files, so the check never modifies a production database
+    if args.database == ":memory:":
+        conn = sqlite3.connect(":memory:")
+    else:
+        conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    try:
+        if args.database == ":memory:":
+            for statement in queries.SCHEMA:
+                conn.execute(statement)
+        failures = check(conn, args.verbose)
+    finally:
+        conn.close()
+
+    total = len(production_statements())
+    if failures:
+        print(f"✗ {len(failures)}/{total} statements scan a whole table: {', '.join(failures)}")
+        return False
+    print(f"✓ {total} statements checked, no unexpected full-table scans")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Switch an existing SQLite database to incremental auto-vacuum.
+Rewrites the whole file with one VACUUM, so stop the bot first. Databases
+created by the current schema already use incremental auto-vacuum.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import db_manager
+from app.database.maintenance import AUTO_VACUUM_INCREMENTAL
+
+
+async def main() -> bool:
+    argparse.ArgumentParser(description=__doc__).parse_args()
+    if db_manager.dialect != "sqlite":
+        print("✗ Only SQLite databases need this; PostgreSQL's autovacuum reclaims space")
+        return False
+    try:
+        if await db_manager.pragma("auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+            print("✓ Database already uses incremental auto-vacuum")
+            return True
+        print("Rewriting the database, this may take a while...")
+        started = time.perf_counter()
+        await db_manager.enable_incremental_vacuum()
+        converted = await db_manager.pragma("auto_vacuum") == AUTO_VACUUM_INCREMENTAL
+    finally:
+        await db_manager.close()
+    if not converted:
+        print("✗ auto_vacuum is still not INCREMENTAL")
+        return False
+    print(f"✓ Switched to incremental auto-vacuum in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
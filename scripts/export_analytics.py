@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Export questions and user progress for analysis, as CSV or Parquet.
+Only rows added or changed since the last run are exported unless --full is given.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.config import config
+from app.database import db_manager
+from app.database.export import TABLES, WRITERS, export_tables
+
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--tables", default=",".join(TABLES),
+                        help=f"comma-separated subset of {', '.join(TABLES)}")
+    parser.add_argument("--output-dir", default=config.export_dir)
+    parser.add_argument("--watermarks", default=None,
+                        help="watermark file (default: OUTPUT_DIR/watermarks.json)")
+    parser.add_argument("--chunk-size", type=int, default=config.export_chunk_size, help="rows per read")
+    parser.add_argument("--full", action="store_true", help="export everything, ignoring the watermarks")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.tables.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TABLES]
+    if unknown:
+        print(f"✗ Unknown tables: {', '.join(unknown)}")
+        return False
+
+    watermarks = args.watermarks or os.path.join(args.output_dir, "watermarks.json")
+    try:
+        results = await export_tables(names, args.format, args.output_dir, watermarks,
+                                      args.chunk_size, full=args.full)
+    except Exception as e:
+        print(f"✗ Export failed: {e}")
+        return False
+    finally:
+        await db_manager.close()
+
+    for name, (path, rows) in results.items():
+        print(f"✓ {name}: {rows} rows" + (f" -> {path}" if path else " (nothing new)"))
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
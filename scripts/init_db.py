@@ -16,6 +16,7 @@ async def main():
     """Initialize the database"""
     print("Initializing database...")
     await db_manager.init_db()
+    await db_manager.close()
     print("Database initialized successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat-completions API, for load and
+latency testing without the real service.
+
+Point the bot at it with OPENROUTER_API_URL=http://127.0.0.1:8089/api/v1/chat/completions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+from aiohttp import web
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.tokens import count_message_tokens, count_tokens
+
+ANSWER = (
+    "این یک پاسخ آزمایشی از سرور محلی است. "
+    "برای ساده‌سازی (p ∧ q) ∨ (p ∧ ¬q) از قانون توزیعی استفاده می‌کنیم: "
+    "p ∧ (q ∨ ¬q) = p ∧ T = p"
+)
+
+
+def parse_distribution(spec: str):
+    """Build a latency sampler from 'fixed:S', 'uniform:A,B', 'exponential:MEAN' or 'lognormal:MU,SIGMA'"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda: random.expovariate(1 / values[0])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class TokenBucket:
+    """Requests-per-second limiter used to emulate upstream rate limiting"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        # Holds at least one token, so rates below 1/s still let requests through
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class MockOpenRouter:
+    def __init__(self, args):
+        self.latency = parse_distribution(args.latency)
+        self.error_rate = args.error_rate
+        self.hang_rate = args.hang_rate
+        self.failing_models = set(args.fail_model or [])
+        self.bucket = TokenBucket(args.rate_limit) if args.rate_limit else None
+        self.requests = 0
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": {"message": "invalid JSON"}}, status=400)
+        model = payload.get("model", "mock")
+
+        if self.bucket is not None and not self.bucket.take():
+            return web.json_response(
+                {"error": {"code": 429, "message": "Rate limit exceeded"}},
+                status=429, headers={"Retry-After": "1"},
+            )
+        if model in self.failing_models or random.random() < self.error_rate:
+            status = random.choice([500, 502, 503])
+            return web.json_response({"error": {"code": status, "message": "Upstream error"}}, status=status)
+        if random.random() < self.hang_rate:
+            # Never answer in time, so the client's timeout handling is exercised
+            await asyncio.sleep(3600)
+
+        await asyncio.sleep(max(0.0, self.latency()))
+
+        prompt_tokens = count_message_tokens(payload.get("messages", []))
+        completion_tokens = count_tokens(ANSWER)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+
+        if payload.get("stream"):
+            return await self._stream(request, completion_id, model, usage)
+
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": ANSWER},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    async def _stream(self, request, completion_id, model, usage) -> web.StreamResponse:
+        """Send the answer as server-sent events, one word per chunk"""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+
+        words = ANSWER.split(" ")
+        for index, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if index == 0 else f" {word}"},
+                    "finish_reason": None,
+                }],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(0.01)
+
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        await response.write(f"data: {json.dumps(final)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"requests": self.requests})
+
+
+def main():
+    """Start the mock server"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:-0.5,0.6",
+                        help="fixed:S | uniform:A,B | exponential:MEAN | lognormal:MU,SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that never answer")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second before 429 (0 = off)")
+    parser.add_argument("--fail-model", action="append", help="model id that always fails (repeatable)")
+    args = parser.parse_args()
+
+    mock = MockOpenRouter(args)
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", mock.chat_completions)
+    app.router.add_get("/stats", mock.stats)
+
+    print(f"Mock OpenRouter listening on http://{args.host}:{args.port}/api/v1/chat/completions")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Batch job that precomputes concept explanations and answers to the most
+frequently asked questions, so the bot can serve them without an LLM call
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.config import config
+from app.database import db_manager
+from app.services.explanations import concept_questions, precompute_explanations
+from app.services.llm_service import llm_service
+from app.services.query_router import query_router
+from app.utils.cache import hash_query, normalize_query, save_precomputed
+
+
+async def frequent_questions(limit: int, days: float) -> dict:
+    """Most asked free-form questions of the last ``days`` days, counted per interned question text"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        # Over-fetch: expressions among the top are answered locally and skipped below
+        rows = await db_manager.top_questions(since, limit * 10)
+    except Exception as e:
+        print(f"✗ Could not read questions, precomputing concept explanations only: {e}")
+        return {}
+    finally:
+        await db_manager.close()
+
+    questions = {}
+    for text, _ in rows:
+        if len(questions) >= limit:
+            break
+        question = normalize_query(text)
+        # Expressions are answered by the local engines and need no LLM text
+        if question and query_router.route_local(question) is None:
+            questions[hash_query(question)] = question
+    return questions
+
+
+async def main():
+    """Generate and store the precomputed answers"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=50, help="number of frequent questions to include")
+    parser.add_argument("--days", type=float, default=config.question_retention_days,
+                        help="count questions asked in this many days (default: all kept questions)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--output", default=config.precomputed_path, help="precomputed responses file")
+    args = parser.parse_args()
+
+    questions = concept_questions()
+    questions.update(await frequent_questions(args.top, args.days))
+    print(f"Precomputing {len(questions)} answers with concurrency {args.concurrency}...")
+
+    results = await precompute_explanations(llm_service, questions, args.concurrency)
+    await llm_service.close()
+
+    save_precomputed(args.output, results)
+    print(f"✓ Stored {len(results)}/{len(questions)} answers in {args.output}")
+    return len(results) == len(questions)
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
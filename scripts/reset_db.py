@@ -16,6 +16,7 @@ async def reset_database():
     """Reset the database"""
     print("Resetting database...")
     await db_manager.recreate_database()
+    await db_manager.close()
     print("Database reset successfully")
 
 if __name__ == "__main__":
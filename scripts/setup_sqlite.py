@@ -116,5 +116,11 @@ async def main():
     return True
 
 if __name__ == "__main__":
-    success = asyncio.run(main())
+    async def run():
+        try:
+            return await main()
+        finally:
+            await db_manager.close()
+
+    success = asyncio.run(run())
     sys.exit(0 if success else 1)
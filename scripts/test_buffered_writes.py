@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Behaviour tests for the buffered writers, the write-behind queue and the
+LLM quota manager: batching, retries, and flushing on stop, against a
+scratch SQLite database
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Settings are read at import time: use a scratch database. Importing app loads
+# the LLM service, which needs a key; nothing here calls OpenRouter
+DATA_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR}/test_buffered_writes.db"
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from app.database import db_manager
+from app.database.write_behind import WriteBehindQueue
+from app.services.quota import QuotaManager
+
+
+class SlowWrites:
+    """Delay a DatabaseManager write method, optionally failing the first ``failures`` calls"""
+
+    def __init__(self, name: str, delay: float = 0.0, failures: int = 0, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.failures = failures
+        self.error = error or sqlite3.OperationalError("database is locked")
+        self.calls = 0
+
+    def __enter__(self):
+        original = getattr(db_manager, self.name)
+
+        async def write(*args):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            if self.calls <= self.failures:
+                raise self.error
+            return await original(*args)
+
+        setattr(db_manager, self.name, write)
+        return self
+
+    def __exit__(self, *exc):
+        delattr(db_manager, self.name)
+
+
+async def question_texts(user_id: int) -> list:
+    return sorted(row[0] for row in await db_manager.get_recent_questions(user_id, limit=100))
+
+
+async def test_write_behind_stop_during_flush() -> bool:
+    """Stopping while a flush is writing still writes that batch"""
+    print("Testing write-behind stop during a flush...")
+    queue = WriteBehindQueue(flush_interval=0.05, flush_batch=500, max_attempts=5)
+    await queue.start()
+    queue.log_question(1, "asked before stop", "logic")
+    with SlowWrites("write_events", delay=0.3):
+        await asyncio.sleep(0.1)  # the flush task is now inside write_events
+        await queue.stop()
+    if await question_texts(1) == ["asked before stop"] and queue.pending() == 0:
+        print("✓ The batch being written when stop() was called is in the database")
+        return True
+    print(f"✗ Stored: {await question_texts(1)}, still pending: {queue.pending()}")
+    return False
+
+
+async def test_write_behind_cancelled_flush() -> bool:
+    """A flush cancelled mid-write puts its batch back"""
+    print("Testing a cancelled write-behind flush...")
+    queue = WriteBehindQueue(flush_interval=60, flush_batch=500, max_attempts=5)
+    queue.touch(2)
+    queue.log_question(2, "kept after cancel", "logic")
+    with SlowWrites("write_events", delay=0.3):
+        flush = asyncio.create_task(queue.flush())
+        await asyncio.sleep(0.1)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+    if queue.pending() != 2:
+        print(f"✗ {queue.pending()} of 2 events are still buffered after the cancel")
+        return False
+    await queue.flush()
+    if await question_texts(2) == ["kept after cancel"]:
+        print("✓ The cancelled batch is buffered again and written by the next flush")
+        return True
+    print(f"✗ Stored: {await question_texts(2)}")
+    return False
+
+
+async def test_write_behind_batch_wakeup() -> bool:
+    """A full batch is flushed without waiting for the interval"""
+    print("Testing write-behind batch wakeup...")
+    queue = WriteBehindQueue(flush_interval=60, flush_batch=3, max_attempts=5)
+    await queue.start()
+    for i in range(3):
+        queue.log_question(1, f"batch {i}", "logic")
+    await asyncio.sleep(0.2)
+    flushed = queue.stats()["flushes"] == 1 and queue.pending() == 0
+    await queue.stop()
+    if flushed:
+        print("✓ Reaching flush_batch woke the flush task")
+        return True
+    print(f"✗ Queue state: {queue.stats()}")
+    return False
+
+
+async def test_write_behind_retries() -> bool:
+    """Transient failures are retried; rows that cannot be written are dropped alone"""
+    print("Testing write-behind retries...")
+    success = True
+    queue = WriteBehindQueue(flush_interval=60, flush_batch=500, max_attempts=3)
+    queue.log_question(3, "after a locked database", "logic")
+    with SlowWrites("write_events", failures=2):
+        await queue.flush()
+        if queue.pending() == 1:
+            print("✓ A batch that failed is kept for the next flush")
+        else:
+            print(f"✗ {queue.pending()} events buffered after a failed flush")
+            success = False
+        await queue.flush()
+    if await question_texts(3) == ["after a locked database"]:
+        print("✓ The batch is written once the database recovers")
+    else:
+        print(f"✗ Stored: {await question_texts(3)}")
+        success = False
+
+    # User 999 has no users row, so the foreign key rejects this question
+    queue.log_question(999, "orphan", "logic")
+    queue.log_question(3, "next to the orphan", "logic")
+    await queue.flush()
+    if "next to the orphan" in await question_texts(3) and queue.dropped == 1 and queue.pending() == 0:
+        print("✓ A row violating a constraint is dropped and the rest of its batch is written")
+    else:
+        print(f"✗ Stored: {await question_texts(3)}, stats: {queue.stats()}")
+        success = False
+
+    queue.log_question(3, "never written", "logic")
+    with SlowWrites("write_events", failures=10, error=OSError("disk gone")):
+        for _ in range(3):
+            await queue.flush()
+    if queue.pending() == 0 and queue.dropped == 2:
+        print("✓ A row is dropped after max_attempts failed flushes")
+    else:
+        print(f"✗ Queue state after repeated failures: {queue.stats()}")
+        success = False
+    return success
+
+
+async def usage_of(user_id: int) -> tuple:
+    rows = await db_manager.top_llm_consumers("2000-01-01", 100)
+    return next(((requests, tokens) for uid, requests, tokens in rows if uid == user_id), (0, 0))
+
+
+def make_quota(**overrides) -> QuotaManager:
+    settings = dict(window=60, user_requests=3, user_tokens=1000, global_requests=1000,
+                    global_tokens=10 ** 6, flush_interval=60, flush_batch=100)
+    settings.update(overrides)
+    return QuotaManager(**settings)
+
+
+async def test_quota_limits() -> bool:
+    """Users are refused once over their window's request or token budget"""
+    print("Testing quota limits...")
+    quota = make_quota()
+    for _ in range(3):
+        quota.record(10, 10)
+    quota.record(11, 1000)
+    allowed = quota.allow(10), quota.allow(11), quota.allow(12)
+    if allowed == (False, False, True):
+        print("✓ Request and token limits refuse only the users over them")
+        return True
+    print(f"✗ allow() for users 10, 11, 12 returned {allowed}")
+    return False
+
+
+async def test_quota_stop_during_flush() -> bool:
+    """Stopping while usage is being written still records it"""
+    print("Testing quota stop during a flush...")
+    quota = make_quota(flush_interval=0.05)
+    await quota.start()
+    quota.record(20, 40)
+    with SlowWrites("record_llm_usage", delay=0.3):
+        await asyncio.sleep(0.1)
+        await quota.stop()
+    if await usage_of(20) == (1, 40):
+        print("✓ Usage being written when stop() was called is in the database")
+        return True
+    print(f"✗ Stored usage: {await usage_of(20)}")
+    return False
+
+
+async def test_quota_failed_flush() -> bool:
+    """Usage from failed or cancelled flushes is kept and written later"""
+    print("Testing failed and cancelled quota flushes...")
+    quota = make_quota()
+    quota.record(21, 5)
+    with SlowWrites("record_llm_usage", failures=1):
+        await quota.flush()
+        quota.record(21, 7)
+        await quota.flush()
+    failed_ok = await usage_of(21) == (2, 12)
+
+    quota.record(22, 9)
+    with SlowWrites("record_llm_usage", delay=0.3):
+        flush = asyncio.create_task(quota.flush())
+        await asyncio.sleep(0.1)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+    await quota.flush()
+    cancelled_ok = await usage_of(22) == (1, 9)
+
+    if failed_ok and cancelled_ok:
+        print("✓ Usage survives a failed flush and a cancelled one")
+        return True
+    print(f"✗ Stored usage: user 21 {await usage_of(21)}, user 22 {await usage_of(22)}")
+    return False
+
+
+async def test_quota_sweep() -> bool:
+    """Users whose window emptied are forgotten every sweep_every records"""
+    print("Testing the quota window sweep...")
+    quota = make_quota(window=0.05, sweep_every=10)
+    quota.record(30, 1)
+    await asyncio.sleep(0.1)
+    for user_id in range(31, 40):
+        quota.record(user_id, 1)
+    active = quota.window_usage()["active_users"]
+    if active == 9:
+        print("✓ The idle user's window was swept on the 10th record")
+        return True
+    print(f"✗ {active} users still tracked")
+    return False
+
+
+async def run_tests() -> bool:
+    await db_manager.init_db()
+    for user_id in (1, 2, 3):
+        await db_manager.add_user(user_id, f"user{user_id}")
+    success = True
+    try:
+        for test in (test_write_behind_stop_during_flush, test_write_behind_cancelled_flush,
+                     test_write_behind_batch_wakeup, test_write_behind_retries, test_quota_limits,
+                     test_quota_stop_during_flush, test_quota_failed_flush, test_quota_sweep):
+            if not await test():
+                success = False
+    finally:
+        await db_manager.close()
+    return success
+
+
+def main():
+    """Main test function"""
+    print("Buffered Writes Test")
+    print("=" * 50)
+
+    success = asyncio.run(run_tests())
+
+    print("\n" + "=" * 50)
+    if success:
+        print("✓ All buffered write tests passed!")
+    else:
+        print("✗ Some tests failed.")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Behaviour tests for the LLM scheduler: fair sharing, weights, admission
+limits and cancellation of queued requests
+"""
+
+import asyncio
+import os
+import sys
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Importing app loads the LLM service, which needs a key; nothing here calls OpenRouter
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from app.services.llm_scheduler import LLMScheduler, LLMBusyError
+
+
+def make_scheduler(**overrides) -> LLMScheduler:
+    settings = dict(max_concurrency=1, per_user_inflight=1, max_queue=100,
+                    per_user_queue=100, queue_timeout=5.0)
+    settings.update(overrides)
+    return LLMScheduler(**settings)
+
+
+async def dispatch_order(scheduler: LLMScheduler, requests: list) -> list:
+    """User ids in the order their requests ran, with ``requests`` queued behind a busy slot"""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    async def call(user_id):
+        order.append(user_id)
+
+    holder = asyncio.create_task(scheduler.run(-1, blocker))
+    await asyncio.sleep(0)
+    tasks = []
+    for user_id in requests:
+        tasks.append(asyncio.create_task(scheduler.run(user_id, lambda u=user_id: call(u))))
+        await asyncio.sleep(0)  # queue them in this order
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+async def test_fairness() -> bool:
+    """A user who floods the queue does not hold up another user's requests"""
+    print("Testing fair sharing between users...")
+    order = await dispatch_order(make_scheduler(), [1] * 10 + [2, 2])
+    positions = [index for index, user_id in enumerate(order) if user_id == 2]
+    if positions == [1, 3]:
+        print(f"✓ User 2 ran 2nd and 4th behind 10 queued requests of user 1: {order}")
+        return True
+    print(f"✗ User 2 ran at positions {positions}: {order}")
+    return False
+
+
+async def test_weights() -> bool:
+    """A user with weight 2 gets twice the share of a user with weight 1"""
+    print("Testing weighted shares...")
+    scheduler = make_scheduler(weights={1: 2.0})
+    order = await dispatch_order(scheduler, [1] * 6 + [2] * 6)
+    first_six = order[:6]
+    if first_six.count(1) == 4:
+        print(f"✓ User 1 (weight 2) got 4 of the first 6 slots: {order}")
+        return True
+    print(f"✗ User 1 got {first_six.count(1)} of the first 6 slots: {order}")
+    return False
+
+
+async def test_admission_limits() -> bool:
+    """Full queues refuse new requests, and requests that wait too long give up"""
+    print("Testing admission limits...")
+    scheduler = make_scheduler(per_user_queue=1, queue_timeout=0.1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(scheduler.run(1, release.wait))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(scheduler.run(2, release.wait))
+    await asyncio.sleep(0)
+
+    success = True
+    try:
+        await scheduler.run(2, release.wait)
+        print("✗ A request over the per-user queue limit was admitted")
+        success = False
+    except LLMBusyError:
+        print("✓ A request over the per-user queue limit is refused")
+
+    try:
+        await waiting
+        print("✗ A queued request outlived the queue timeout")
+        success = False
+    except LLMBusyError:
+        print("✓ A queued request gives up after the queue timeout")
+
+    release.set()
+    await holder
+    stats = scheduler.stats()
+    if stats["rejected"] == 1 and stats["timed_out"] == 1 and stats["queue_depth"] == 0 and stats["inflight"] == 0:
+        print("✓ Rejections and timeouts are counted, and nothing is left queued or in flight")
+    else:
+        print(f"✗ Unexpected scheduler state: {stats}")
+        success = False
+    return success
+
+
+async def test_cancellation() -> bool:
+    """Cancelling queued or running requests leaves no slots or queue entries behind"""
+    print("Testing cancellation...")
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    holder = asyncio.create_task(scheduler.run(1, release.wait))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(scheduler.run(2, release.wait))
+    await asyncio.sleep(0)
+
+    success = True
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+    if scheduler.queue_depth() == 0:
+        print("✓ A cancelled queued request leaves the queue")
+    else:
+        print(f"✗ Queue depth after cancelling is {scheduler.queue_depth()}")
+        success = False
+
+    holder.cancel()
+    await asyncio.gather(holder, return_exceptions=True)
+    if scheduler.stats()["inflight"] == 0:
+        print("✓ A cancelled running request frees its slot")
+    else:
+        print(f"✗ {scheduler.stats()['inflight']} slots still in use")
+        success = False
+
+    ran = []
+
+    async def later():
+        ran.append(3)
+
+    await asyncio.wait_for(scheduler.run(3, later), 1)
+    if ran == [3]:
+        print("✓ The scheduler still admits requests afterwards")
+    else:
+        print("✗ The scheduler did not run a later request")
+        success = False
+    return success
+
+
+def main():
+    """Main test function"""
+    print("LLM Scheduler Test")
+    print("=" * 50)
+
+    success = True
+    for test in (test_fairness, test_weights, test_admission_limits, test_cancellation):
+        if not asyncio.run(test()):
+            success = False
+
+    print("\n" + "=" * 50)
+    if success:
+        print("✓ All scheduler tests passed!")
+    else:
+        print("✗ Some tests failed.")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Behaviour tests for the query router: local engines, LLM answers and the
+fallback paths (upstream errors, quota, busy scheduler, open circuits).
+OpenRouter is replaced by an in-process fake, so no network is needed.
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Importing app loads the LLM service, which needs a key; the fake upstream never sends it
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from app.config import config
+from app.services.conversation import conversation_memory
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_service import llm_service
+from app.services.model_pool import model_pool
+from app.services.parser import LogicSetParser
+from app.services.query_router import QueryRouter
+from app.services.quota import quota_manager
+
+
+class FakeUpstream:
+    """Stands in for LLMService._post: answers, or fails every call with ``status``"""
+
+    def __init__(self, status: int = None):
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self, model: str, messages: list, request_class: str):
+        self.calls += 1
+        if self.status is not None:
+            request = httpx.Request("POST", config.llm_api_url)
+            raise httpx.HTTPStatusError(f"status {self.status}", request=request,
+                                        response=httpx.Response(self.status, request=request))
+        return model, f"answer to: {messages[-1]['content']}", {"prompt_tokens": 10, "completion_tokens": 5}
+
+
+def check(name: str, passed: bool, detail: str = "") -> bool:
+    print(f"{'✓' if passed else '✗'} {name}" + (f" ({detail})" if detail and not passed else ""))
+    return passed
+
+
+async def test_local_engines(router: QueryRouter) -> bool:
+    """Formulas and set expressions are answered without the LLM"""
+    print("Testing local engines...")
+    upstream = llm_service._post = FakeUpstream()
+    simplified = await router.answer("simplify (p ∧ q) ∨ (p ∧ ¬q)", user_id=1)
+    table = await router.answer("truth table p → q", user_id=1)
+    sets = await router.answer("A={1,2}, B={2,3} A ∪ B", user_id=1)
+    return all([
+        check("Simplification is answered locally", simplified.path == "simplify", simplified.path),
+        check("Truth tables are answered locally", table.path == "truth_table", table.path),
+        check("Set expressions are answered locally", sets.path == "set_eval", sets.path),
+        check("The LLM was not called", upstream.calls == 0, f"{upstream.calls} calls"),
+    ])
+
+
+async def test_llm_answer(router: QueryRouter) -> bool:
+    """Free-form questions go to the LLM once, then come from the cache"""
+    print("Testing LLM answers...")
+    upstream = llm_service._post = FakeUpstream()
+    question = "why is the empty set a subset of every set"
+    first = await router.answer(question, user_id=2)
+    second = await router.answer(question, user_id=3)
+    return all([
+        check("A free-form question is answered by the LLM", first.path == "llm", first.path),
+        check("The same question is then served from the cache", second.path == "cache", second.path),
+        check("The LLM was called once", upstream.calls == 1, f"{upstream.calls} calls"),
+        check("The answer is remembered for follow-ups", len(conversation_memory.history(2)) == 2),
+    ])
+
+
+async def test_upstream_failure(router: QueryRouter) -> bool:
+    """When every model refuses, the user gets a fallback that is neither cached nor remembered"""
+    print("Testing upstream failures...")
+    upstream = llm_service._post = FakeUpstream(status=400)
+    question = "explain the pigeonhole principle"
+    first = await router.answer(question, user_id=4)
+    second = await router.answer(question, user_id=4)
+    return all([
+        check("Upstream errors give the fallback path", first.path == "fallback", first.path),
+        check("Fallback texts are not cached", second.path == "fallback", second.path),
+        check("Each question tried every model once", upstream.calls == 2 * len(config.llm_short_models),
+              f"{upstream.calls} calls"),
+        check("Fallback texts are not remembered as turns", conversation_memory.history(4) == []),
+    ])
+
+
+async def test_quota(router: QueryRouter) -> bool:
+    """Users over their quota get the quota text without an upstream call"""
+    print("Testing the quota fallback...")
+    upstream = llm_service._post = FakeUpstream()
+    quota_manager.record(5, config.quota_user_tokens)
+    result = await router.answer("what is a tautology", user_id=5)
+    return all([
+        check("A user over quota gets the fallback path", result.path == "fallback", result.path),
+        check("The reply is the quota text", result.response.startswith(llm_service.get_quota_response("")[:40])),
+        check("The LLM was not called", upstream.calls == 0, f"{upstream.calls} calls"),
+    ])
+
+
+async def test_busy(router: QueryRouter) -> bool:
+    """Requests the scheduler cannot admit get the busy text"""
+    print("Testing the busy fallback...")
+    upstream = llm_service._post = FakeUpstream()
+    limits = llm_scheduler.max_concurrency, llm_scheduler.max_queue
+    llm_scheduler.max_concurrency = llm_scheduler.max_queue = 0
+    try:
+        result = await router.answer("what is a contradiction", user_id=6)
+    finally:
+        llm_scheduler.max_concurrency, llm_scheduler.max_queue = limits
+    return all([
+        check("A refused request gets the fallback path", result.path == "fallback", result.path),
+        check("The reply is the busy text", result.response == llm_service.get_busy_response()),
+        check("The LLM was not called", upstream.calls == 0, f"{upstream.calls} calls"),
+    ])
+
+
+async def test_open_circuits(router: QueryRouter) -> bool:
+    """With every circuit open, questions get the fallback without an upstream call"""
+    print("Testing the open-circuit fallback...")
+    upstream = llm_service._post = FakeUpstream()
+    for name in config.llm_short_models + config.llm_long_models:
+        for _ in range(config.breaker_min_calls):
+            model_pool.record_failure(name)
+    result = await router.answer("what is a power set", user_id=7)
+    return all([
+        check("Open circuits give the fallback path", result.path == "fallback", result.path),
+        check("The LLM was not called", upstream.calls == 0, f"{upstream.calls} calls"),
+    ])
+
+
+async def run_tests() -> bool:
+    router = QueryRouter(LogicSetParser())
+    success = True
+    # Open circuits last: they stay open for BREAKER_OPEN_SECONDS
+    for test in (test_local_engines, test_llm_answer, test_upstream_failure, test_quota, test_busy,
+                 test_open_circuits):
+        if not await test(router):
+            success = False
+
+    # 4 local answers (3 engines and 1 cache hit), 1 LLM answer and 5 fallbacks
+    stats = router.stats()
+    if not check("local_ratio counts neither LLM answers nor fallbacks as local",
+                 stats["local_ratio"] == 0.4, str(stats)):
+        success = False
+    return success
+
+
+def main():
+    """Main test function"""
+    print("Query Router Test")
+    print("=" * 50)
+
+    success = asyncio.run(run_tests())
+
+    print("\n" + "=" * 50)
+    if success:
+        print("✓ All query router tests passed!")
+    else:
+        print("✗ Some tests failed.")
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)